@@ -1,11 +1,50 @@
-from fastapi import Header, HTTPException, status, Depends
+from typing import Optional
+from fastapi import Header, HTTPException, status, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.config import settings
-from app.database import async_session_maker
+from app.database import read_router
+from app.replicas import LazyReadSession
 from app.repo.organization.repo import OrganizationRepo
+from app.repo.organization.json_repo import OrganizationJsonRepo
+from app.repo.organization.core_repo import OrganizationCoreRepo
 from app.repo.building.repo import BuildingRepo
+from app.repo.activity.taxonomy import activity_taxonomy
+from app.repo.snapshot.snapshot import directory_snapshot
+from app.repo.snapshot.repo import OrganizationSnapshotRepo, BuildingSnapshotRepo
 from app.usecase.organization.get_organization import GetOrganizationUseCase
+from app.usecase.organization.result_cache import ResultCache
+from app.usecase.organization.shared_cache import SharedMemorySegment, SharedResultCache
 from app.usecase.geo_search.search_use_case import GeoSearchUseCase
+from app.usecase.geo_search.tile_cache import TileCache
+from app.api.pagination import PageParams
+
+
+# Кеш ячеек сетки общий для всех запросов процесса
+geo_tile_cache = TileCache(
+    tile_size=settings.GEO_TILE_SIZE_DEGREES,
+    max_tiles=settings.GEO_TILE_CACHE_MAX_TILES,
+    ttl_seconds=settings.GEO_TILE_CACHE_TTL_SECONDS,
+    max_tiles_per_query=settings.GEO_TILE_CACHE_MAX_TILES_PER_QUERY,
+) if settings.GEO_TILE_CACHE_ENABLED else None
+
+# Общий для воркеров хоста уровень кеша результатов, сегмент открывается при первом запросе
+organization_shared_cache = SharedResultCache(
+    SharedMemorySegment(
+        path=settings.ORGANIZATION_SHARED_CACHE_PATH,
+        arena_bytes=settings.ORGANIZATION_SHARED_CACHE_MAX_BYTES,
+        slots=settings.ORGANIZATION_SHARED_CACHE_SLOTS,
+    ),
+    ttl_seconds=settings.ORGANIZATION_SHARED_CACHE_TTL_SECONDS,
+) if settings.ORGANIZATION_SHARED_CACHE_ENABLED else None
+
+# Кеш результатов GetOrganizationUseCase общий для всех запросов процесса,
+# промахи проверяют общий кеш воркеров, затем БД
+organization_result_cache = ResultCache(
+    max_bytes=settings.ORGANIZATION_CACHE_MAX_BYTES,
+    ttl_seconds=settings.ORGANIZATION_CACHE_TTL_SECONDS,
+    early_refresh_beta=settings.ORGANIZATION_CACHE_EARLY_REFRESH_BETA,
+    next_tier=organization_shared_cache,
+) if settings.ORGANIZATION_CACHE_ENABLED else None
 
 
 async def verify_api_key(x_api_key: str = Header(..., alias="X-API-Key")):
@@ -20,25 +59,66 @@ async def verify_api_key(x_api_key: str = Header(..., alias="X-API-Key")):
     return x_api_key
 
 
+def get_page_params(
+    limit: int = Query(
+        settings.PAGE_SIZE_DEFAULT,
+        ge=1,
+        le=settings.PAGE_SIZE_MAX,
+        description="Размер страницы"
+    ),
+    cursor: Optional[str] = Query(
+        None,
+        description="Курсор следующей страницы из заголовка X-Next-Cursor"
+    )
+) -> PageParams:
+    """
+    Dependency для получения параметров keyset пагинации
+    """
+    return PageParams(limit=limit, cursor=cursor)
+
+
 async def get_db_session() -> AsyncSession:
     """
-    Dependency для получения сессии БД
+    Dependency для получения сессии БД.
+    Все эндпоинты только читают, поэтому сессия открывается через read_router:
+    на наименее загруженной исправной реплике или на основном сервере.
+    """
+    async with read_router.session() as session:
+        yield session
+
+
+async def get_building_db_session() -> LazyReadSession:
+    """
+    Dependency для получения отдельной сессии БД для BuildingRepo.
+    Запросы зданий и организаций в GeoSearchUseCase выполняются конкурентно,
+    а одна AsyncSession не допускает параллельных запросов.
+    Здания ищутся только с include_buildings, поэтому сервер выбирается и сессия
+    открывается при первом запросе: иначе она занимала бы слот пула и учитывалась
+    в outstanding при выборе реплики.
     """
-    async with async_session_maker() as session:
+    async with read_router.lazy_session() as session:
         yield session
 
 
 def get_organization_repo(session: AsyncSession = Depends(get_db_session)) -> OrganizationRepo:
     """
-    Dependency для создания OrganizationRepo
+    Dependency для создания OrganizationRepo, реализация выбирается по ORGANIZATION_FETCH_MODE
     """
-    return OrganizationRepo(session)
+    if settings.ORGANIZATION_FETCH_MODE == "snapshot" and directory_snapshot.current is not None:
+        return OrganizationSnapshotRepo(directory_snapshot.current)
+    if settings.ORGANIZATION_FETCH_MODE == "json":
+        return OrganizationJsonRepo(session, activity_taxonomy)
+    if settings.ORGANIZATION_FETCH_MODE == "core":
+        return OrganizationCoreRepo(session, activity_taxonomy)
+    return OrganizationRepo(session, activity_taxonomy)
 
 
-def get_building_repo(session: AsyncSession = Depends(get_db_session)) -> BuildingRepo:
+def get_building_repo(session: LazyReadSession = Depends(get_building_db_session)) -> BuildingRepo:
     """
-    Dependency для создания BuildingRepo
+    Dependency для создания BuildingRepo, в режиме snapshot - из снимка справочника
     """
+    if settings.ORGANIZATION_FETCH_MODE == "snapshot" and directory_snapshot.current is not None:
+        return BuildingSnapshotRepo(directory_snapshot.current)
     return BuildingRepo(session)
 
 
@@ -46,9 +126,12 @@ def get_organization_use_case(
     organization_repo: OrganizationRepo = Depends(get_organization_repo)
 ) -> GetOrganizationUseCase:
     """
-    Dependency для создания GetOrganizationUseCase
+    Dependency для создания GetOrganizationUseCase.
+    Ответы из снимка справочника не кешируются: они не дороже чтения из кеша.
     """
-    return GetOrganizationUseCase(organization_repo)
+    if isinstance(organization_repo, OrganizationSnapshotRepo):
+        return GetOrganizationUseCase(organization_repo)
+    return GetOrganizationUseCase(organization_repo, organization_result_cache)
 
 
 def get_geo_search_use_case(
@@ -58,5 +141,11 @@ def get_geo_search_use_case(
     """
     Dependency для создания GeoSearchUseCase
     """
-    return GeoSearchUseCase(organization_repo, building_repo)
+    return GeoSearchUseCase(
+        organization_repo,
+        building_repo,
+        None if isinstance(organization_repo, OrganizationSnapshotRepo) else geo_tile_cache,
+        cluster_max_cells=settings.CLUSTER_MAX_CELLS,
+        cluster_cells_per_tile=settings.CLUSTER_CELLS_PER_TILE
+    )
 
@@ -1,25 +1,124 @@
-from typing import List
+from typing import Annotated, List, Literal, Optional, Union
 from fastapi import APIRouter, HTTPException, Depends, Query
+from pydantic import StringConstraints
+from fastapi.responses import ORJSONResponse
 from app.api.dependencies import (
     verify_api_key,
     get_organization_use_case,
-    get_geo_search_use_case
+    get_geo_search_use_case,
+    get_page_params,
 )
+from app.api.pagination import (
+    PageParams,
+    ID_CURSOR,
+    RANK_CURSOR,
+    DISTANCE_CURSOR,
+    parse_cursor,
+    set_next_cursor,
+    id_key,
+    rank_key,
+    distance_key,
+)
+from app.api.streaming import stream_json_array
 from app.usecase.organization.get_organization import GetOrganizationUseCase
 from app.usecase.geo_search.search_use_case import GeoSearchUseCase
-from app.api.schemas.organization import OrganizationResponse, OrganizationSimpleResponse
-from app.api.schemas.geo_search import GeoSearchResponse
-from app.api.schemas.mappers import (
-    organization_entity_to_response,
-    organization_entity_to_simple_response,
-    organization_entity_to_with_building_response,
+from app.api.schemas.organization import (
+    OrganizationResponse,
+    OrganizationSimpleResponse,
+    OrganizationBatchRequest,
+    OrganizationBatchResponse
+)
+from app.api.schemas.geo_search import (
+    GeoSearchResponse,
+    GroupedGeoSearchResponse,
+    NearestSearchResponse,
+    GroupedNearestSearchResponse,
+    ClustersResponse
+)
+from app.api.schemas.mappers import cluster_entity_to_response
+from app.api.schemas.encoders import (
+    organization_entity_to_dict,
+    organization_entity_to_simple_dict,
+    organization_entity_to_with_building_dict,
+    organization_entity_to_with_distance_dict,
+    organization_entity_to_with_building_id_distance_dict,
+    organization_entities_to_geo_dict,
+    organization_entities_to_grouped_geo_dict,
+    organization_entities_to_nearest_dict,
 )
 from app.exceptions import NotFoundError, UseCaseExecutionError, DatabaseError
+from app.config import settings
 from app.logger import logger
 
 
 router = APIRouter(dependencies=[Depends(verify_api_key)])
 
+GeoResponseFormat = Literal["nested", "grouped"]
+
+# Строки поиска: пробелы по краям убираются до проверки минимальной длины
+ActivityNameQuery = Annotated[str, StringConstraints(strip_whitespace=True, min_length=1)]
+OrganizationNameQuery = Annotated[
+    str,
+    StringConstraints(strip_whitespace=True, min_length=settings.ORG_NAME_SEARCH_MIN_LENGTH)
+]
+
+# При order=distance организации поиска в радиусе содержат distance_meters
+RadiusSearchResponse = Union[
+    GeoSearchResponse,
+    GroupedGeoSearchResponse,
+    NearestSearchResponse,
+    GroupedNearestSearchResponse
+]
+
+geo_response_format_query = Query(
+    "nested",
+    alias="format",
+    description="nested - здание внутри каждой организации, grouped - здания отдельным словарем по ID"
+)
+
+stream_query = Query(
+    False,
+    description="Потоковый ответ: все организации после курсора без ограничения limit, "
+                "JSON отправляется чанками по мере чтения из БД"
+)
+
+GEO_STREAM_PREFIX = b'{"organizations":'
+GEO_STREAM_SUFFIX = b"}"
+
+
+def _geo_search_response(
+    entities: list,
+    response_format: GeoResponseFormat,
+    by_distance: bool = False
+) -> ORJSONResponse:
+    """
+    Формирование ответа геопоиска в запрошенном формате
+    :param entities: Найденные организации
+    :param response_format: Формат ответа
+    :param by_distance: Организации с расстоянием до точки (distance_meters)
+    :return: Ответ по схеме GeoSearchResponse или GroupedGeoSearchResponse,
+        с расстоянием - NearestSearchResponse или GroupedNearestSearchResponse
+    """
+    if response_format == "grouped":
+        if by_distance:
+            return ORJSONResponse(organization_entities_to_grouped_geo_dict(
+                entities,
+                organization_entity_to_with_building_id_distance_dict
+            ))
+        return ORJSONResponse(organization_entities_to_grouped_geo_dict(entities))
+
+    if by_distance:
+        return ORJSONResponse(organization_entities_to_nearest_dict(entities))
+    return ORJSONResponse(organization_entities_to_geo_dict(entities))
+
+
+def _check_geo_stream_format(stream: bool, response_format: GeoResponseFormat) -> None:
+    """
+    Формат grouped собирает словарь всех зданий ответа и не поддерживается в потоковом режиме
+    """
+    if stream and response_format == "grouped":
+        raise HTTPException(status_code=400, detail="format=grouped is not supported with stream=true")
+
 
 @router.get(
     "/by-building/{building_id}",
@@ -27,16 +126,27 @@ router = APIRouter(dependencies=[Depends(verify_api_key)])
 )
 async def get_organizations_by_building(
         building_id: str,
+        page: PageParams = Depends(get_page_params),
+        stream: bool = stream_query,
         use_case: GetOrganizationUseCase = Depends(get_organization_use_case)
 ) -> List[OrganizationSimpleResponse]:
     """
     handler поиска организаций по ID здания
     :param building_id: ID здания
+    :param page: Параметры страницы (limit, cursor).
+    :param stream: Потоковый ответ без ограничения размера страницы.
     :param use_case: Бизнес-логика для выполнения поиска организаций.
     :return: Объект ответа, содержащий список найденных организаций.
     """
+    after = parse_cursor(page.cursor, ID_CURSOR)
+    if stream:
+        use_case = use_case.streaming()
     try:
-        entities = await use_case.list_by_building(building_id)
+        entities = await use_case.list_by_building(
+            building_id,
+            limit=None if stream else page.limit,
+            after=after
+        )
     except NotFoundError as e:
         logger.warning("Failed to get organizations by building id: %s", building_id)
         raise HTTPException(status_code=404, detail=str(e))
@@ -44,7 +154,11 @@ async def get_organizations_by_building(
         logger.error("Error getting organizations by building id: %s", building_id, exc_info=True)
         raise HTTPException(status_code=500, detail="Internal server error")
     
-    return [organization_entity_to_simple_response(entity) for entity in entities]
+    if stream:
+        return stream_json_array(entities, organization_entity_to_simple_dict)
+    result = ORJSONResponse([organization_entity_to_simple_dict(entity) for entity in entities])
+    set_next_cursor(result, entities, page.limit, id_key)
+    return result
 
 
 @router.get(
@@ -52,17 +166,28 @@ async def get_organizations_by_building(
     response_model=List[OrganizationSimpleResponse]
 )
 async def get_organizations_by_activity_exact(
-    activity_name: str = Query(..., description="Название вида деятельности для поиска"),
+    activity_name: Annotated[ActivityNameQuery, Query(description="Название вида деятельности для поиска")],
+    page: PageParams = Depends(get_page_params),
+    stream: bool = stream_query,
     use_case: GetOrganizationUseCase = Depends(get_organization_use_case)
 ) -> List[OrganizationSimpleResponse]:
     """
     Получить организации, относящиеся только к указанному виду деятельности.
     :param activity_name: Название активности
+    :param page: Параметры страницы (limit, cursor).
+    :param stream: Потоковый ответ без ограничения размера страницы.
     :param use_case: Бизнес-логика для выполнения поиска по активности.
     :return: Объект ответа, содержащий список найденных организаций.
     """
+    after = parse_cursor(page.cursor, ID_CURSOR)
+    if stream:
+        use_case = use_case.streaming()
     try:
-        entities = await use_case.list_by_activity_exact(activity_name)
+        entities = await use_case.list_by_activity_exact(
+            activity_name,
+            limit=None if stream else page.limit,
+            after=after
+        )
     except NotFoundError as e:
         logger.warning("Failed to get organizations by activity name: %s", activity_name)
         raise HTTPException(status_code=404, detail=str(e))
@@ -70,7 +195,11 @@ async def get_organizations_by_activity_exact(
         logger.error("Error getting organizations by activity name: %s", activity_name, exc_info=True)
         raise HTTPException(status_code=500, detail="Internal server error")
     
-    return [organization_entity_to_simple_response(entity) for entity in entities]
+    if stream:
+        return stream_json_array(entities, organization_entity_to_simple_dict)
+    result = ORJSONResponse([organization_entity_to_simple_dict(entity) for entity in entities])
+    set_next_cursor(result, entities, page.limit, id_key)
+    return result
 
 
 @router.get(
@@ -78,18 +207,48 @@ async def get_organizations_by_activity_exact(
     response_model=List[OrganizationSimpleResponse]
 )
 async def get_organizations_by_activity_tree(
-    activity_name: str = Query(..., description="Название вида деятельности для поиска с учетом иерархии"),
+    activity_name: Annotated[
+        ActivityNameQuery,
+        Query(description="Название вида деятельности для поиска с учетом иерархии")
+    ],
+    up_depth: int = Query(
+        settings.ACTIVITY_TREE_DEFAULT_DEPTH,
+        ge=0,
+        le=settings.ACTIVITY_TREE_MAX_DEPTH,
+        description="Глубина поиска родительских видов деятельности"
+    ),
+    down_depth: int = Query(
+        settings.ACTIVITY_TREE_DEFAULT_DEPTH,
+        ge=0,
+        le=settings.ACTIVITY_TREE_MAX_DEPTH,
+        description="Глубина поиска дочерних видов деятельности"
+    ),
+    page: PageParams = Depends(get_page_params),
+    stream: bool = stream_query,
     use_case: GetOrganizationUseCase = Depends(get_organization_use_case)
 ) -> List[OrganizationSimpleResponse]:
     """
     Получить организации, относящиеся к указанному виду деятельности,
     а также к его дочерним и родительским видам.
     :param activity_name: Название вида деятельности
+    :param up_depth: Глубина поиска родительских видов деятельности.
+    :param down_depth: Глубина поиска дочерних видов деятельности.
+    :param page: Параметры страницы (limit, cursor).
+    :param stream: Потоковый ответ без ограничения размера страницы.
     :param use_case: Бизнес-логика для выполнения роиска по активности.
     :return: Объект ответа, содержащий список найденных организаций.
     """
+    after = parse_cursor(page.cursor, ID_CURSOR)
+    if stream:
+        use_case = use_case.streaming()
     try:
-        entities = await use_case.list_by_activity_tree(activity_name)
+        entities = await use_case.list_by_activity_tree(
+            activity_name,
+            up_depth=up_depth,
+            down_depth=down_depth,
+            limit=None if stream else page.limit,
+            after=after
+        )
     except NotFoundError as e:
         logger.warning("Failed to get organizations by activity tree: %s", activity_name)
         raise HTTPException(status_code=404, detail=str(e))
@@ -97,80 +256,211 @@ async def get_organizations_by_activity_tree(
         logger.error("Error getting organizations by activity tree: %s", activity_name, exc_info=True)
         raise HTTPException(status_code=500, detail="Internal server error")
     
-    return [organization_entity_to_simple_response(entity) for entity in entities]
+    if stream:
+        return stream_json_array(entities, organization_entity_to_simple_dict)
+    result = ORJSONResponse([organization_entity_to_simple_dict(entity) for entity in entities])
+    set_next_cursor(result, entities, page.limit, id_key)
+    return result
 
 
 @router.get(
     "/search/radius",
-    response_model=GeoSearchResponse
+    response_model=RadiusSearchResponse
 )
 async def search_by_radius(
         latitude: float = Query(..., ge=-90, le=90, description="Широта центральной точки"),
         longitude: float = Query(..., ge=-180, le=180, description="Долгота центральной точки"),
         radius_meters: float = Query(..., gt=0, description="Радиус поиска в метрах"),
+        order: Literal["id", "distance"] = Query(
+            "id",
+            description="Порядок организаций: id или distance - по расстоянию до точки, с полем distance_meters"
+        ),
+        response_format: GeoResponseFormat = geo_response_format_query,
+        page: PageParams = Depends(get_page_params),
+        stream: bool = stream_query,
         use_case: GeoSearchUseCase = Depends(get_geo_search_use_case)
-) -> GeoSearchResponse:
+) -> RadiusSearchResponse:
     """
     Поиск организаций в заданном радиусе от указанной географической точки.
     :param latitude: Широта центральной точки поиска.
     :param longitude: Долгота центральной точки поиска.
     :param radius_meters: Радиус поиска в метрах.
+    :param order: Порядок организаций - по ID или по расстоянию до точки.
+    :param response_format: Формат ответа (query параметр format): nested или grouped.
+    :param page: Параметры страницы (limit, cursor).
+    :param stream: Потоковый ответ без ограничения размера страницы, только в формате nested.
     :param use_case:Бизнес-логика для выполнения геопоиска.
     :return: Объект ответа, содержащий список найденных организаций.
     """
+    _check_geo_stream_format(stream, response_format)
+    by_distance = order == "distance"
+    after = parse_cursor(page.cursor, DISTANCE_CURSOR if by_distance else ID_CURSOR)
+    if stream:
+        use_case = use_case.streaming()
     try:
         org_entities, _ = await use_case.search_by_radius(
             latitude,
             longitude,
-            radius_meters
+            radius_meters,
+            order=order,
+            limit=None if stream else page.limit,
+            after=after
         )
     except (UseCaseExecutionError, DatabaseError) as e:
         logger.error("Error searching by radius: lat=%s, lon=%s, radius=%s", latitude, longitude, radius_meters, exc_info=True)
         raise HTTPException(status_code=500, detail="Internal server error")
 
-    organizations = [organization_entity_to_with_building_response(entity) for entity in org_entities]
-
-    return GeoSearchResponse(
-        organizations=organizations
-    )
+    if stream:
+        return stream_json_array(
+            org_entities,
+            (organization_entity_to_with_distance_dict if by_distance
+             else organization_entity_to_with_building_dict),
+            prefix=GEO_STREAM_PREFIX,
+            suffix=GEO_STREAM_SUFFIX
+        )
+    result = _geo_search_response(org_entities, response_format, by_distance)
+    set_next_cursor(result, org_entities, page.limit, distance_key if by_distance else id_key)
+    return result
 
 
 @router.get(
     "/search/rectangle",
-    response_model=GeoSearchResponse
+    response_model=Union[GeoSearchResponse, GroupedGeoSearchResponse]
 )
 async def search_by_rectangle(
         min_latitude: float = Query(..., ge=-90, le=90, description="Минимальная широта"),
         min_longitude: float = Query(..., ge=-180, le=180, description="Минимальная долгота"),
         max_latitude: float = Query(..., ge=-90, le=90, description="Максимальная широта"),
         max_longitude: float = Query(..., ge=-180, le=180, description="Максимальная долгота"),
+        response_format: GeoResponseFormat = geo_response_format_query,
+        page: PageParams = Depends(get_page_params),
+        stream: bool = stream_query,
         use_case: GeoSearchUseCase = Depends(get_geo_search_use_case)
-) -> GeoSearchResponse:
+) -> Union[GeoSearchResponse, GroupedGeoSearchResponse]:
     """
     Поиск организаций в заданной прямоугольной области на карте.
     :param min_latitude: Минимальная широта
     :param min_longitude: Минимальная долгота
     :param max_latitude: Максимальная широта
     :param max_longitude: Максимальная долгота
+    :param response_format: Формат ответа (query параметр format): nested или grouped.
+    :param page: Параметры страницы (limit, cursor).
+    :param stream: Потоковый ответ без ограничения размера страницы, только в формате nested.
     :param use_case: Бизнес‑логика для выполнения геопоиска.
     :return: Объект ответа, содержащий список найденных организаций
     """
+    _check_geo_stream_format(stream, response_format)
+    after = parse_cursor(page.cursor, ID_CURSOR)
+    if stream:
+        use_case = use_case.streaming()
     try:
         org_entities, _ = await use_case.search_by_rectangle(
             min_latitude,
             min_longitude,
             max_latitude,
-            max_longitude
+            max_longitude,
+            limit=None if stream else page.limit,
+            after=after
         )
     except (UseCaseExecutionError, DatabaseError) as e:
         logger.error("Error searching by rectangle: min_lat=%s, min_lon=%s, max_lat=%s, max_lon=%s", 
                     min_latitude, min_longitude, max_latitude, max_longitude, exc_info=True)
         raise HTTPException(status_code=500, detail="Internal server error")
 
-    organizations = [organization_entity_to_with_building_response(entity) for entity in org_entities]
+    if stream:
+        return stream_json_array(
+            org_entities,
+            organization_entity_to_with_building_dict,
+            prefix=GEO_STREAM_PREFIX,
+            suffix=GEO_STREAM_SUFFIX
+        )
+    result = _geo_search_response(org_entities, response_format)
+    set_next_cursor(result, org_entities, page.limit, id_key)
+    return result
+
 
-    return GeoSearchResponse(
-        organizations=organizations
+@router.get(
+    "/search/nearest",
+    response_model=NearestSearchResponse
+)
+async def search_nearest(
+        latitude: float = Query(..., ge=-90, le=90, description="Широта точки"),
+        longitude: float = Query(..., ge=-180, le=180, description="Долгота точки"),
+        k: int = Query(
+            settings.NEAREST_SEARCH_DEFAULT_K,
+            ge=1,
+            le=settings.NEAREST_SEARCH_MAX_K,
+            description="Количество ближайших организаций"
+        ),
+        activity_name: Optional[str] = Query(None, description="Точное название вида деятельности"),
+        use_case: GeoSearchUseCase = Depends(get_geo_search_use_case)
+) -> NearestSearchResponse:
+    """
+    Поиск k ближайших к точке организаций, с расстоянием до каждой.
+    :param latitude: Широта точки.
+    :param longitude: Долгота точки.
+    :param k: Количество ближайших организаций.
+    :param activity_name: Точное название вида деятельности для фильтрации.
+    :param use_case: Бизнес-логика для выполнения геопоиска.
+    :return: Объект ответа, содержащий организации по возрастанию расстояния.
+    """
+    try:
+        org_entities = await use_case.search_nearest(
+            latitude,
+            longitude,
+            k,
+            activity_name=activity_name
+        )
+    except (UseCaseExecutionError, DatabaseError) as e:
+        logger.error("Error searching nearest: lat=%s, lon=%s, k=%s", latitude, longitude, k, exc_info=True)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+    return ORJSONResponse(organization_entities_to_nearest_dict(org_entities))
+
+
+@router.get(
+    "/search/clusters",
+    response_model=ClustersResponse
+)
+async def search_clusters(
+        min_latitude: float = Query(..., ge=-90, le=90, description="Минимальная широта"),
+        min_longitude: float = Query(..., ge=-180, le=180, description="Минимальная долгота"),
+        max_latitude: float = Query(..., ge=-90, le=90, description="Максимальная широта"),
+        max_longitude: float = Query(..., ge=-180, le=180, description="Максимальная долгота"),
+        zoom: Optional[int] = Query(None, ge=0, le=22, description="Масштаб карты"),
+        grid_size: Optional[float] = Query(None, gt=0, description="Размер ячейки сетки в градусах"),
+        use_case: GeoSearchUseCase = Depends(get_geo_search_use_case)
+) -> ClustersResponse:
+    """
+    Кластеры организаций в прямоугольной области для карты в мелком масштабе:
+    количество организаций и их центр по ячейкам сетки. Размер ячейки задается
+    масштабом карты или явно и увеличивается, если ячеек получается слишком много.
+    :param min_latitude: Минимальная широта
+    :param min_longitude: Минимальная долгота
+    :param max_latitude: Максимальная широта
+    :param max_longitude: Максимальная долгота
+    :param zoom: Масштаб карты.
+    :param grid_size: Размер ячейки сетки в градусах.
+    :param use_case: Бизнес-логика для выполнения геопоиска.
+    :return: Объект ответа, содержащий размер ячейки и список кластеров.
+    """
+    try:
+        grid, clusters = await use_case.search_clusters(
+            min_latitude,
+            min_longitude,
+            max_latitude,
+            max_longitude,
+            grid_size=grid_size,
+            zoom=zoom
+        )
+    except (UseCaseExecutionError, DatabaseError) as e:
+        logger.error("Error clustering: min_lat=%s, min_lon=%s, max_lat=%s, max_lon=%s",
+                    min_latitude, min_longitude, max_latitude, max_longitude, exc_info=True)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+    return ClustersResponse(
+        grid_size=grid,
+        clusters=[cluster_entity_to_response(cluster) for cluster in clusters]
     )
 
 @router.get(
@@ -178,17 +468,31 @@ async def search_by_rectangle(
     response_model=List[OrganizationResponse]
 )
 async def get_org_by_name(
-    organization_name: str = Query(..., description="Часть названия организации для поиска"),
+    organization_name: Annotated[OrganizationNameQuery, Query(description="Часть названия организации для поиска")],
+    limit: int = Query(
+        settings.ORG_NAME_SEARCH_DEFAULT_LIMIT,
+        ge=1,
+        le=settings.ORG_NAME_SEARCH_MAX_LIMIT,
+        description="Максимальное количество результатов"
+    ),
+    cursor: Optional[str] = Query(
+        None,
+        description="Курсор следующей страницы из заголовка X-Next-Cursor"
+    ),
     use_case: GetOrganizationUseCase = Depends(get_organization_use_case)
 ) -> List[OrganizationResponse]:
     """
     Поиск организаций по части названия.
+    Результаты отсортированы по похожести названия на запрос.
     :param organization_name: Подстрока для поиска в названиях организаций.
+    :param limit: Максимальное количество результатов.
+    :param cursor: Курсор следующей страницы.
     :param use_case: Бизнес‑логика для получения организаций.
     :return: Список объектов организаций, соответствующих критериям поиска.
     """
+    after = parse_cursor(cursor, RANK_CURSOR)
     try:
-        entities = await use_case.get_by_name(organization_name)
+        entities = await use_case.get_by_name(organization_name, limit=limit, after=after)
     except NotFoundError as e:
         logger.warning("Failed to get organizations by name: %s", organization_name)
         raise HTTPException(status_code=404, detail=str(e))
@@ -196,7 +500,34 @@ async def get_org_by_name(
         logger.error("Error getting organizations by name: %s", organization_name, exc_info=True)
         raise HTTPException(status_code=500, detail="Internal server error")
     
-    return [organization_entity_to_response(entity) for entity in entities]
+    result = ORJSONResponse([organization_entity_to_dict(entity) for entity in entities])
+    set_next_cursor(result, entities, limit, rank_key)
+    return result
+
+@router.post(
+    "/batch",
+    response_model=OrganizationBatchResponse
+)
+async def get_orgs_by_ids(
+    request: OrganizationBatchRequest,
+    use_case: GetOrganizationUseCase = Depends(get_organization_use_case)
+) -> OrganizationBatchResponse:
+    """
+    Получает организации по списку ID одним запросом к БД.
+    :param request: Список ID, не больше ORGANIZATION_BATCH_MAX_IDS.
+    :param use_case: Бизнес‑логика для получения данных организаций.
+    :return: Организации по ID и список ID, для которых организации не найдены.
+    """
+    try:
+        organizations, missing = await use_case.get_by_ids(request.ids)
+    except (UseCaseExecutionError, DatabaseError) as e:
+        logger.error("Error getting organizations by ids: %d ids", len(request.ids), exc_info=True)
+        raise HTTPException(status_code=500, detail="Internal server error")
+    
+    return ORJSONResponse({
+        "organizations": {org_id: organization_entity_to_dict(entity) for org_id, entity in organizations.items()},
+        "missing": missing,
+    })
 
 @router.get(
     "/{org_id}",
@@ -221,4 +552,4 @@ async def get_org_by_id(
         logger.error("Error getting organization by id: %s", org_id, exc_info=True)
         raise HTTPException(status_code=500, detail="Internal server error")
     
-    return organization_entity_to_response(entity)
\ No newline at end of file
+    return ORJSONResponse(organization_entity_to_dict(entity))
\ No newline at end of file
@@ -0,0 +1,59 @@
+import os
+from typing import List
+from fastapi import APIRouter, Depends
+from fastapi.responses import ORJSONResponse
+from app.api.dependencies import verify_api_key, organization_result_cache, organization_shared_cache, geo_tile_cache
+from app.api.schemas.stats import PoolStatsResponse, ReadTargetStatsResponse, CacheStatsResponse
+from app.database import engine, read_router
+from app.pool import get_pool_stats
+
+
+router = APIRouter(dependencies=[Depends(verify_api_key)])
+
+
+@router.get(
+    "/pool",
+    response_model=PoolStatsResponse
+)
+async def get_db_pool_stats() -> ORJSONResponse:
+    """
+    handler статистики пула соединений с БД воркера, обработавшего запрос.
+    Для подбора DB_POOL_SIZE под max_connections Postgres значения нужно
+    собрать со всех воркеров (поле pid).
+    :return: Статистика пула соединений
+    """
+    return ORJSONResponse(get_pool_stats(engine.pool))
+
+
+@router.get(
+    "/replicas",
+    response_model=List[ReadTargetStatsResponse]
+)
+async def get_read_replicas_stats() -> ORJSONResponse:
+    """
+    handler состояния серверов чтения воркера, обработавшего запрос:
+    основной сервер и реплики DB_REPLICA_HOSTS с результатом последней проверки,
+    количеством открытых сессий и статистикой пула
+    :return: Список серверов, основной первым
+    """
+    return ORJSONResponse(read_router.stats())
+
+
+@router.get(
+    "/cache",
+    response_model=CacheStatsResponse
+)
+async def get_cache_stats() -> ORJSONResponse:
+    """
+    handler счетчиков кешей воркера, обработавшего запрос:
+    попадания, промахи, вытеснения и занятая память
+    :return: Счетчики кешей результатов организаций (процесса и общего) и кеша ячеек геопоиска
+    """
+    return ORJSONResponse({
+        "pid": os.getpid(),
+        "organizations": organization_result_cache.stats() if organization_result_cache is not None else None,
+        "organizations_shared": (
+            organization_shared_cache.stats() if organization_shared_cache is not None else None
+        ),
+        "geo_tiles": geo_tile_cache.stats() if geo_tile_cache is not None else None,
+    })
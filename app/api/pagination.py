@@ -0,0 +1,110 @@
+import base64
+import json
+from dataclasses import dataclass
+from typing import Callable, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Response, status
+
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Типы элементов ключа курсора для разных сортировок
+ID_CURSOR = (str,)
+RANK_CURSOR = (float, str)
+DISTANCE_CURSOR = (float, str)
+
+
+@dataclass
+class PageParams:
+    """
+    Параметры страницы списочного запроса
+    """
+    limit: int
+    cursor: Optional[str] = None
+
+
+def encode_cursor(key: Sequence) -> str:
+    """
+    Кодирование ключа сортировки в непрозрачный курсор
+    :param key: Ключ сортировки последнего элемента страницы
+    :return: Строка курсора
+    """
+
+    raw = json.dumps(list(key), ensure_ascii=False, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, types: Tuple[type, ...]) -> tuple:
+    """
+    Декодирование курсора в ключ сортировки
+    :param cursor: Строка курсора
+    :param types: Ожидаемые типы элементов ключа
+    :return: Ключ сортировки
+    :raises ValueError: Курсор поврежден или не соответствует типу сортировки
+    """
+
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        key = json.loads(raw)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Malformed cursor: %s" % e)
+
+    if not isinstance(key, list) or len(key) != len(types):
+        raise ValueError("Cursor does not match the sort key")
+
+    result = []
+    for value, expected in zip(key, types):
+        if expected is float and isinstance(value, int) and not isinstance(value, bool):
+            value = float(value)
+        if not isinstance(value, expected) or isinstance(value, bool):
+            raise ValueError("Cursor does not match the sort key")
+        result.append(value)
+    return tuple(result)
+
+
+def parse_cursor(cursor: Optional[str], types: Tuple[type, ...]) -> Optional[tuple]:
+    """
+    Декодирование курсора из query параметра, 400 при некорректном курсоре
+    :param cursor: Строка курсора или None для первой страницы
+    :param types: Ожидаемые типы элементов ключа
+    :return: Ключ сортировки или None
+    """
+
+    if cursor is None:
+        return None
+
+    try:
+        return decode_cursor(cursor, types)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def set_next_cursor(
+    response: Response,
+    items: Sequence,
+    limit: int,
+    key: Callable[[object], tuple]
+) -> None:
+    """
+    Записать курсор следующей страницы в заголовок ответа.
+    Курсор выдается, если страница заполнена полностью.
+    :param response: Ответ FastAPI
+    :param items: Элементы текущей страницы
+    :param limit: Размер страницы
+    :param key: Функция получения ключа сортировки элемента
+    """
+
+    if items and len(items) >= limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(key(items[-1]))
+
+
+def id_key(entity) -> tuple:
+    return (entity.id,)
+
+
+def rank_key(entity) -> tuple:
+    return (entity.search_rank, entity.id)
+
+
+def distance_key(entity) -> tuple:
+    return (entity.distance_order, entity.id)
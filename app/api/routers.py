@@ -1,7 +1,9 @@
 from fastapi import APIRouter
 from app.api.handlers.organizations.organizations import router as organizations_router
+from app.api.handlers.stats.stats import router as stats_router
 
 api_router = APIRouter(prefix="/api/v1")
 
 api_router.include_router(organizations_router, prefix="/organizations", tags=["organizations"])
+api_router.include_router(stats_router, prefix="/stats", tags=["stats"])
 
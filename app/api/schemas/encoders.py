@@ -0,0 +1,176 @@
+from typing import Any, Callable, Dict, List, Optional
+from app.entity.organization import OrganizationEntity
+from app.entity.building import BuildingEntity
+
+
+# Быстрый путь сериализации ответов: Entity преобразуются в dict той же структуры
+# и с тем же порядком полей, что и схемы из app.api.schemas, и сериализуются orjson.
+# Данные из репозиториев считаются доверенными, повторная валидация pydantic не нужна.
+# Схемы остаются response_model эндпоинтов и описывают ответ в OpenAPI,
+# соответствие dict схемам проверяется тестами.
+
+
+def _phone_numbers(entity: OrganizationEntity) -> List[str]:
+    if not entity.phones:
+        return []
+    return [phone.phone_number for phone in entity.phones]
+
+
+def building_entity_to_dict(entity: Optional[BuildingEntity]) -> Optional[Dict[str, Any]]:
+    """
+    Преобразование BuildingEntity в dict по схеме BuildingResponse
+    :param entity: BuildingEntity объект или None
+    :return: dict или None
+    """
+
+    if not entity:
+        return None
+
+    return {
+        "id": entity.id,
+        "address": entity.address,
+        "latitude": entity.latitude,
+        "longitude": entity.longitude,
+    }
+
+
+def organization_entity_to_dict(entity: OrganizationEntity) -> Dict[str, Any]:
+    """
+    Преобразование OrganizationEntity в dict по схеме OrganizationResponse
+    :param entity: OrganizationEntity объект
+    :return: dict
+    """
+
+    activities = None
+    if entity.activities:
+        activities = [
+            {"id": activity.id, "name": activity.name, "parent_id": activity.parent_id}
+            for activity in entity.activities
+        ]
+
+    phones = None
+    if entity.phones:
+        phones = [{"id": phone.id, "phone_number": phone.phone_number} for phone in entity.phones]
+
+    return {
+        "id": entity.id,
+        "title": entity.title,
+        "building_id": entity.building_id,
+        "building": building_entity_to_dict(entity.building),
+        "activities": activities,
+        "phones": phones,
+    }
+
+
+def organization_entity_to_simple_dict(entity: OrganizationEntity) -> Dict[str, Any]:
+    """
+    Преобразование OrganizationEntity в dict по схеме OrganizationSimpleResponse
+    :param entity: OrganizationEntity объект
+    :return: dict
+    """
+
+    return {
+        "title": entity.title,
+        "phones": _phone_numbers(entity),
+    }
+
+
+def organization_entity_to_with_building_dict(entity: OrganizationEntity) -> Dict[str, Any]:
+    """
+    Преобразование OrganizationEntity в dict по схеме OrganizationWithBuildingResponse
+    :param entity: OrganizationEntity объект
+    :return: dict
+    """
+
+    return {
+        "title": entity.title,
+        "phones": _phone_numbers(entity),
+        "building": building_entity_to_dict(entity.building),
+    }
+
+
+def organization_entity_to_with_building_id_dict(entity: OrganizationEntity) -> Dict[str, Any]:
+    """
+    Преобразование OrganizationEntity в dict по схеме OrganizationWithBuildingIdResponse
+    :param entity: OrganizationEntity объект
+    :return: dict
+    """
+
+    return {
+        "title": entity.title,
+        "phones": _phone_numbers(entity),
+        "building_id": entity.building_id,
+    }
+
+
+def organization_entity_to_with_distance_dict(entity: OrganizationEntity) -> Dict[str, Any]:
+    """
+    Преобразование OrganizationEntity в dict по схеме OrganizationWithDistanceResponse
+    :param entity: OrganizationEntity объект с заполненным distance_meters
+    :return: dict
+    """
+
+    return {
+        "title": entity.title,
+        "phones": _phone_numbers(entity),
+        "building": building_entity_to_dict(entity.building),
+        "distance_meters": entity.distance_meters,
+    }
+
+
+def organization_entity_to_with_building_id_distance_dict(entity: OrganizationEntity) -> Dict[str, Any]:
+    """
+    Преобразование OrganizationEntity в dict по схеме OrganizationWithBuildingIdDistanceResponse
+    :param entity: OrganizationEntity объект с заполненным distance_meters
+    :return: dict
+    """
+
+    return {
+        "title": entity.title,
+        "phones": _phone_numbers(entity),
+        "building_id": entity.building_id,
+        "distance_meters": entity.distance_meters,
+    }
+
+
+def organization_entities_to_geo_dict(entities: List[OrganizationEntity]) -> Dict[str, Any]:
+    """
+    Преобразование списка OrganizationEntity в dict по схеме GeoSearchResponse
+    :param entities: Список OrganizationEntity
+    :return: dict
+    """
+
+    return {"organizations": [organization_entity_to_with_building_dict(entity) for entity in entities]}
+
+
+def organization_entities_to_grouped_geo_dict(
+    entities: List[OrganizationEntity],
+    to_dict: Callable[[OrganizationEntity], Dict[str, Any]] = organization_entity_to_with_building_id_dict
+) -> Dict[str, Any]:
+    """
+    Преобразование списка OrganizationEntity в dict по схеме GroupedGeoSearchResponse
+    :param entities: Список OrganizationEntity
+    :param to_dict: Преобразование организации, organization_entity_to_with_building_id_distance_dict -
+        для схемы GroupedNearestSearchResponse
+    :return: dict
+    """
+
+    buildings = {}
+    for entity in entities:
+        if entity.building and entity.building.id not in buildings:
+            buildings[entity.building.id] = building_entity_to_dict(entity.building)
+
+    return {
+        "buildings": buildings,
+        "organizations": [to_dict(entity) for entity in entities],
+    }
+
+
+def organization_entities_to_nearest_dict(entities: List[OrganizationEntity]) -> Dict[str, Any]:
+    """
+    Преобразование списка OrganizationEntity в dict по схеме NearestSearchResponse
+    :param entities: Список OrganizationEntity с заполненным distance_meters
+    :return: dict
+    """
+
+    return {"organizations": [organization_entity_to_with_distance_dict(entity) for entity in entities]}
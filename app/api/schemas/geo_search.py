@@ -1,6 +1,12 @@
 from pydantic import BaseModel, Field
-from typing import List
-from app.api.schemas.organization import OrganizationWithBuildingResponse
+from typing import Dict, List
+from app.api.schemas.building import BuildingResponse
+from app.api.schemas.organization import (
+    OrganizationWithBuildingResponse,
+    OrganizationWithBuildingIdResponse,
+    OrganizationWithDistanceResponse,
+    OrganizationWithBuildingIdDistanceResponse
+)
 
 
 class RadiusSearchRequest(BaseModel):
@@ -28,3 +34,49 @@ class GeoSearchResponse(BaseModel):
     """
     organizations: List[OrganizationWithBuildingResponse] = Field(default_factory=list, description="Список организаций")
 
+
+class GroupedGeoSearchResponse(BaseModel):
+    """
+    Pydantic схема для ответа со зданиями, сгруппированными по ID.
+    Каждое здание передается один раз, организации ссылаются на него через building_id.
+    """
+    buildings: Dict[str, BuildingResponse] = Field(default_factory=dict, description="Здания по ID")
+    organizations: List[OrganizationWithBuildingIdResponse] = Field(default_factory=list, description="Список организаций")
+
+
+class NearestSearchResponse(BaseModel):
+    """
+    Pydantic схема для ответа поиска ближайших организаций
+    """
+    organizations: List[OrganizationWithDistanceResponse] = Field(
+        default_factory=list,
+        description="Организации по возрастанию расстояния"
+    )
+
+
+class GroupedNearestSearchResponse(BaseModel):
+    """
+    Pydantic схема для ответа поиска по расстоянию со зданиями, сгруппированными по ID
+    """
+    buildings: Dict[str, BuildingResponse] = Field(default_factory=dict, description="Здания по ID")
+    organizations: List[OrganizationWithBuildingIdDistanceResponse] = Field(
+        default_factory=list,
+        description="Организации по возрастанию расстояния"
+    )
+
+
+class ClusterResponse(BaseModel):
+    """
+    Pydantic схема для кластера организаций
+    """
+    latitude: float = Field(..., description="Широта центра организаций ячейки")
+    longitude: float = Field(..., description="Долгота центра организаций ячейки")
+    count: int = Field(..., description="Количество организаций в ячейке")
+
+
+class ClustersResponse(BaseModel):
+    """
+    Pydantic схема для ответа кластеризации
+    """
+    grid_size: float = Field(..., description="Фактический размер ячейки сетки в градусах")
+    clusters: List[ClusterResponse] = Field(default_factory=list, description="Кластеры организаций")
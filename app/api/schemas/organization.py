@@ -1,5 +1,6 @@
-from pydantic import BaseModel, ConfigDict
-from typing import List, Optional
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Dict, List, Optional
+from app.config import settings
 from app.api.schemas.activity import ActivityResponse
 from app.api.schemas.building import BuildingResponse
 
@@ -47,3 +48,58 @@ class OrganizationWithBuildingResponse(BaseModel):
     title: str
     phones: List[str] = []
     building: Optional[BuildingResponse] = None
+
+
+class OrganizationWithBuildingIdResponse(BaseModel):
+    """
+    Pydantic схема для Organization, только название, телефон и ID здания
+    """
+    model_config = ConfigDict(from_attributes=True)
+    
+    title: str
+    phones: List[str] = []
+    building_id: str
+
+
+class OrganizationWithDistanceResponse(BaseModel):
+    """
+    Pydantic схема для Organization, название, телефон, здание и расстояние до точки поиска
+    """
+    model_config = ConfigDict(from_attributes=True)
+    
+    title: str
+    phones: List[str] = []
+    building: Optional[BuildingResponse] = None
+    distance_meters: float
+
+
+class OrganizationWithBuildingIdDistanceResponse(BaseModel):
+    """
+    Pydantic схема для Organization, название, телефон, ID здания и расстояние до точки поиска
+    """
+    model_config = ConfigDict(from_attributes=True)
+    
+    title: str
+    phones: List[str] = []
+    building_id: str
+    distance_meters: float
+
+
+class OrganizationBatchRequest(BaseModel):
+    """
+    Pydantic схема для получения организаций по списку ID
+    """
+    ids: List[str] = Field(
+        ...,
+        min_length=1,
+        max_length=settings.ORGANIZATION_BATCH_MAX_IDS,
+        description="ID организаций"
+    )
+
+
+class OrganizationBatchResponse(BaseModel):
+    """
+    Pydantic схема для ответа со списком ID: найденные организации по ID и ID, которых нет
+    """
+    organizations: Dict[str, OrganizationResponse] = Field(default_factory=dict, description="Организации по ID")
+    missing: List[str] = Field(default_factory=list, description="ID, для которых организации не найдены")
@@ -0,0 +1,94 @@
+from typing import Optional
+from pydantic import BaseModel, Field
+
+
+class PoolStatsResponse(BaseModel):
+    """
+    Pydantic схема статистики пула соединений с БД одного воркера
+    """
+    pid: int = Field(..., description="PID воркера, у каждого воркера свой пул")
+    pool_class: str
+    size: int = Field(..., description="DB_POOL_SIZE")
+    max_overflow: int = Field(..., description="DB_POOL_MAX_OVERFLOW")
+    max_connections: int = Field(..., description="Максимум соединений воркера: size + max_overflow")
+    opened: int = Field(..., description="Открытых соединений")
+    checked_in: int = Field(..., description="Свободных соединений в пуле")
+    checked_out: int = Field(..., description="Занятых соединений")
+    overflow: int = Field(..., description="Открытых соединений сверх size")
+    checkouts: int = Field(..., description="Получений соединения из пула с момента старта")
+    timeouts: int = Field(..., description="Получений соединения, завершившихся таймаутом")
+    wait_seconds_total: float
+    wait_seconds_avg: float
+    wait_seconds_max: float
+
+
+class ReadTargetStatsResponse(BaseModel):
+    """
+    Pydantic схема состояния сервера чтения (основного или реплики) одного воркера
+    """
+    name: str = Field(..., description="host:port")
+    replica: bool
+    healthy: bool = Field(..., description="Результат последней проверки, основной сервер не проверяется")
+    outstanding: int = Field(..., description="Открытых сессий чтения")
+    pool: PoolStatsResponse
+
+
+class ResultCacheStatsResponse(BaseModel):
+    """
+    Pydantic схема счетчиков кеша результатов GetOrganizationUseCase
+    """
+    entries: int
+    bytes: int = Field(..., description="Оценка памяти значений в кеше")
+    max_bytes: int
+    hits: int
+    misses: int
+    hit_ratio: float
+    coalesced: int = Field(..., description="Промахи, дождавшиеся уже идущей загрузки того же ключа")
+    early_refreshes: int = Field(..., description="Ранние вероятностные обновления до истечения TTL")
+    evictions: int = Field(..., description="Вытеснения по размеру кеша")
+    expirations: int = Field(..., description="Удаления по TTL")
+    oversized: int = Field(..., description="Слишком большие значения, не сохраненные в кеш")
+    loading: int = Field(..., description="Загрузки, выполняющиеся сейчас")
+
+
+class SharedCacheStatsResponse(BaseModel):
+    """
+    Pydantic схема счетчиков общего для воркеров кеша результатов, счетчики - одного воркера
+    """
+    path: str
+    slots: int
+    arena_bytes: int
+    version: int = Field(..., description="Версия структуры сохраняемых Entity")
+    available: bool = Field(..., description="Сегмент памяти открыт, false - запросы идут мимо кеша")
+    hits: int
+    misses: int
+    hit_ratio: float
+    stores: int
+    refreshes: int = Field(..., description="Ранние обновления, загруженные мимо сегмента и записанные в него")
+    oversized: int = Field(..., description="Слишком большие значения, не сохраненные в кеш")
+    errors: int = Field(..., description="Ошибки доступа к сегменту и чтения значений")
+    torn_reads: int = Field(..., description="Чтения слота или данных во время их записи другим воркером")
+    overwritten: int = Field(..., description="Значения, данные которых уже перезаписаны новыми")
+    write_conflicts: int = Field(..., description="Записи, пропущенные, пока сегмент писал другой воркер")
+
+
+class TileCacheStatsResponse(BaseModel):
+    """
+    Pydantic схема счетчиков кеша ячеек сетки геопоиска
+    """
+    tiles: int
+    max_tiles: int
+    hits: int
+    misses: int
+    evictions: int = Field(..., description="Вытеснения по количеству ячеек")
+    expirations: int = Field(..., description="Удаления по TTL")
+
+
+class CacheStatsResponse(BaseModel):
+    """
+    Pydantic схема счетчиков кешей одного воркера, null - кеш выключен
+    """
+    pid: int
+    organizations: Optional[ResultCacheStatsResponse] = None
+    organizations_shared: Optional[SharedCacheStatsResponse] = None
+    geo_tiles: Optional[TileCacheStatsResponse] = None
@@ -0,0 +1,60 @@
+from typing import Any, AsyncIterator, Callable, Dict
+import orjson
+from fastapi.responses import StreamingResponse
+from app.repo.stream import EntityStream
+from app.exceptions import DatabaseError
+from app.config import settings
+from app.logger import logger
+
+
+def stream_json_array(
+    entities: EntityStream,
+    to_dict: Callable[[Any], Dict[str, Any]],
+    prefix: bytes = b"",
+    suffix: bytes = b"",
+    chunk_size: int = settings.STREAM_CHUNK_SIZE
+) -> StreamingResponse:
+    """
+    Ответ с JSON массивом, который сериализуется и отправляется чанками по мере
+    чтения потока организаций. Ошибка БД после начала ответа обрывает соединение,
+    клиент получает незавершенный JSON.
+    :param entities: Поток Entity
+    :param to_dict: Преобразование Entity в dict по схеме ответа (app.api.schemas.encoders)
+    :param prefix: Байты перед массивом, например b'{"organizations":'
+    :param suffix: Байты после массива, например b'}'
+    :param chunk_size: Количество элементов в одном чанке
+    :return: StreamingResponse
+    """
+
+    return StreamingResponse(
+        _json_array_chunks(entities, to_dict, prefix, suffix, chunk_size),
+        media_type="application/json"
+    )
+
+
+async def _json_array_chunks(
+    entities: EntityStream,
+    to_dict: Callable[[Any], Dict[str, Any]],
+    prefix: bytes,
+    suffix: bytes,
+    chunk_size: int
+) -> AsyncIterator[bytes]:
+    separator = b""
+    batch = []
+
+    try:
+        yield prefix + b"["
+        async for entity in entities:
+            batch.append(orjson.dumps(to_dict(entity)))
+            if len(batch) >= chunk_size:
+                yield separator + b",".join(batch)
+                separator, batch = b",", []
+
+        if batch:
+            yield separator + b",".join(batch)
+        yield b"]" + suffix
+    except DatabaseError:
+        logger.error("Error streaming response", exc_info=True)
+        raise
+    finally:
+        await entities.aclose()
@@ -1,5 +1,5 @@
 import os
-from typing import Literal
+from typing import List, Literal, Optional
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -13,15 +13,93 @@ class Settings(BaseSettings):
     DB_USER: str
     DB_PASS: str
 
+    # Пул соединений одного воркера: всего соединений с БД до WORKERS * (DB_POOL_SIZE + DB_POOL_MAX_OVERFLOW),
+    # запрос геопоиска может занимать два соединения (организации и здания)
+    DB_POOL_SIZE: int = 5
+    DB_POOL_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SECONDS: float = 30
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # Кеш подготовленных выражений asyncpg на соединение, 0 - без кеша
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    # Подключение через pgbouncer в режиме transaction: без кеша подготовленных выражений
+    # и с уникальными именами, т.к. соседние транзакции могут попасть на другое соединение сервера
+    DB_PGBOUNCER: bool = False
+    
+    # Реплики для чтения: JSON список "host" или "host:port" (порт по умолчанию DB_PORT),
+    # база, пользователь и пароль общие с DB_HOST. DB_HOST - основной сервер для миграций и записи,
+    # на него же идет чтение, если реплики не заданы или ни одна не прошла проверку.
+    # У каждой реплики в каждом воркере свой пул соединений с параметрами DB_POOL_*.
+    DB_REPLICA_HOSTS: List[str] = []
+    DB_REPLICA_HEALTH_CHECK_SECONDS: float = 5
+    DB_REPLICA_HEALTH_CHECK_TIMEOUT_SECONDS: float = 2
 
     API_KEY: str
 
+    # orm - ORM модели + selectinload, json - документы организаций собираются в Postgres,
+    # core - строки SQLAlchemy Core без ORM моделей, snapshot - снимок всего справочника в памяти
+    # процесса без запросов к БД (пока снимок не загружен - как orm)
+    ORGANIZATION_FETCH_MODE: Literal["orm", "json", "core", "snapshot"] = "orm"
+
+    PAGE_SIZE_DEFAULT: int = 50
+    PAGE_SIZE_MAX: int = 500
+    
+    # Потоковые ответы (stream=true): строк из серверного курсора за раз и организаций в одном чанке ответа
+    STREAM_BATCH_SIZE: int = 500
+    STREAM_CHUNK_SIZE: int = 100
+
+    ORG_NAME_SEARCH_MIN_LENGTH: int = 3
+    ORG_NAME_SEARCH_DEFAULT_LIMIT: int = 20
+    ORG_NAME_SEARCH_MAX_LIMIT: int = 100
+
+    NEAREST_SEARCH_DEFAULT_K: int = 10
+    NEAREST_SEARCH_MAX_K: int = 100
+
+    # Наибольшее количество ID в одном запросе POST /organizations/batch
+    ORGANIZATION_BATCH_MAX_IDS: int = 500
+    
+    # Кеш результатов поиска организаций по ID, зданию и виду деятельности в памяти процесса:
+    # LRU с ограничением суммарного размера и TTL, ранним вероятностным обновлением (0 - выключено)
+    ORGANIZATION_CACHE_ENABLED: bool = True
+    ORGANIZATION_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    ORGANIZATION_CACHE_TTL_SECONDS: float = 60
+    ORGANIZATION_CACHE_EARLY_REFRESH_BETA: float = 1.0
+    
+    # Второй уровень кеша результатов организаций, общий для воркеров хоста:
+    # сегмент памяти (mmap файла в /dev/shm) с индексом из SLOTS слотов и областью данных MAX_BYTES
+    ORGANIZATION_SHARED_CACHE_ENABLED: bool = False
+    ORGANIZATION_SHARED_CACHE_PATH: str = "/dev/shm/organization-result-cache"
+    ORGANIZATION_SHARED_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+    ORGANIZATION_SHARED_CACHE_SLOTS: int = 16384
+    ORGANIZATION_SHARED_CACHE_TTL_SECONDS: float = 30
+    
+    # Кеш поиска в прямоугольной области по ячейкам сетки (размер ячейки в градусах)
+    GEO_TILE_CACHE_ENABLED: bool = True
+    GEO_TILE_SIZE_DEGREES: float = 0.01
+    GEO_TILE_CACHE_MAX_TILES: int = 10000
+    GEO_TILE_CACHE_TTL_SECONDS: float = 30
+    GEO_TILE_CACHE_MAX_TILES_PER_QUERY: int = 400
+
+    # Кластеризация: максимальное количество ячеек сетки в ответе и ячеек на тайл карты
+    CLUSTER_MAX_CELLS: int = 2500
+    CLUSTER_CELLS_PER_TILE: int = 4
+
+    # Период проверки версии дерева видов деятельности в памяти процесса, 0 - без обновления
+    ACTIVITY_TAXONOMY_REFRESH_SECONDS: float = 30
+
+    # Период проверки версии снимка справочника (ORGANIZATION_FETCH_MODE=snapshot), 0 - без обновления
+    SNAPSHOT_REFRESH_SECONDS: float = 60
+    
+    # Глубина поиска по иерархии видов деятельности (вверх и вниз) по умолчанию и максимальная
+    ACTIVITY_TREE_DEFAULT_DEPTH: int = 2
+    ACTIVITY_TREE_MAX_DEPTH: int = 10
+
     model_config = SettingsConfigDict(
         env_file=os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".env.prod")
     )
 
 settings = Settings()
 
-def get_db_url():
+def get_db_url(host: Optional[str] = None, port: Optional[int] = None):
     return (f"postgresql+asyncpg://{settings.DB_USER}:{settings.DB_PASS}@"
-            f"{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}")
+            f"{host or settings.DB_HOST}:{port or settings.DB_PORT}/{settings.DB_NAME}")
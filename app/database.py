@@ -1,16 +1,79 @@
+from typing import Tuple
+from uuid import uuid4
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncAttrs
 from sqlalchemy.orm import DeclarativeBase, declared_attr
 
-from app.config import get_db_url
+from app.config import settings, get_db_url
+from app.pool import MonitoredQueuePool
+from app.replicas import ReadRouter, ReadTarget
+
+
+def _prepared_statement_name() -> str:
+    return f"__asyncpg_{uuid4()}__"
+
+
+def get_database_params() -> dict:
+    """
+    Параметры create_async_engine: пул соединений и кеш подготовленных выражений asyncpg.
+    В режиме DB_PGBOUNCER подготовленные выражения не кешируются ни SQLAlchemy, ни asyncpg
+    и получают уникальные имена: в режиме transaction pgbouncer следующий запрос
+    может выполниться на другом соединении сервера, где выражения с таким именем нет или оно другое.
+    :return: Именованные параметры create_async_engine
+    """
+
+    statement_cache_size = 0 if settings.DB_PGBOUNCER else settings.DB_STATEMENT_CACHE_SIZE
+    connect_args = {
+        "prepared_statement_cache_size": statement_cache_size,
+        "statement_cache_size": statement_cache_size,
+    }
+    if settings.DB_PGBOUNCER:
+        connect_args["prepared_statement_name_func"] = _prepared_statement_name
+    
+    return {
+        "poolclass": MonitoredQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_POOL_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "connect_args": connect_args,
+    }
 
 
 DATABASE_URL = get_db_url()
-DATABASE_PARAMS = {}
+DATABASE_PARAMS = get_database_params()
+
+def parse_replica_host(value: str) -> Tuple[str, int]:
+    """
+    Разбор адреса реплики из DB_REPLICA_HOSTS
+    :param value: "host" или "host:port"
+    :return: Хост и порт, по умолчанию DB_PORT
+    """
+
+    host, _, port = value.strip().partition(":")
+    return host, int(port) if port else settings.DB_PORT
+
 
 engine = create_async_engine(DATABASE_URL, **DATABASE_PARAMS)
 async_session_maker = async_sessionmaker(engine, expire_on_commit=False)
 
 
+def _read_target(name: str, url: str) -> ReadTarget:
+    target_engine = create_async_engine(url, **DATABASE_PARAMS)
+    return ReadTarget(name, target_engine, async_sessionmaker(target_engine, expire_on_commit=False))
+
+
+# Сессии чтения API: реплики из DB_REPLICA_HOSTS, основной сервер - если исправных реплик нет
+read_router = ReadRouter(
+    primary=ReadTarget("%s:%s" % (settings.DB_HOST, settings.DB_PORT), engine, async_session_maker),
+    replicas=[
+        _read_target("%s:%s" % (host, port), get_db_url(host, port))
+        for host, port in map(parse_replica_host, settings.DB_REPLICA_HOSTS)
+    ],
+    check_timeout=settings.DB_REPLICA_HEALTH_CHECK_TIMEOUT_SECONDS,
+)
+
+
 class Base(AsyncAttrs, DeclarativeBase):
     __abstract__ = True
 
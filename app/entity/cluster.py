@@ -0,0 +1,11 @@
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True, slots=True)
+class ClusterEntity:
+    """
+    Entity класс для кластера организаций в ячейке сетки
+    """
+    latitude: float
+    longitude: float
+    count: int
@@ -1,10 +1,12 @@
 from app.entity.mappers.activity_mapper import ActivityMapper
 from app.entity.mappers.building_mapper import BuildingMapper
 from app.entity.mappers.organization_mapper import OrganizationMapper
+from app.entity.mappers.organization_document_mapper import OrganizationDocumentMapper
 
 __all__ = [
     "ActivityMapper",
     "BuildingMapper",
     "OrganizationMapper",
+    "OrganizationDocumentMapper",
 ]
 
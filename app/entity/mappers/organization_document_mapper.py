@@ -0,0 +1,63 @@
+from typing import Any, Dict, Iterable, List, Optional
+from app.entity.protocols import EntityMapper
+from app.entity.organization import OrganizationEntity, OrganizationPhoneEntity
+from app.entity.activity import ActivityEntity
+from app.entity.building import BuildingEntity
+from app.entity.mappers.shared import shared_entity
+
+
+class OrganizationDocumentMapper(EntityMapper[Dict[str, Any], OrganizationEntity]):
+    """
+    Маппер для преобразования JSON документа организации в OrganizationEntity.
+    Формат документа совпадает с OrganizationResponse.
+    """
+
+    def to_entities(self, models: Iterable[Dict[str, Any]]) -> List[OrganizationEntity]:
+        """
+        Преобразует пачку JSON документов организаций в OrganizationEntity.
+        Здания и виды деятельности, общие для нескольких организаций пачки, создаются один раз.
+        :param models: Декодированные JSON документы организаций
+        :return: Список OrganizationEntity объектов
+        """
+
+        buildings: Dict[str, BuildingEntity] = {}
+        activities: Dict[int, ActivityEntity] = {}
+        return [self.to_entity(model, buildings, activities) for model in models]
+    
+    def to_entity(
+        self,
+        model: Dict[str, Any],
+        buildings: Optional[Dict[str, BuildingEntity]] = None,
+        activities: Optional[Dict[int, ActivityEntity]] = None
+    ) -> OrganizationEntity:
+        """
+        Преобразует JSON документ организации в OrganizationEntity
+        :param model: Декодированный JSON документ организации
+        :param buildings: Уже созданные здания пачки по ID
+        :param activities: Уже созданные виды деятельности пачки по ID
+        :return: OrganizationEntity объект
+        """
+
+        building: Optional[BuildingEntity] = None
+        if model.get("building"):
+            building = shared_entity(buildings, model["building"]["id"], BuildingEntity, **model["building"])
+
+        activity_entities: Optional[List[ActivityEntity]] = None
+        if model.get("activities"):
+            activity_entities = [
+                shared_entity(activities, activity["id"], ActivityEntity, **activity)
+                for activity in model["activities"]
+            ]
+
+        phones: Optional[List[OrganizationPhoneEntity]] = None
+        if model.get("phones"):
+            phones = [OrganizationPhoneEntity(**phone) for phone in model["phones"]]
+
+        return OrganizationEntity(
+            id=model["id"],
+            title=model["title"],
+            building_id=model["building_id"],
+            building=building,
+            activities=activity_entities,
+            phones=phones,
+        )
@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Dict, Iterable, List, Optional
 from app.entity.protocols import EntityMapper
 from app.entity.organization import OrganizationEntity, OrganizationPhoneEntity
 from app.entity.activity import ActivityEntity
@@ -6,6 +6,7 @@ from app.entity.building import BuildingEntity
 from app.repo.organization.models import Organization, OrganizationPhone
 from app.entity.mappers.activity_mapper import ActivityMapper
 from app.entity.mappers.building_mapper import BuildingMapper
+from app.entity.mappers.shared import shared_entity
 
 
 class OrganizationMapper(EntityMapper[Organization, OrganizationEntity]):
@@ -17,21 +18,44 @@ class OrganizationMapper(EntityMapper[Organization, OrganizationEntity]):
         self._activity_mapper = ActivityMapper()
         self._building_mapper = BuildingMapper()
     
-    def to_entity(self, model: Organization) -> OrganizationEntity:
+    def to_entities(self, models: Iterable[Organization]) -> List[OrganizationEntity]:
+        """
+        Преобразует пачку SQLAlchemy Organization моделей в OrganizationEntity.
+        Здания и виды деятельности, общие для нескольких организаций пачки,
+        преобразуются один раз, и организации ссылаются на один и тот же Entity.
+        :param models: SQLAlchemy Organization модели
+        :return: Список OrganizationEntity объектов
+        """
+
+        buildings: Dict[str, BuildingEntity] = {}
+        activities: Dict[int, ActivityEntity] = {}
+        return [self.to_entity(model, buildings, activities) for model in models]
+    
+    def to_entity(
+        self,
+        model: Organization,
+        buildings: Optional[Dict[str, BuildingEntity]] = None,
+        activities: Optional[Dict[int, ActivityEntity]] = None
+    ) -> OrganizationEntity:
         """
         Преобразует SQLAlchemy Organization модель в OrganizationEntity
         :param model: SQLAlchemy Organization модель
+        :param buildings: Уже преобразованные здания пачки по ID
+        :param activities: Уже преобразованные виды деятельности пачки по ID
         :return: OrganizationEntity объект
         """
 
         building: Optional[BuildingEntity] = None
         if model.building:
-            building = self._building_mapper.to_entity(model.building)
+            building = shared_entity(buildings, model.building.id, self._building_mapper.to_entity, model.building)
         
 
-        activities: Optional[List[ActivityEntity]] = None
+        activity_entities: Optional[List[ActivityEntity]] = None
         if model.activities:
-            activities = [self._activity_mapper.to_entity(activity) for activity in model.activities]
+            activity_entities = [
+                shared_entity(activities, activity.id, self._activity_mapper.to_entity, activity)
+                for activity in model.activities
+            ]
         
 
         phones: Optional[List[OrganizationPhoneEntity]] = None
@@ -49,7 +73,7 @@ class OrganizationMapper(EntityMapper[Organization, OrganizationEntity]):
             title=model.title,
             building_id=model.building_id,
             building=building,
-            activities=activities,
+            activities=activity_entities,
             phones=phones,
         )
 
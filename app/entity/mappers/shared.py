@@ -0,0 +1,28 @@
+from typing import Callable, Dict, Hashable, Optional, TypeVar
+
+TEntity = TypeVar("TEntity")
+
+
+def shared_entity(
+    entities: Optional[Dict[Hashable, TEntity]],
+    key: Hashable,
+    factory: Callable[..., TEntity],
+    /,
+    *args,
+    **kwargs
+) -> TEntity:
+    """
+    Entity из словаря уже созданных Entity пачки, чтобы организации пачки ссылались на один объект
+    :param entities: Словарь пачки по ID или None, если Entity не разделяются
+    :param key: ID модели, документа или строки
+    :param factory: Создание Entity, вызывается с args и kwargs, только если ключа нет в словаре
+    :return: Entity объект
+    """
+
+    if entities is None:
+        return factory(*args, **kwargs)
+    
+    entity = entities.get(key)
+    if entity is None:
+        entity = entities[key] = factory(*args, **kwargs)
+    return entity
@@ -4,7 +4,7 @@ from app.entity.activity import ActivityEntity
 from app.entity.building import BuildingEntity
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class OrganizationPhoneEntity:
     """
     Entity класс для OrganizationPhone
@@ -13,7 +13,7 @@ class OrganizationPhoneEntity:
     phone_number: str
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class OrganizationEntity:
     """
     Entity класс для Organization
@@ -24,4 +24,11 @@ class OrganizationEntity:
     building: Optional[BuildingEntity] = None
     activities: Optional[List[ActivityEntity]] = None
     phones: Optional[List[OrganizationPhoneEntity]] = None
+    # Похожесть названия на строку поиска, заполняется только при поиске по названию
+    search_rank: Optional[float] = None
+    # Расстояние до точки поиска в метрах по сфероиду, заполняется при поиске ближайших
+    # и при поиске в радиусе по расстоянию
+    distance_meters: Optional[float] = None
+    # Ключ сортировки по расстоянию (<->, по сфере) для курсора поиска в радиусе, в ответ не попадает
+    distance_order: Optional[float] = None
 
@@ -1,14 +1,74 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from fastapi.exception_handlers import request_validation_exception_handler
 from app.api.routers import api_router
+from app.config import settings
+from app.database import async_session_maker, read_router
+from app.repo.activity.taxonomy import activity_taxonomy
+from app.repo.snapshot.snapshot import directory_snapshot
+from app.exceptions import DatabaseQueryError
+from app.logger import logger
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Загрузка дерева видов деятельности в память при старте и его периодическое обновление.
+    Если дерево не загрузилось, поиск по видам деятельности работает через запросы к БД.
+    Проверка реплик чтения при старте и периодически.
+    В режиме snapshot - загрузка снимка справочника и его периодическое обновление,
+    пока снимок не загружен, запросы идут в БД.
+    """
+
+    try:
+        async with async_session_maker() as session:
+            await activity_taxonomy.load(session)
+    except (DatabaseQueryError, OSError) as e:
+        logger.warning("Activity taxonomy was not loaded at startup: %s", e)
+    
+    snapshot_mode = settings.ORGANIZATION_FETCH_MODE == "snapshot"
+    if snapshot_mode:
+        try:
+            async with async_session_maker() as session:
+                snapshot = await directory_snapshot.load(session)
+            logger.info("Directory snapshot loaded: %d organizations", len(snapshot))
+        except (DatabaseQueryError, OSError) as e:
+            logger.warning("Directory snapshot was not loaded at startup: %s", e)
+    
+    background_tasks = []
+    if settings.ACTIVITY_TAXONOMY_REFRESH_SECONDS > 0:
+        background_tasks.append(asyncio.create_task(
+            activity_taxonomy.run_refresh_loop(async_session_maker, settings.ACTIVITY_TAXONOMY_REFRESH_SECONDS)
+        ))
+    
+    if snapshot_mode and settings.SNAPSHOT_REFRESH_SECONDS > 0:
+        background_tasks.append(asyncio.create_task(
+            directory_snapshot.run_refresh_loop(async_session_maker, settings.SNAPSHOT_REFRESH_SECONDS)
+        ))
+    
+    if read_router.replicas:
+        await read_router.check_all()
+        background_tasks.append(asyncio.create_task(
+            read_router.run_health_checks(settings.DB_REPLICA_HEALTH_CHECK_SECONDS)
+        ))
+    
+    yield
+    
+    for task in background_tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+
 
 app = FastAPI(
     title="Luna Test API",
     description="API сервер с аутентификацией по статическому API ключу",
     version="1.0.0",
     default_response_class=JSONResponse,
+    lifespan=lifespan,
 )
 
 
@@ -13,6 +13,7 @@ from app.database import Base, DATABASE_URL
 from app.repo.organization.models import Organization, OrganizationPhone
 from app.repo.building.models import Building
 from app.repo.activity.models import Activity
+from app.repo.snapshot.models import directory_version
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -0,0 +1,43 @@
+"""add buildings geography index
+
+Revision ID: 3b9d2c7e41a5
+Revises: 0f87162cdc37
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b9d2c7e41a5'
+down_revision: Union[str, Sequence[str], None] = '0f87162cdc37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Индекс по выражению geography: ST_DWithin(geom::geography, ...) не может
+    # использовать idx_buildings_geom, построенный по geometry
+    op.create_index(
+        'idx_buildings_geog',
+        'buildings',
+        [sa.text('(CAST(geom AS geography(POINT,4326)))')],
+        postgresql_using='gist',
+        if_not_exists=True,
+    )
+    op.execute("ANALYZE buildings")
+
+
+def downgrade() -> None:
+    """
+    Downgrade schema."""
+    op.drop_index(
+        'idx_buildings_geog',
+        table_name='buildings',
+        postgresql_using='gist',
+        if_exists=True,
+    )
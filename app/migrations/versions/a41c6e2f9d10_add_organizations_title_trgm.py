@@ -0,0 +1,48 @@
+"""add organizations title trigram search
+
+Revision ID: a41c6e2f9d10
+Revises: 3b9d2c7e41a5
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a41c6e2f9d10'
+down_revision: Union[str, Sequence[str], None] = '3b9d2c7e41a5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # Хранимая нормализованная колонка: lower + ё -> е
+    op.add_column(
+        'organizations',
+        sa.Column(
+            'title_normalized',
+            sa.String(length=100),
+            sa.Computed("translate(lower(title), 'ё', 'е')", persisted=True),
+            nullable=False,
+        )
+    )
+    op.create_index(
+        'idx_organizations_title_trgm',
+        'organizations',
+        ['title_normalized'],
+        postgresql_using='gin',
+        postgresql_ops={'title_normalized': 'gin_trgm_ops'},
+    )
+
+
+def downgrade() -> None:
+    """
+    Downgrade schema."""
+    op.drop_index('idx_organizations_title_trgm', table_name='organizations', postgresql_using='gin')
+    op.drop_column('organizations', 'title_normalized')
@@ -0,0 +1,40 @@
+"""add pagination indexes
+
+Revision ID: c7e5a0b3f812
+Revises: a41c6e2f9d10
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e5a0b3f812'
+down_revision: Union[str, Sequence[str], None] = 'a41c6e2f9d10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Keyset пагинация по id внутри здания: WHERE building_id = :id AND id > :after ORDER BY id
+    op.create_index('idx_organizations_building_id', 'organizations', ['building_id', 'id'])
+    # Поиск организаций по виду деятельности (PK начинается с organization_id)
+    op.create_index(
+        'idx_organization_activities_activity',
+        'organization_activities',
+        ['activity_id', 'organization_id']
+    )
+    # selectinload телефонов страницы организаций
+    op.create_index('idx_organization_phones_organization_id', 'organization_phones', ['organization_id'])
+
+
+def downgrade() -> None:
+    """
+    Downgrade schema."""
+    op.drop_index('idx_organization_phones_organization_id', table_name='organization_phones')
+    op.drop_index('idx_organization_activities_activity', table_name='organization_activities')
+    op.drop_index('idx_organizations_building_id', table_name='organizations')
@@ -0,0 +1,87 @@
+"""add activity closure table
+
+Revision ID: e2a8f4c61b07
+Revises: c7e5a0b3f812
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a8f4c61b07'
+down_revision: Union[str, Sequence[str], None] = 'c7e5a0b3f812'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Полный пересчет замыкания рекурсивным запросом по activities
+FILL_CLOSURE_SQL = """
+    INSERT INTO activity_closure (ancestor_id, descendant_id, depth)
+    WITH RECURSIVE paths (ancestor_id, descendant_id, depth) AS (
+        SELECT id, id, 0
+        FROM activities
+        UNION ALL
+        SELECT paths.ancestor_id, activities.id, paths.depth + 1
+        FROM paths
+        JOIN activities ON activities.parent_id = paths.descendant_id
+    )
+    SELECT ancestor_id, descendant_id, depth FROM paths
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('activity_closure',
+    sa.Column('ancestor_id', sa.Integer(), nullable=False),
+    sa.Column('descendant_id', sa.Integer(), nullable=False),
+    sa.Column('depth', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['ancestor_id'], ['activities.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['descendant_id'], ['activities.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('ancestor_id', 'descendant_id')
+    )
+    op.create_index(
+        'idx_activity_closure_descendant',
+        'activity_closure',
+        ['descendant_id', 'ancestor_id']
+    )
+    
+    op.execute(FILL_CLOSURE_SQL)
+    
+    # Дерево видов деятельности маленькое и меняется редко, поэтому замыкание
+    # пересчитывается целиком после каждого изменяющего запроса. Так порядок строк
+    # в многострочном INSERT (потомок раньше родителя) не влияет на результат.
+    # Блокировка сериализует параллельные пересчеты. Цикл в дереве дает повторную
+    # пару (id, id) и откатывает изменение по нарушению первичного ключа.
+    op.execute(
+        """
+        CREATE FUNCTION refresh_activity_closure() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            LOCK TABLE activity_closure IN EXCLUSIVE MODE;
+            DELETE FROM activity_closure;
+        """ + FILL_CLOSURE_SQL + """;
+            RETURN NULL;
+        END;
+        $$
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER trg_activities_closure
+        AFTER INSERT OR DELETE OR UPDATE OF id, parent_id ON activities
+        FOR EACH STATEMENT EXECUTE FUNCTION refresh_activity_closure()
+        """
+    )
+
+
+def downgrade() -> None:
+    """
+    Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS trg_activities_closure ON activities")
+    op.execute("DROP FUNCTION IF EXISTS refresh_activity_closure()")
+    op.drop_index('idx_activity_closure_descendant', table_name='activity_closure')
+    op.drop_table('activity_closure')
@@ -0,0 +1,65 @@
+"""add directory version counter
+
+Revision ID: f3b1d9a27c54
+Revises: e2a8f4c61b07
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b1d9a27c54'
+down_revision: Union[str, Sequence[str], None] = 'e2a8f4c61b07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Таблицы снимка справочника (app.repo.snapshot.snapshot.SNAPSHOT_TABLES)
+DIRECTORY_TABLES = ('buildings', 'organizations', 'activities', 'organization_activities', 'organization_phones')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('directory_version',
+    sa.Column('id', sa.SmallInteger(), nullable=False),
+    sa.Column('version', sa.BigInteger(), server_default='0', nullable=False),
+    sa.CheckConstraint('id = 1', name='ck_directory_version_single_row'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute("INSERT INTO directory_version (id, version) VALUES (1, 0)")
+    
+    # Счетчик увеличивается один раз на изменяющий запрос (FOR EACH STATEMENT), в той же
+    # транзакции, поэтому снимок справочника сверяет одну строку вместо хеша всех таблиц.
+    # Изменения справочника редкие, сериализация пишущих транзакций на этой строке допустима.
+    op.execute(
+        """
+        CREATE FUNCTION bump_directory_version() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            UPDATE directory_version SET version = version + 1 WHERE id = 1;
+            RETURN NULL;
+        END;
+        $$
+        """
+    )
+    for table in DIRECTORY_TABLES:
+        op.execute(
+            """
+            CREATE TRIGGER trg_%s_directory_version
+            AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON %s
+            FOR EACH STATEMENT EXECUTE FUNCTION bump_directory_version()
+            """ % (table, table)
+        )
+
+
+def downgrade() -> None:
+    """
+    Downgrade schema."""
+    for table in DIRECTORY_TABLES:
+        op.execute("DROP TRIGGER IF EXISTS trg_%s_directory_version ON %s" % (table, table))
+    op.execute("DROP FUNCTION IF EXISTS bump_directory_version()")
+    op.drop_table('directory_version')
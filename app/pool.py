@@ -0,0 +1,81 @@
+import os
+import time
+from dataclasses import dataclass
+from sqlalchemy import exc
+from typing import Optional
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from app.config import settings
+
+
+@dataclass(slots=True)
+class PoolWaitStats:
+    """
+    Накопленная статистика получения соединений из пула с момента старта процесса.
+    Время включает ожидание свободного соединения, открытие нового (overflow) и pre-ping,
+    checkouts учитывает и попытки, завершившиеся таймаутом.
+    """
+    checkouts: int = 0
+    timeouts: int = 0
+    wait_seconds_total: float = 0.0
+    wait_seconds_max: float = 0.0
+    
+    def add(self, seconds: float) -> None:
+        self.checkouts += 1
+        self.wait_seconds_total += seconds
+        if seconds > self.wait_seconds_max:
+            self.wait_seconds_max = seconds
+
+
+class MonitoredQueuePool(AsyncAdaptedQueuePool):
+    """
+    AsyncAdaptedQueuePool, замеряющий время получения соединения.
+    Счетчики занятых соединений и overflow берутся из самого QueuePool.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+    
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            self.wait_stats.timeouts += 1
+            raise
+        finally:
+            self.wait_stats.add(time.perf_counter() - started)
+
+
+def get_pool_stats(pool: QueuePool, max_overflow: Optional[int] = None) -> dict:
+    """
+    Текущее состояние пула соединений процесса (воркера gunicorn).
+    Каждый воркер держит свой пул, поэтому для сравнения с max_connections Postgres
+    max_connections нужно умножить на количество воркеров.
+    :param pool: Пул соединений engine
+    :param max_overflow: max_overflow, с которым создан пул, по умолчанию DB_POOL_MAX_OVERFLOW
+        (параметр get_database_params): QueuePool не отдает его публично
+    :return: Словарь статистики по схеме PoolStatsResponse
+    """
+
+    if max_overflow is None:
+        max_overflow = settings.DB_POOL_MAX_OVERFLOW
+    wait_stats = getattr(pool, "wait_stats", None) or PoolWaitStats()
+    checkouts = wait_stats.checkouts
+    
+    return {
+        "pid": os.getpid(),
+        "pool_class": type(pool).__name__,
+        "size": pool.size(),
+        "max_overflow": max_overflow,
+        "max_connections": pool.size() + max(max_overflow, 0),
+        "opened": pool.size() + pool.overflow(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),
+        "checkouts": checkouts,
+        "timeouts": wait_stats.timeouts,
+        "wait_seconds_total": wait_stats.wait_seconds_total,
+        "wait_seconds_avg": wait_stats.wait_seconds_total / checkouts if checkouts else 0.0,
+        "wait_seconds_max": wait_stats.wait_seconds_max,
+    }
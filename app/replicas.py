@@ -0,0 +1,177 @@
+import asyncio
+from contextlib import AsyncExitStack, asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, List, Optional
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy.exc import SQLAlchemyError
+from app.pool import get_pool_stats
+from app.logger import logger
+
+
+HEALTH_CHECK_QUERY = text("SELECT 1")
+
+
+@dataclass(slots=True, eq=False)
+class ReadTarget:
+    """
+    Сервер БД, с которого читают сессии: основной или реплика
+    """
+    name: str
+    engine: AsyncEngine
+    session_maker: async_sessionmaker
+    healthy: bool = True
+    # Открытые сейчас сессии чтения, в том числе потоковых ответов
+    outstanding: int = 0
+
+
+class LazyReadSession:
+    """
+    Сессия чтения, которая выбирает сервер и открывается только при первом запросе.
+    До первого запроса она не учитывается в outstanding и не берет соединение из пула.
+    """
+
+    def __init__(self, router: "ReadRouter"):
+        """
+        :param router: Распределение сессий чтения
+        """
+
+        self._router = router
+        self._stack = AsyncExitStack()
+        self._session: Optional[AsyncSession] = None
+    
+    @property
+    def opened(self) -> bool:
+        return self._session is not None
+    
+    async def execute(self, statement, params=None, **kwargs):
+        """
+        AsyncSession.execute() на сессии, открываемой при первом вызове
+        """
+
+        if self._session is None:
+            self._session = await self._stack.enter_async_context(self._router.session())
+        return await self._session.execute(statement, params, **kwargs)
+    
+    async def close(self) -> None:
+        """
+        Закрытие сессии, если она была открыта
+        """
+
+        await self._stack.aclose()
+        self._session = None
+
+
+class ReadRouter:
+    """
+    Распределение сессий чтения по репликам.
+    Сессия открывается на исправной реплике с наименьшим количеством открытых сессий
+    (least outstanding requests), при равенстве реплики чередуются.
+    Если исправных реплик нет (или они не заданы), сессия открывается на основном сервере.
+    Исправность реплик проверяется периодическим запросом SELECT 1.
+    """
+
+    def __init__(self, primary: ReadTarget, replicas: List[ReadTarget], check_timeout: float):
+        """
+        :param primary: Основной сервер
+        :param replicas: Реплики
+        :param check_timeout: Таймаут проверки реплики в секундах
+        """
+
+        self.primary = primary
+        self.replicas = replicas
+        self._check_timeout = check_timeout
+        self._turn = 0
+    
+    def choose(self) -> ReadTarget:
+        """
+        Выбор сервера для новой сессии чтения
+        :return: Реплика или основной сервер
+        """
+
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return self.primary
+        
+        start = self._turn % len(healthy)
+        self._turn += 1
+        return min(healthy[start:] + healthy[:start], key=lambda replica: replica.outstanding)
+    
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator[AsyncSession]:
+        """
+        Сессия чтения на выбранном сервере, открыта до выхода из контекста
+        """
+
+        target = self.choose()
+        target.outstanding += 1
+        try:
+            async with target.session_maker() as session:
+                yield session
+        finally:
+            target.outstanding -= 1
+    
+    @asynccontextmanager
+    async def lazy_session(self) -> AsyncIterator[LazyReadSession]:
+        """
+        Сессия чтения, открываемая при первом запросе, открыта до выхода из контекста.
+        Для зависимостей, которые нужны не каждому запросу эндпоинта.
+        """
+
+        session = LazyReadSession(self)
+        try:
+            yield session
+        finally:
+            await session.close()
+    
+    async def check(self, replica: ReadTarget) -> bool:
+        """
+        Проверка реплики запросом SELECT 1, результат сохраняется в replica.healthy
+        :param replica: Реплика
+        :return: Исправна ли реплика
+        """
+
+        try:
+            async with asyncio.timeout(self._check_timeout):
+                async with replica.engine.connect() as connection:
+                    await connection.execute(HEALTH_CHECK_QUERY)
+            healthy = True
+        except (SQLAlchemyError, OSError, TimeoutError) as e:
+            healthy = False
+            if replica.healthy:
+                logger.warning("Read replica %s is unhealthy: %s", replica.name, e)
+        
+        if healthy and not replica.healthy:
+            logger.info("Read replica %s is healthy again", replica.name)
+        replica.healthy = healthy
+        return healthy
+    
+    async def check_all(self) -> None:
+        await asyncio.gather(*(self.check(replica) for replica in self.replicas))
+    
+    async def run_health_checks(self, interval: float) -> None:
+        """
+        Периодическая проверка всех реплик
+        :param interval: Период проверки в секундах
+        """
+
+        while True:
+            await asyncio.sleep(interval)
+            await self.check_all()
+    
+    def stats(self) -> List[dict]:
+        """
+        Состояние серверов чтения процесса
+        :return: Список по схеме ReadTargetStatsResponse, основной сервер первым
+        """
+
+        return [
+            {
+                "name": target.name,
+                "replica": target is not self.primary,
+                "healthy": target.healthy,
+                "outstanding": target.outstanding,
+                "pool": get_pool_stats(target.engine.pool),
+            }
+            for target in [self.primary, *self.replicas]
+        ]
@@ -4,12 +4,27 @@ from sqlalchemy import (
     String,
     ForeignKey,
     UniqueConstraint,
+    Table,
+    Index,
 )
 from sqlalchemy.orm import relationship
 from app.database import Base
 from app.repo.organization.models import organization_activities
 
 
+# Транзитивное замыкание дерева видов деятельности: все пары (предок, потомок)
+# с расстоянием между ними, включая пару (id, id, 0).
+# Поддерживается триггером на activities (миграция e2a8f4c61b07).
+activity_closure = Table(
+    "activity_closure",
+    Base.metadata,
+    Column("ancestor_id", Integer, ForeignKey("activities.id", ondelete="CASCADE"), primary_key=True),
+    Column("descendant_id", Integer, ForeignKey("activities.id", ondelete="CASCADE"), primary_key=True),
+    Column("depth", Integer, nullable=False),
+    Index("idx_activity_closure_descendant", "descendant_id", "ancestor_id"),
+)
+
+
 class Activity(Base):
     __tablename__ = "activities"
 
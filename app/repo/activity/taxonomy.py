@@ -0,0 +1,180 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Iterable, Mapping, Optional, Tuple
+from sqlalchemy import select, literal_column
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.sql import func
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from app.repo.activity.models import Activity
+from app.exceptions import DatabaseQueryError
+from app.logger import logger
+
+
+@dataclass(frozen=True)
+class ActivityTaxonomy:
+    """
+    Неизменяемый снимок дерева видов деятельности.
+    ancestors/descendants - для каждого id словарь {id предка/потомка: расстояние},
+    включая сам id с расстоянием 0.
+    """
+    version: str
+    ids_by_name: Mapping[str, frozenset]
+    parents: Mapping[int, Optional[int]]
+    children: Mapping[int, frozenset]
+    ancestors: Mapping[int, Mapping[int, int]]
+    descendants: Mapping[int, Mapping[int, int]]
+    
+    @classmethod
+    def build(cls, rows: Iterable[Tuple[int, str, Optional[int]]], version: str) -> "ActivityTaxonomy":
+        """
+        Построение снимка по строкам таблицы activities
+        :param rows: Кортежи (id, name, parent_id)
+        :param version: Версия содержимого таблицы
+        :return: ActivityTaxonomy
+        """
+
+        ids_by_name = {}
+        parents = {}
+        children = {}
+        
+        for activity_id, name, parent_id in rows:
+            ids_by_name.setdefault(name.strip().lower(), set()).add(activity_id)
+            parents[activity_id] = parent_id
+            children.setdefault(activity_id, set())
+            if parent_id is not None:
+                children.setdefault(parent_id, set()).add(activity_id)
+        
+        ancestors = {}
+        for activity_id in parents:
+            chain = {activity_id: 0}
+            current, depth = parents[activity_id], 1
+            # Защита от цикла в данных: предок, уже попавший в цепочку, завершает обход
+            while current is not None and current not in chain:
+                chain[current] = depth
+                current, depth = parents.get(current), depth + 1
+            ancestors[activity_id] = chain
+        
+        descendants = {activity_id: {} for activity_id in parents}
+        for activity_id, chain in ancestors.items():
+            for ancestor_id, depth in chain.items():
+                if ancestor_id in descendants:
+                    descendants[ancestor_id][activity_id] = depth
+        
+        return cls(
+            version=version,
+            ids_by_name={name: frozenset(ids) for name, ids in ids_by_name.items()},
+            parents=parents,
+            children={activity_id: frozenset(ids) for activity_id, ids in children.items()},
+            ancestors=ancestors,
+            descendants=descendants,
+        )
+    
+    def resolve(self, activity_name: str) -> frozenset:
+        """
+        ID видов деятельности с указанным названием (без учета регистра)
+        :param activity_name: Название вида деятельности
+        :return: Множество ID
+        """
+
+        return self.ids_by_name.get(activity_name.strip().lower(), frozenset())
+    
+    def hierarchy_ids(self, activity_name: str, up_depth: int, down_depth: int) -> frozenset:
+        """
+        ID видов деятельности с указанным названием, их предков и потомков
+        :param activity_name: Название вида деятельности
+        :param up_depth: Максимальное расстояние до предка
+        :param down_depth: Максимальное расстояние до потомка
+        :return: Множество ID
+        """
+
+        result = set()
+        for activity_id in self.resolve(activity_name):
+            result.update(i for i, d in self.descendants.get(activity_id, {}).items() if d <= down_depth)
+            result.update(i for i, d in self.ancestors.get(activity_id, {}).items() if d <= up_depth)
+        return frozenset(result)
+
+
+def _version_query():
+    """
+    Версия содержимого activities - md5 от всех строк в порядке id
+    """
+
+    row = func.concat(Activity.id, ":", Activity.parent_id, ":", Activity.name)
+    rows = func.string_agg(row, aggregate_order_by(literal_column("E'\\n'"), Activity.id))
+    return select(func.md5(func.coalesce(rows, "")))
+
+
+class ActivityTaxonomyCache:
+    """
+    Кеш дерева видов деятельности в памяти процесса.
+    Снимок заменяется целиком одной операцией присваивания, поэтому
+    конкурентные запросы всегда видят согласованное дерево.
+    """
+
+    def __init__(self):
+        self._taxonomy: Optional[ActivityTaxonomy] = None
+    
+    @property
+    def current(self) -> Optional[ActivityTaxonomy]:
+        """Текущий снимок или None, если дерево еще не загружено"""
+        return self._taxonomy
+    
+    async def load(self, session: AsyncSession) -> ActivityTaxonomy:
+        """
+        Загрузить дерево из БД и заменить текущий снимок
+        :param session: Сессия БД
+        :return: Новый снимок
+        """
+
+        try:
+            version = await self._fetch_version(session)
+            result = await session.execute(select(Activity.id, Activity.name, Activity.parent_id))
+            taxonomy = ActivityTaxonomy.build(result.all(), version)
+        except SQLAlchemyError as e:
+            raise DatabaseQueryError("Error loading activity taxonomy: %s" % e)
+        
+        self._taxonomy = taxonomy
+        return taxonomy
+    
+    async def refresh(self, session: AsyncSession) -> bool:
+        """
+        Перезагрузить дерево, если версия activities изменилась
+        :param session: Сессия БД
+        :return: True, если снимок был заменен
+        """
+
+        try:
+            version = await self._fetch_version(session)
+        except SQLAlchemyError as e:
+            raise DatabaseQueryError("Error checking activity taxonomy version: %s" % e)
+        
+        if self._taxonomy is not None and self._taxonomy.version == version:
+            return False
+        
+        await self.load(session)
+        return True
+    
+    async def run_refresh_loop(self, session_maker: async_sessionmaker, interval: float) -> None:
+        """
+        Периодическая проверка версии дерева, ошибки логируются и не прерывают цикл
+        :param session_maker: Фабрика сессий БД
+        :param interval: Период проверки в секундах
+        """
+
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                async with session_maker() as session:
+                    if await self.refresh(session):
+                        logger.info("Activity taxonomy reloaded, version %s", self._taxonomy.version)
+            except (DatabaseQueryError, OSError) as e:
+                logger.warning("Activity taxonomy refresh failed: %s", e)
+    
+    @staticmethod
+    async def _fetch_version(session: AsyncSession) -> str:
+        result = await session.execute(_version_query())
+        return result.scalar_one()
+
+
+activity_taxonomy = ActivityTaxonomyCache()
@@ -0,0 +1,129 @@
+from sqlalchemy import bindparam, cast, Float
+from geoalchemy2 import functions as geo_func
+from geoalchemy2.types import Geography
+from app.repo.building.models import Building
+
+
+# Тип приведения должен совпадать с выражением индекса idx_buildings_geog,
+# иначе планировщик не сможет использовать индекс
+GEOGRAPHY_POINT = Geography(geometry_type="POINT", srid=4326)
+
+
+def float_param(name: str):
+    """
+    Именованный bind параметр с плавающей точкой для запросов, которые собираются один раз
+    и выполняются со значениями из словаря параметров
+    :param name: Имя параметра
+    :return: SQL bind параметр
+    """
+
+    return bindparam(name, type_=Float)
+
+
+def make_point(latitude: float, longitude: float):
+    """
+    Построить точку (SRID 4326) по координатам
+    :param latitude: Широта
+    :param longitude: Долгота
+    :return: SQL выражение geometry точки
+    """
+
+    return geo_func.ST_SetSRID(
+        geo_func.ST_MakePoint(longitude, latitude),
+        4326
+    )
+
+
+def point_geography(latitude: float, longitude: float):
+    """
+    Точка по координатам в виде geography
+    :param latitude: Широта
+    :param longitude: Долгота
+    :return: SQL выражение geography точки
+    """
+
+    return cast(make_point(latitude, longitude), GEOGRAPHY_POINT)
+
+
+def building_geography():
+    """
+    Выражение geography для колонки Building.geom, покрытое индексом idx_buildings_geog
+    :return: SQL выражение
+    """
+
+    return cast(Building.geom, GEOGRAPHY_POINT)
+
+
+def within_radius(latitude: float, longitude: float, radius_meters: float):
+    """
+    Условие попадания здания в радиус от точки.
+    ST_DWithin для geography через support-функцию PostGIS добавляет
+    bbox-префильтр (&&) по индексу idx_buildings_geog, поэтому поиск
+    не сканирует всю таблицу, а результат совпадает с точной проверкой.
+    :param latitude: Широта центральной точки
+    :param longitude: Долгота центральной точки
+    :param radius_meters: Радиус поиска в метрах
+    :return: SQL условие
+    """
+
+    return geo_func.ST_DWithin(
+        building_geography(),
+        point_geography(latitude, longitude),
+        radius_meters
+    )
+
+
+def distance_meters(latitude: float, longitude: float):
+    """
+    Расстояние от здания до точки в метрах (по сфероиду, как ST_DWithin).
+    Индекс для него не используется, поэтому выражение выбирается только в списке колонок
+    и вычисляется один раз на строку ответа, а сортировка идет по distance_order().
+    :param latitude: Широта точки
+    :param longitude: Долгота точки
+    :return: SQL выражение
+    """
+
+    return geo_func.ST_Distance(building_geography(), point_geography(latitude, longitude))
+
+
+def distance_order(latitude: float, longitude: float):
+    """
+    Ключ сортировки по расстоянию от здания до точки - расстояние в метрах по сфере.
+    Оператор <-> для geography обходит индекс idx_buildings_geog в порядке расстояния (KNN),
+    поэтому ORDER BY по этому выражению с LIMIT читает только первые строки по удаленности.
+    ST_Distance (по сфероиду) так использовать нельзя - он не поддерживается индексом.
+    :param latitude: Широта точки
+    :param longitude: Долгота точки
+    :return: SQL выражение
+    """
+
+    return building_geography().op("<->", return_type=Float)(point_geography(latitude, longitude))
+
+
+def envelope_param():
+    """
+    Прямоугольник из bind параметров min_latitude, min_longitude, max_latitude, max_longitude
+    :return: SQL выражение geometry прямоугольника
+    """
+
+    return geo_func.ST_MakeEnvelope(
+        float_param("min_longitude"),
+        float_param("min_latitude"),
+        float_param("max_longitude"),
+        float_param("max_latitude"),
+        4326
+    )
+
+
+def envelope_params(min_latitude: float, min_longitude: float, max_latitude: float, max_longitude: float) -> dict:
+    """
+    Значения параметров envelope_param()
+    :return: Словарь параметров запроса
+    """
+
+    return {
+        "min_latitude": min_latitude,
+        "min_longitude": min_longitude,
+        "max_latitude": max_latitude,
+        "max_longitude": max_longitude,
+    }
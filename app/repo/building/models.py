@@ -2,10 +2,12 @@ from sqlalchemy import (
     Column,
     String,
     Float,
-    CheckConstraint
+    CheckConstraint,
+    Index,
+    cast,
 )
 from sqlalchemy.orm import relationship
-from geoalchemy2 import Geometry
+from geoalchemy2 import Geometry, Geography
 from app.database import Base
 import uuid
 
@@ -31,4 +33,9 @@ class Building(Base):
         CheckConstraint(
             "longitude >= -180 AND longitude <= 180", name="chk_longitude"
         ),
+        Index(
+            "idx_buildings_geog",
+            cast(geom, Geography(geometry_type="POINT", srid=4326)),
+            postgresql_using="gist",
+        ),
     )
\ No newline at end of file
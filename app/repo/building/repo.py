@@ -1,18 +1,35 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, cast
+from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError
 from geoalchemy2 import functions as geo_func
-from geoalchemy2.types import Geography
 from app.repo.building.models import Building
+from app.repo.building.geo import within_radius, float_param, envelope_param, envelope_params
 from app.entity.building import BuildingEntity
-from app.entity.mappers.building_mapper import BuildingMapper
 from app.exceptions import DatabaseQueryError
 
 
+buildings = Building.__table__
+
+# Колонки BuildingEntity в порядке полей: строки запроса преобразуются в Entity без ORM моделей
+BUILDING_COLUMNS = (buildings.c.id, buildings.c.address, buildings.c.latitude, buildings.c.longitude)
+
+# Запросы собираются один раз, значения передаются параметрами при выполнении
+BUILDINGS_BY_RADIUS = (
+    select(*BUILDING_COLUMNS)
+    .where(within_radius(float_param("latitude"), float_param("longitude"), float_param("radius_meters")))
+)
+
+BUILDINGS_BY_RECTANGLE = (
+    select(*BUILDING_COLUMNS)
+    .where(
+        geo_func.ST_Within(Building.geom, envelope_param())
+    )
+)
+
+
 class BuildingRepo:
     def __init__(self, session: AsyncSession):
         self.session = session
-        self._mapper = BuildingMapper()
 
     async def list_by_radius(
         self, 
@@ -28,24 +45,10 @@ class BuildingRepo:
         :return: Список зданий в радиусе
         """
 
-        center_point = geo_func.ST_SetSRID(
-            geo_func.ST_MakePoint(longitude, latitude),
-            4326
-        )
-
-        stmt = (
-            select(Building)
-            .where(
-                geo_func.ST_DWithin(
-                    cast(Building.geom, Geography),
-                    cast(center_point, Geography),
-                    radius_meters
-                )
-            )
-        )
+        params = {"latitude": latitude, "longitude": longitude, "radius_meters": radius_meters}
         
         try:
-            result = await self.session.execute(stmt)
+            result = await self.session.execute(BUILDINGS_BY_RADIUS, params)
         except SQLAlchemyError as e:
             raise DatabaseQueryError("Error listing buildings by radius (lat=%s, lon=%s, radius=%s m): %s"
                                      % (
@@ -56,9 +59,7 @@ class BuildingRepo:
                                      )
                                      )
 
-        models = list(result.scalars().all())
-
-        return [self._mapper.to_entity(model) for model in models]
+        return [BuildingEntity(*row) for row in result]
 
     async def list_by_rectangle(
         self,
@@ -76,23 +77,10 @@ class BuildingRepo:
         :return: Список зданий в прямоугольной области
         """
 
-        envelope = geo_func.ST_MakeEnvelope(
-            min_longitude,
-            min_latitude,
-            max_longitude,
-            max_latitude,
-            4326
-        )
-
-        stmt = (
-            select(Building)
-            .where(
-                geo_func.ST_Within(Building.geom, envelope)
-            )
-        )
+        params = envelope_params(min_latitude, min_longitude, max_latitude, max_longitude)
         
         try:
-            result = await self.session.execute(stmt)
+            result = await self.session.execute(BUILDINGS_BY_RECTANGLE, params)
         except SQLAlchemyError as e:
             raise DatabaseQueryError("Error listing buildings by rectangle (min_lat=%s, min_lon=%s, \
             max_lat=%s, max_lon=%s): %s"
@@ -105,6 +93,4 @@ class BuildingRepo:
                                      )
                                      )
 
-        models = list(result.scalars().all())
-
-        return [self._mapper.to_entity(model) for model in models]
+        return [BuildingEntity(*row) for row in result]
@@ -0,0 +1,108 @@
+from functools import lru_cache
+from typing import Dict, List
+from sqlalchemy import select, String
+from sqlalchemy.sql import Select
+from app.repo.organization.models import Organization, OrganizationPhone, organization_activities
+from app.repo.organization.repo import OrganizationRepo
+from app.repo.query import any_of
+from app.repo.activity.models import Activity
+from app.repo.building.repo import BUILDING_COLUMNS, buildings
+from app.entity.organization import OrganizationEntity, OrganizationPhoneEntity
+from app.entity.activity import ActivityEntity
+from app.entity.building import BuildingEntity
+from app.entity.mappers.shared import shared_entity
+
+
+organizations = Organization.__table__
+phones = OrganizationPhone.__table__
+activities = Activity.__table__
+
+ORGANIZATION_COLUMNS = (organizations.c.id, organizations.c.title, organizations.c.building_id)
+
+BUILDINGS_BY_IDS = select(*BUILDING_COLUMNS).where(any_of(buildings.c.id, "building_ids", String))
+
+ACTIVITIES_BY_ORGANIZATION_IDS = (
+    select(
+        organization_activities.c.organization_id,
+        activities.c.id,
+        activities.c.name,
+        activities.c.parent_id
+    )
+    .join_from(organization_activities, activities, organization_activities.c.activity_id == activities.c.id)
+    .where(any_of(organization_activities.c.organization_id, "organization_ids", String))
+)
+
+PHONES_BY_ORGANIZATION_IDS = (
+    select(phones.c.organization_id, phones.c.id, phones.c.phone_number)
+    .where(any_of(phones.c.organization_id, "organization_ids", String))
+)
+
+
+@lru_cache(maxsize=None)
+def _with_columns(stmt: Select) -> Select:
+    """
+    Запрос организаций с колонками ORGANIZATION_COLUMNS вместо ORM модели,
+    дополнительные колонки сохраняются. Собирается один раз для каждого запроса OrganizationRepo.
+    :param stmt: select(Organization, ...)
+    :return: select(id, title, building_id, ...)
+    """
+
+    extra = [column["expr"] for column in stmt.column_descriptions[1:]]
+    return stmt.with_only_columns(*ORGANIZATION_COLUMNS, *extra, maintain_column_froms=True)
+
+
+class OrganizationCoreRepo(OrganizationRepo):
+    """
+    Репозиторий организаций, читающий строки через SQLAlchemy Core без ORM моделей:
+    выбираются только нужные колонки, Entity собираются прямо из кортежей.
+    Здания, виды деятельности и телефоны загружаются тремя запросами по ID организаций,
+    как selectinload, но без identity map и инструментирования моделей.
+    В потоковом режиме используется ORM путь OrganizationRepo.
+    """
+
+    async def _fetch_all(self, stmt: Select, params: dict) -> list[OrganizationEntity]:
+        result = await self.session.execute(_with_columns(stmt), params)
+        rows = result.all()
+        if not rows:
+            return []
+
+        organization_ids = [row[0] for row in rows]
+        buildings_by_id = await self._fetch_buildings(list({row[2] for row in rows}))
+        activities_by_organization = await self._fetch_activities(organization_ids)
+        phones_by_organization = await self._fetch_phones(organization_ids)
+
+        extra_names = rows[0]._fields[len(ORGANIZATION_COLUMNS):]
+        return [
+            OrganizationEntity(
+                id=row[0],
+                title=row[1],
+                building_id=row[2],
+                building=buildings_by_id.get(row[2]),
+                activities=activities_by_organization.get(row[0]),
+                phones=phones_by_organization.get(row[0]),
+                **dict(zip(extra_names, row[len(ORGANIZATION_COLUMNS):]))
+            )
+            for row in rows
+        ]
+
+    async def _fetch_buildings(self, building_ids: List[str]) -> Dict[str, BuildingEntity]:
+        result = await self.session.execute(BUILDINGS_BY_IDS, {"building_ids": building_ids})
+        return {row[0]: BuildingEntity(*row) for row in result}
+
+    async def _fetch_activities(self, organization_ids: List[str]) -> Dict[str, List[ActivityEntity]]:
+        result = await self.session.execute(ACTIVITIES_BY_ORGANIZATION_IDS, {"organization_ids": organization_ids})
+
+        entities: Dict[int, ActivityEntity] = {}
+        by_organization: Dict[str, List[ActivityEntity]] = {}
+        for organization_id, activity_id, name, parent_id in result:
+            activity = shared_entity(entities, activity_id, ActivityEntity, activity_id, name, parent_id)
+            by_organization.setdefault(organization_id, []).append(activity)
+        return by_organization
+
+    async def _fetch_phones(self, organization_ids: List[str]) -> Dict[str, List[OrganizationPhoneEntity]]:
+        result = await self.session.execute(PHONES_BY_ORGANIZATION_IDS, {"organization_ids": organization_ids})
+
+        by_organization: Dict[str, List[OrganizationPhoneEntity]] = {}
+        for organization_id, phone_id, phone_number in result:
+            by_organization.setdefault(organization_id, []).append(OrganizationPhoneEntity(phone_id, phone_number))
+        return by_organization
@@ -0,0 +1,130 @@
+import orjson
+from functools import lru_cache
+from sqlalchemy import select, String, literal_column
+from sqlalchemy.orm import aliased
+from sqlalchemy.sql import func, Select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from app.repo.organization.models import Organization, OrganizationPhone, organization_activities
+from app.repo.organization.repo import OrganizationRepo
+from app.repo.query import with_extra
+from app.repo.activity.models import Activity
+from app.repo.building.models import Building
+from app.entity.organization import OrganizationEntity
+from app.entity.mappers.organization_document_mapper import OrganizationDocumentMapper
+
+
+def _key(name: str):
+    """
+    Ключ JSON объекта как константа SQL, а не bind параметр
+    :param name: Имя ключа
+    :return: SQL литерал
+    """
+
+    return literal_column("'%s'" % name)
+
+
+def organization_document():
+    """
+    SQL выражение полного JSON документа организации (формат OrganizationResponse).
+    Здание, виды деятельности и телефоны собираются коррелированными подзапросами,
+    поэтому документ строится в том же запросе, что и выборка организаций.
+    :return: SQL выражение json документа в виде текста
+    """
+
+    building = aliased(Building)
+    activity = aliased(Activity)
+    phone = aliased(OrganizationPhone)
+
+    building_doc = (
+        select(
+            func.json_build_object(
+                _key("id"), building.id,
+                _key("address"), building.address,
+                _key("latitude"), building.latitude,
+                _key("longitude"), building.longitude,
+            )
+        )
+        .where(building.id == Organization.building_id)
+        .correlate(Organization)
+        .scalar_subquery()
+    )
+
+    activity_object = func.json_build_object(
+        _key("id"), activity.id,
+        _key("name"), activity.name,
+        _key("parent_id"), activity.parent_id,
+    )
+    activities_doc = (
+        select(func.json_agg(aggregate_order_by(activity_object, activity.id)))
+        .select_from(organization_activities)
+        .join(activity, organization_activities.c.activity_id == activity.id)
+        .where(organization_activities.c.organization_id == Organization.id)
+        .correlate(Organization)
+        .scalar_subquery()
+    )
+
+    phone_object = func.json_build_object(
+        _key("id"), phone.id,
+        _key("phone_number"), phone.phone_number,
+    )
+    phones_doc = (
+        select(func.json_agg(aggregate_order_by(phone_object, phone.id)))
+        .where(phone.organization_id == Organization.id)
+        .correlate(Organization)
+        .scalar_subquery()
+    )
+
+    return func.json_build_object(
+        _key("id"), Organization.id,
+        _key("title"), Organization.title,
+        _key("building_id"), Organization.building_id,
+        _key("building"), building_doc,
+        _key("activities"), activities_doc,
+        _key("phones"), phones_doc,
+        type_=String,
+    ).label("document")
+
+
+@lru_cache(maxsize=None)
+def _with_document(stmt: Select) -> Select:
+    """
+    Запрос организаций с документом вместо ORM модели, дополнительные колонки сохраняются.
+    Собирается один раз для каждого запроса OrganizationRepo.
+    :param stmt: select(Organization, ...)
+    :return: select(document, ...)
+    """
+
+    extra = [column["expr"] for column in stmt.column_descriptions[1:]]
+    return stmt.with_only_columns(
+        organization_document(),
+        *extra,
+        maintain_column_froms=True
+    )
+
+
+class OrganizationJsonRepo(OrganizationRepo):
+    """
+    Репозиторий организаций, собирающий документы организаций на стороне Postgres
+    (json_build_object/json_agg) за один запрос вместо основного запроса и трех selectinload.
+    """
+
+    def __init__(self, session, taxonomy=None):
+        super().__init__(session, taxonomy)
+        self._document_mapper = OrganizationDocumentMapper()
+
+    async def _fetch_documents(self, stmt: Select, params: dict):
+        """
+        Выполнить запрос организаций, вернув JSON документы вместо ORM моделей
+        :param stmt: select(Organization, ...) с условиями, сортировкой и лимитом
+        :param params: Значения bind параметров запроса
+        :return: Строки результата: документ и дополнительные колонки запроса
+        """
+
+        result = await self.session.execute(_with_document(stmt), params)
+        return result.all()
+
+    async def _fetch_all(self, stmt: Select, params: dict) -> list[OrganizationEntity]:
+        rows = await self._fetch_documents(stmt, params)
+        entities = self._document_mapper.to_entities(orjson.loads(row[0]) for row in rows)
+
+        return [with_extra(entity, row) for entity, row in zip(entities, rows)]
@@ -1,20 +1,47 @@
 from sqlalchemy.orm import relationship
-from sqlalchemy import Column, String, ForeignKey, Integer, Table
+from sqlalchemy import Column, String, ForeignKey, Integer, Table, Computed, Index
 from app.database import Base
 import uuid
 
+# Нормализация названия для поиска: регистр и ё -> е.
+# normalize_title должна давать тот же результат для поисковой строки.
+TITLE_NORMALIZED_SQL = "translate(lower(title), 'ё', 'е')"
+
+
+def normalize_title(value: str) -> str:
+    """
+    Нормализация строки так же, как колонка organizations.title_normalized
+    :param value: Исходная строка
+    :return: Нормализованная строка
+    """
+
+    return value.strip().lower().replace("ё", "е")
+
+
 organization_activities = Table(
     "organization_activities",
     Base.metadata,
     Column("organization_id", String, ForeignKey("organizations.id", ondelete="CASCADE"), primary_key=True),
     Column("activity_id", Integer, ForeignKey("activities.id", ondelete="CASCADE"), primary_key=True),
+    Index("idx_organization_activities_activity", "activity_id", "organization_id"),
 )
 
 class Organization(Base):
     __tablename__ = "organizations"
 
+    __table_args__ = (
+        Index(
+            "idx_organizations_title_trgm",
+            "title_normalized",
+            postgresql_using="gin",
+            postgresql_ops={"title_normalized": "gin_trgm_ops"},
+        ),
+        Index("idx_organizations_building_id", "building_id", "id"),
+    )
+
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()), unique=True)
     title = Column(String(100), nullable=False)
+    title_normalized = Column(String(100), Computed(TITLE_NORMALIZED_SQL, persisted=True), nullable=False)
     building_id = Column(String, ForeignKey("buildings.id", ondelete="RESTRICT"), nullable=False)
 
     building = relationship(
@@ -35,6 +62,10 @@ class Organization(Base):
 class OrganizationPhone(Base):
     __tablename__ = "organization_phones"
 
+    __table_args__ = (
+        Index("idx_organization_phones_organization_id", "organization_id"),
+    )
+
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()), unique=True)
     organization_id = Column(String, ForeignKey("organizations.id", ondelete="CASCADE"), nullable=False)
     phone_number = Column(String(32), nullable=False)
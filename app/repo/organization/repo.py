@@ -1,238 +1,554 @@
+import copy
+from functools import lru_cache
+from typing import Literal, Optional, Tuple, Union
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, cast
-from sqlalchemy.orm import selectinload, aliased
-from sqlalchemy.sql import func, literal
+from sqlalchemy import select, or_, and_, union, bindparam, Integer, String
+from sqlalchemy.orm import selectinload
+from sqlalchemy.sql import func, Select
 from sqlalchemy.exc import SQLAlchemyError
 from geoalchemy2 import functions as geo_func
-from geoalchemy2.types import Geography
-from app.repo.organization.models import Organization, organization_activities
-from app.repo.activity.models import Activity
+from app.config import settings
+from app.repo.organization.models import Organization, organization_activities, normalize_title
+from app.repo.activity.models import Activity, activity_closure
+from app.repo.activity.taxonomy import ActivityTaxonomy, ActivityTaxonomyCache
 from app.repo.building.models import Building
+from app.repo.building.geo import (
+    within_radius,
+    distance_meters,
+    distance_order,
+    float_param,
+    envelope_param,
+    envelope_params,
+)
+from app.repo.stream import EntityStream
+from app.repo.query import any_of, with_extra
 from app.entity.organization import OrganizationEntity
+from app.entity.cluster import ClusterEntity
 from app.entity.mappers.organization_mapper import OrganizationMapper
 from app.exceptions import DatabaseQueryError
 
 
+# Порядок результатов поиска в радиусе
+RadiusOrder = Literal["id", "distance"]
+
+# Глубина поиска по иерархии видов деятельности вверх и вниз от найденного по умолчанию
+ACTIVITY_HIERARCHY_DEPTH = settings.ACTIVITY_TREE_DEFAULT_DEPTH
+
+# Количество строк, читаемых из серверного курсора за раз в потоковом режиме
+STREAM_BATCH_SIZE = settings.STREAM_BATCH_SIZE
+
+
+def _escape_like(value: str) -> str:
+    """
+    Экранирование спецсимволов LIKE в пользовательской строке
+    :param value: Строка поиска
+    :return: Экранированная строка
+    """
+
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _limit(stmt: Select) -> Select:
+    """
+    LIMIT из параметра limit. Значение None дает LIMIT NULL, в Postgres - без ограничения.
+    """
+
+    return stmt.limit(bindparam("limit", type_=Integer))
+
+
+def _paginate_by_id(stmt: Select, has_after: bool) -> Select:
+    """
+    Keyset пагинация по Organization.id
+    :param stmt: Запрос организаций
+    :param has_after: Добавить условие курсора - параметр after_id
+    :return: Запрос с сортировкой, условием курсора и лимитом
+    """
+
+    if has_after:
+        stmt = stmt.where(Organization.id > bindparam("after_id", type_=String))
+    
+    return _limit(stmt.order_by(Organization.id))
+
+
+def _page_params(limit: Optional[int], after: Optional[Tuple]) -> dict:
+    """
+    Параметры запроса, собранного _paginate_by_id
+    :param limit: Размер страницы
+    :param after: Ключ последней организации предыдущей страницы - (id,)
+    :return: Словарь параметров
+    """
+
+    params = {"limit": limit}
+    if after is not None:
+        params["after_id"] = after[0]
+    return params
+
+
+# Запросы собираются один раз на процесс для каждой формы (набора флагов), значения
+# передаются параметрами при выполнении. SQLAlchemy запоминает ключ кеша компиляции
+# в объекте запроса, поэтому на запрос не строятся выражения, не вычисляется ключ
+# и не компилируется SQL. Текст SQL тоже не меняется, что позволяет asyncpg
+# переиспользовать подготовленные выражения.
+
+@lru_cache(maxsize=None)
+def _with_relations(stmt: Select) -> Select:
+    return stmt.options(
+        selectinload(Organization.building),
+        selectinload(Organization.activities),
+        selectinload(Organization.phones)
+    )
+
+
+@lru_cache(maxsize=None)
+def _by_id_stmt() -> Select:
+    return select(Organization).where(Organization.id == bindparam("org_id", type_=String))
+
+
+@lru_cache(maxsize=None)
+def _by_name_stmt(has_after: bool) -> Select:
+    rank = func.similarity(Organization.title_normalized, bindparam("name", type_=String))
+    
+    stmt = (
+        select(Organization, rank.label("search_rank"))
+        .where(Organization.title_normalized.like(bindparam("pattern", type_=String), escape="\\"))
+        .order_by(rank.desc(), Organization.id)
+    )
+    
+    if has_after:
+        after_rank = float_param("after_rank")
+        stmt = stmt.where(
+            or_(
+                rank < after_rank,
+                and_(rank == after_rank, Organization.id > bindparam("after_id", type_=String))
+            )
+        )
+    return _limit(stmt)
+
+
+@lru_cache(maxsize=None)
+def _by_building_stmt(has_after: bool) -> Select:
+    stmt = select(Organization).where(Organization.building_id == bindparam("building_id", type_=String))
+    return _paginate_by_id(stmt, has_after)
+
+
+@lru_cache(maxsize=None)
+def _organization_ids_by_activity_ids() -> Select:
+    """Подзапрос ID организаций по ID видов деятельности (параметр activity_ids)"""
+    return (
+        select(organization_activities.c.organization_id)
+        .where(any_of(organization_activities.c.activity_id, "activity_ids", Integer))
+    )
+
+
+@lru_cache(maxsize=None)
+def _organization_ids_by_activity_name() -> Select:
+    """Подзапрос ID организаций по нормализованному названию вида деятельности (параметр activity_name)"""
+    return (
+        select(organization_activities.c.organization_id)
+        .join(Activity, organization_activities.c.activity_id == Activity.id)
+        .where(func.lower(Activity.name) == bindparam("activity_name", type_=String))
+    )
+
+
+@lru_cache(maxsize=None)
+def _organization_ids_by_activity_closure() -> Select:
+    """
+    Подзапрос ID организаций по виду деятельности (параметр activity_name), его потомкам
+    до down_depth и предкам до up_depth из таблицы замыкания
+    """
+
+    matched_ids = select(Activity.id).where(func.lower(Activity.name) == bindparam("activity_name", type_=String))
+    
+    # Потомки и предки найденных видов деятельности из таблицы замыкания
+    descendant_ids = (
+        select(activity_closure.c.descendant_id)
+        .where(
+            activity_closure.c.ancestor_id.in_(matched_ids),
+            activity_closure.c.depth <= bindparam("down_depth", type_=Integer)
+        )
+    )
+    ancestor_ids = (
+        select(activity_closure.c.ancestor_id)
+        .where(
+            activity_closure.c.descendant_id.in_(matched_ids),
+            activity_closure.c.depth <= bindparam("up_depth", type_=Integer)
+        )
+    )
+    
+    return (
+        select(organization_activities.c.organization_id)
+        .where(organization_activities.c.activity_id.in_(union(descendant_ids, ancestor_ids)))
+    )
+
+
+@lru_cache(maxsize=None)
+def _by_organization_ids_stmt(organization_ids: Select, has_after: bool) -> Select:
+    stmt = select(Organization).where(Organization.id.in_(organization_ids))
+    return _paginate_by_id(stmt, has_after)
+
+
+def _point():
+    return float_param("latitude"), float_param("longitude")
+
+
+@lru_cache(maxsize=None)
+def _by_radius_stmt(has_after: bool) -> Select:
+    stmt = (
+        select(Organization)
+        .join(Building, Organization.building_id == Building.id)
+        .where(within_radius(*_point(), float_param("radius_meters")))
+    )
+    return _paginate_by_id(stmt, has_after)
+
+
+@lru_cache(maxsize=None)
+def _by_radius_distance_stmt(has_after: bool) -> Select:
+    distance = distance_order(*_point()).label("distance_order")
+    
+    # Сортировка по расстоянию идет по индексу (KNN), LIMIT останавливает обход;
+    # ST_Distance в списке колонок считается только для строк страницы
+    stmt = (
+        select(Organization, distance_meters(*_point()).label("distance_meters"), distance)
+        .join(Building, Organization.building_id == Building.id)
+        .where(within_radius(*_point(), float_param("radius_meters")))
+        .order_by(distance, Organization.id)
+    )
+    if has_after:
+        after_distance = float_param("after_distance")
+        stmt = stmt.where(
+            or_(
+                distance > after_distance,
+                and_(distance == after_distance, Organization.id > bindparam("after_id", type_=String))
+            )
+        )
+    return _limit(stmt)
+
+
+@lru_cache(maxsize=None)
+def _by_rectangle_stmt(has_after: bool) -> Select:
+    stmt = (
+        select(Organization)
+        .join(Building, Organization.building_id == Building.id)
+        .where(
+            geo_func.ST_Within(Building.geom, envelope_param())
+        )
+    )
+    return _paginate_by_id(stmt, has_after)
+
+
+@lru_cache(maxsize=None)
+def _points_by_rectangle_stmt() -> Select:
+    return (
+        select(Organization.id, Building.latitude, Building.longitude)
+        .join(Building, Organization.building_id == Building.id)
+        .where(geo_func.ST_Intersects(Building.geom, envelope_param()))
+    )
+
+
+@lru_cache(maxsize=None)
+def _by_ids_stmt() -> Select:
+    return select(Organization).where(any_of(Organization.id, "org_ids", String)).order_by(Organization.id)
+
+
+@lru_cache(maxsize=None)
+def _nearest_stmt(organization_ids: Optional[Select]) -> Select:
+    stmt = _limit(
+        select(Organization, distance_meters(*_point()).label("distance_meters"))
+        .join(Building, Organization.building_id == Building.id)
+        .order_by(distance_order(*_point()))
+    )
+    
+    if organization_ids is not None:
+        stmt = stmt.where(Organization.id.in_(organization_ids))
+    return stmt
+
+
+@lru_cache(maxsize=None)
+def _clusters_stmt() -> Select:
+    cell = geo_func.ST_SnapToGrid(Building.geom, float_param("grid_size"))
+    
+    return (
+        select(
+            func.avg(Building.latitude).label("latitude"),
+            func.avg(Building.longitude).label("longitude"),
+            func.count(Organization.id).label("count")
+        )
+        .select_from(Organization)
+        .join(Building, Organization.building_id == Building.id)
+        .where(geo_func.ST_Within(Building.geom, envelope_param()))
+        .group_by(cell)
+    )
+
+
 class OrganizationRepo:
-    def __init__(self, session: AsyncSession):
+    def __init__(self, session: AsyncSession, taxonomy: Optional[ActivityTaxonomyCache] = None):
+        """
+        :param session: Сессия БД
+        :param taxonomy: Кеш дерева видов деятельности. Если дерево загружено, названия
+            видов деятельности разрешаются в ID в памяти, без запроса к activities.
+        """
+
         self.session = session
         self._mapper = OrganizationMapper()
+        self._taxonomy = taxonomy
+        self._stream_batch_size: Optional[int] = None
+    
+    def streaming(self, batch_size: int = STREAM_BATCH_SIZE) -> "OrganizationRepo":
+        """
+        Копия репозитория на той же сессии, списочные методы которой возвращают
+        EntityStream вместо списка: строки читаются из серверного курсора порциями
+        по batch_size и преобразуются в Entity по мере чтения
+        :param batch_size: Размер порции
+        :return: Репозиторий в потоковом режиме
+        """
 
-    async def get_org_by_id(self, org_id: str):
-        stmt = (
-            select(Organization)
-            .options(
-                selectinload(Organization.building),
-                selectinload(Organization.activities),
-                selectinload(Organization.phones),
-            )
-            .where(Organization.id == org_id)
+        repo = copy.copy(self)
+        repo._stream_batch_size = batch_size
+        return repo
+    
+    def _taxonomy_snapshot(self) -> Optional[ActivityTaxonomy]:
+        if self._taxonomy is None:
+            return None
+        return self._taxonomy.current
+    
+    def _organization_ids_by_activity(self, activity_name: str) -> Optional[Tuple[Select, dict]]:
+        """
+        Подзапрос ID организаций с видом деятельности по точному названию (без учета регистра)
+        :param activity_name: Название вида деятельности
+        :return: Подзапрос и его параметры или None, если такого вида деятельности заведомо нет
+        """
+
+        normalized_name = activity_name.strip().lower()
+        if not normalized_name:
+            return None
+        
+        taxonomy = self._taxonomy_snapshot()
+        if taxonomy is not None:
+            activity_ids = taxonomy.resolve(normalized_name)
+            if not activity_ids:
+                return None
+            
+            return _organization_ids_by_activity_ids(), {"activity_ids": sorted(activity_ids)}
+        
+        return _organization_ids_by_activity_name(), {"activity_name": normalized_name}
+
+    async def _fetch(
+        self,
+        stmt: Select,
+        params: dict
+    ) -> Union[list[OrganizationEntity], EntityStream[OrganizationEntity]]:
+        """
+        Выполнить запрос организаций: в потоковом режиме - через серверный курсор
+        :param stmt: select(Organization, ...) с условиями, сортировкой и лимитом
+        :param params: Значения bind параметров запроса
+        :return: Список организаций или EntityStream
+        """
+
+        if self._stream_batch_size is not None:
+            return await self._fetch_stream(stmt, params)
+        return await self._fetch_all(stmt, params)
+    
+    def _to_entities(self, rows) -> list[OrganizationEntity]:
+        """
+        Преобразование пачки строк результата в Entity с общими зданиями и видами деятельности
+        :param rows: Строки select(Organization, ...)
+        :return: Список организаций
+        """
+
+        entities = self._mapper.to_entities(row[0] for row in rows)
+        return [with_extra(entity, row) for entity, row in zip(entities, rows)]
+    
+    async def _fetch_stream(self, stmt: Select, params: dict) -> EntityStream[OrganizationEntity]:
+        """
+        Выполнить запрос организаций через серверный курсор.
+        Связанные объекты загружаются selectinload для каждой порции строк.
+        :param stmt: select(Organization, ...) с условиями и сортировкой
+        :param params: Значения bind параметров запроса
+        :return: EntityStream с прочитанной первой порцией
+        """
+
+        result = await self.session.stream(
+            _with_relations(stmt),
+            params,
+            execution_options={"yield_per": self._stream_batch_size}
         )
+        return await EntityStream(result, self._to_entities).open()
+    
+    async def _fetch_all(self, stmt: Select, params: dict) -> list[OrganizationEntity]:
+        """
+        Выполнить запрос организаций и преобразовать результат в Entity.
+        Дополнительные колонки запроса (например, search_rank) переносятся
+        в одноименные поля Entity.
+        :param stmt: select(Organization, ...) с условиями, сортировкой и лимитом
+        :param params: Значения bind параметров запроса
+        :return: Список организаций
+        """
+
+        result = await self.session.execute(_with_relations(stmt), params)
+
+        return self._to_entities(result.all())
 
+    async def get_org_by_id(self, org_id: str):
         try:
-            result = await self.session.execute(stmt)
+            entities = await self._fetch(_by_id_stmt(), {"org_id": org_id})
         except SQLAlchemyError as e:
             raise DatabaseQueryError("Error getting organization by id %s: %s" % (org_id, e))
 
-        model = result.scalars().first()
-
-        if not model:
+        if not entities:
             return None
 
-        return self._mapper.to_entity(model)
+        return entities[0]
 
 
-    async def get_org_by_name(self, organization_name: str) -> list[OrganizationEntity]:
+    async def get_org_by_name(
+        self,
+        organization_name: str,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[float, str]] = None
+    ) -> list[OrganizationEntity]:
         """
-        Получить организации по частичному совпадению названия (case-insensitive)
+        Получить организации по частичному совпадению названия.
+        Поиск идет по нормализованной колонке title_normalized (GIN pg_trgm индекс),
+        результаты ранжируются по триграммной похожести.
         :param organization_name: Часть названия организации для поиска
+        :param limit: Максимальное количество результатов (не больше ORG_NAME_SEARCH_MAX_LIMIT)
+        :param after: Ключ последней организации предыдущей страницы - (search_rank, id)
         :return: Список организаций, название которых содержит указанную строку
         """
 
-        normalized_name = organization_name.strip().lower()
-        if not normalized_name:
+        normalized_name = normalize_title(organization_name)
+        if len(normalized_name) < settings.ORG_NAME_SEARCH_MIN_LENGTH:
             return []
         
-
-        search_pattern = f"%{normalized_name}%"
-        
-        stmt = (
-            select(Organization)
-            .options(
-                selectinload(Organization.building),
-                selectinload(Organization.activities),
-                selectinload(Organization.phones)
-            )
-            .where(func.lower(Organization.title).like(search_pattern))
-        )
+        if limit is None:
+            limit = settings.ORG_NAME_SEARCH_DEFAULT_LIMIT
+        limit = min(limit, settings.ORG_NAME_SEARCH_MAX_LIMIT)
+
+        params = {
+            "name": normalized_name,
+            "pattern": f"%{_escape_like(normalized_name)}%",
+            "limit": limit,
+        }
+        if after is not None:
+            params["after_rank"], params["after_id"] = after
 
         try:
-            result = await self.session.execute(stmt)
+            # Преобразуем модели в Entity объекты
+            return await self._fetch(_by_name_stmt(after is not None), params)
         except SQLAlchemyError as e:
             raise DatabaseQueryError("Error getting organizations by name %s: %s" % (organization_name, e))
 
-        models = list(result.scalars().all())
-
-        # Преобразуем модели в Entity объекты
-        return [self._mapper.to_entity(model) for model in models]
-
-    async def list_by_building(self, building_id: str) -> list[OrganizationEntity]:
-        stmt = (
-            select(Organization)
-            .options(
-                selectinload(Organization.building),
-                selectinload(Organization.activities),
-                selectinload(Organization.phones)
-            )
-            .where(Organization.building_id == building_id)
-        )
+    async def list_by_building(
+        self,
+        building_id: str,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[str]] = None
+    ) -> list[OrganizationEntity]:
+        params = {"building_id": building_id, **_page_params(limit, after)}
         
         try:
-            result = await self.session.execute(stmt)
+            return await self._fetch(_by_building_stmt(after is not None), params)
         except SQLAlchemyError as e:
             raise DatabaseQueryError("Error listing organizations by building %s: %s" %(building_id, e))
 
-        models = list(result.scalars().all())
-
-        return [self._mapper.to_entity(model) for model in models]
-
-    async def list_by_activity_exact(self, activity_name: str) -> list[OrganizationEntity]:
-        normalized_name = activity_name.strip().lower()
-        if not normalized_name:
+    async def list_by_activity_exact(
+        self,
+        activity_name: str,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[str]] = None
+    ) -> list[OrganizationEntity]:
+        activity_filter = self._organization_ids_by_activity(activity_name)
+        if activity_filter is None:
             return []
 
-        stmt = (
-            select(Organization)
-            .distinct()
-            .join(organization_activities, Organization.id == organization_activities.c.organization_id)
-            .join(Activity, organization_activities.c.activity_id == Activity.id)
-            .where(func.lower(Activity.name) == normalized_name)
-            .options(
-                selectinload(Organization.building),
-                selectinload(Organization.activities),
-                selectinload(Organization.phones)
-            )
-        )
+        organization_ids, params = activity_filter
+        stmt = _by_organization_ids_stmt(organization_ids, after is not None)
 
         try:
-            result = await self.session.execute(stmt)
+            return await self._fetch(stmt, {**params, **_page_params(limit, after)})
         except SQLAlchemyError as e:
             raise DatabaseQueryError("Error listing organizations by activity exact %s: %s" % (activity_name, e))
 
-        models = list(result.scalars().all())
-
-        return [self._mapper.to_entity(model) for model in models]
+    async def list_by_activity_hierarchy(
+        self,
+        activity_name: str,
+        up_depth: Optional[int] = None,
+        down_depth: Optional[int] = None,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[str]] = None
+    ) -> list[OrganizationEntity]:
+        """
+        Получить организации по виду деятельности, его предкам и потомкам.
+        Виды деятельности, их окрестность в дереве и организации выбираются одним запросом.
+        :param activity_name: Название вида деятельности
+        :param up_depth: Глубина поиска предков, по умолчанию ACTIVITY_HIERARCHY_DEPTH
+        :param down_depth: Глубина поиска потомков, по умолчанию ACTIVITY_HIERARCHY_DEPTH
+        :param limit: Размер страницы
+        :param after: Ключ последней организации предыдущей страницы - (id,)
+        :return: Список организаций
+        """
 
-    async def list_by_activity_hierarchy(self, activity_name: str) -> list[OrganizationEntity]:
         normalized_name = activity_name.strip().lower()
         if not normalized_name:
             return []
 
-        base_select = select(
-            Activity.id,
-            Activity.parent_id,
-            literal(0).label('level')
-        ).where(func.lower(Activity.name) == normalized_name)
-
-        descendants_cte = base_select.cte(name="activity_descendants", recursive=True)
-        descendant_alias = aliased(Activity)
-        descendants_cte = descendants_cte.union_all(
-            select(
-                descendant_alias.id,
-                descendant_alias.parent_id,
-                (descendants_cte.c.level + 1).label('level')
-            )
-            .where(
-                descendant_alias.parent_id == descendants_cte.c.id,
-                descendants_cte.c.level < 2
-            )
-        )
-
-        ancestors_base_select = select(
-            Activity.id,
-            Activity.parent_id,
-            literal(0).label('level')
-        ).where(func.lower(Activity.name) == normalized_name)
-        ancestors_cte = ancestors_base_select.cte(name="activity_ancestors", recursive=True)
-        ancestor_alias = aliased(Activity)
-        ancestors_cte = ancestors_cte.union_all(
-            select(
-                ancestor_alias.id,
-                ancestor_alias.parent_id,
-                (ancestors_cte.c.level + 1).label('level')
-            )
-            .where(
-                ancestor_alias.id == ancestors_cte.c.parent_id,
-                ancestors_cte.c.level < 2
-            )
-        )
-
-        try:
-            descendants_result = await self.session.execute(select(descendants_cte.c.id))
-        except SQLAlchemyError as e:
-            raise DatabaseQueryError("Error listing organizations by activity hierarchy %s: %s" % (activity_name, e))
-
-        try:
-            ancestors_result = await self.session.execute(select(ancestors_cte.c.id))
-        except SQLAlchemyError as e:
-            raise DatabaseQueryError("Error listing organizations by activity hierarchy %s: %s" % (activity_name, e))
-
-        activity_ids = set(descendants_result.scalars().all()) | set(ancestors_result.scalars().all())
-
-        if not activity_ids:
-            return []
-
-        stmt = (
-            select(Organization)
-            .distinct()
-            .join(organization_activities, Organization.id == organization_activities.c.organization_id)
-            .where(organization_activities.c.activity_id.in_(activity_ids))
-            .options(
-                selectinload(Organization.building),
-                selectinload(Organization.activities),
-                selectinload(Organization.phones)
-            )
-        )
+        if up_depth is None:
+            up_depth = ACTIVITY_HIERARCHY_DEPTH
+        if down_depth is None:
+            down_depth = ACTIVITY_HIERARCHY_DEPTH
+        
+        taxonomy = self._taxonomy_snapshot()
+        if taxonomy is not None:
+            activity_ids = sorted(taxonomy.hierarchy_ids(normalized_name, up_depth, down_depth))
+            if not activity_ids:
+                return []
+            organization_ids = _organization_ids_by_activity_ids()
+            params = {"activity_ids": activity_ids}
+        else:
+            organization_ids = _organization_ids_by_activity_closure()
+            params = {"activity_name": normalized_name, "up_depth": up_depth, "down_depth": down_depth}
+
+        stmt = _by_organization_ids_stmt(organization_ids, after is not None)
 
         try:
-            result = await self.session.execute(stmt)
+            return await self._fetch(stmt, {**params, **_page_params(limit, after)})
         except SQLAlchemyError as e:
             raise DatabaseQueryError("Error listing organizations by activity hierarchy %s: %s" % (activity_name, e))
 
-        models = list(result.scalars().all())
-
-        return [self._mapper.to_entity(model) for model in models]
-
     async def list_by_radius(
         self,
         latitude: float,
         longitude: float,
-        radius_meters: float
+        radius_meters: float,
+        order: RadiusOrder = "id",
+        limit: Optional[int] = None,
+        after: Optional[Tuple] = None
     ) -> list[OrganizationEntity]:
-        center_point = geo_func.ST_SetSRID(
-            geo_func.ST_MakePoint(longitude, latitude),
-            4326
-        )
+        """
+        Получить организации в радиусе от точки
+        :param latitude: Широта центральной точки
+        :param longitude: Долгота центральной точки
+        :param radius_meters: Радиус поиска в метрах
+        :param order: id - по ID организации, distance - по расстоянию до точки
+            (заполняет distance_meters и distance_order)
+        :param limit: Размер страницы
+        :param after: Ключ последней организации предыдущей страницы - (id,) или (distance_order, id)
+        :return: Список организаций
+        """
 
-        stmt = (
-            select(Organization)
-            .join(Building, Organization.building_id == Building.id)
-            .where(
-                geo_func.ST_DWithin(
-                    cast(Building.geom, Geography),
-                    cast(center_point, Geography),
-                    radius_meters
-                )
-            )
-            .options(
-                selectinload(Organization.building),
-                selectinload(Organization.activities),
-                selectinload(Organization.phones)
-            )
-        )
+        params = {"latitude": latitude, "longitude": longitude, "radius_meters": radius_meters}
+        
+        if order == "distance":
+            stmt = _by_radius_distance_stmt(after is not None)
+            params["limit"] = limit
+            if after is not None:
+                params["after_distance"], params["after_id"] = after
+        else:
+            stmt = _by_radius_stmt(after is not None)
+            params.update(_page_params(limit, after))
         
         try:
-            result = await self.session.execute(stmt)
+            return await self._fetch(stmt, params)
         except SQLAlchemyError as e:
             raise DatabaseQueryError("Error listing organizations by radius (lat=%s, lon=%s, radius=%s m): %s"
                                      % (
@@ -243,40 +559,22 @@ class OrganizationRepo:
                                      )
                                      )
 
-        models = list(result.scalars().all())
-
-        return [self._mapper.to_entity(model) for model in models]
-
     async def list_by_rectangle(
         self,
         min_latitude: float,
         min_longitude: float,
         max_latitude: float,
-        max_longitude: float
+        max_longitude: float,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[str]] = None
     ) -> list[OrganizationEntity]:
-        envelope = geo_func.ST_MakeEnvelope(
-            min_longitude,
-            min_latitude,
-            max_longitude,
-            max_latitude,
-            4326
-        )
-
-        stmt = (
-            select(Organization)
-            .join(Building, Organization.building_id == Building.id)
-            .where(
-                geo_func.ST_Within(Building.geom, envelope)
-            )
-            .options(
-                selectinload(Organization.building),
-                selectinload(Organization.activities),
-                selectinload(Organization.phones)
-            )
-        )
+        params = {
+            **envelope_params(min_latitude, min_longitude, max_latitude, max_longitude),
+            **_page_params(limit, after)
+        }
         
         try:
-            result = await self.session.execute(stmt)
+            return await self._fetch(_by_rectangle_stmt(after is not None), params)
         except SQLAlchemyError as e:
             raise DatabaseQueryError("Error listing organizations by rectangle (min_lat=%s, min_lon=%s, \
             max_lat=%s, max_lon=%s): %s"
@@ -288,7 +586,136 @@ class OrganizationRepo:
                                          e
                                      )
                                      )
+    
+    async def list_points_by_rectangle(
+        self,
+        min_latitude: float,
+        min_longitude: float,
+        max_latitude: float,
+        max_longitude: float
+    ) -> list[Tuple[str, float, float]]:
+        """
+        Получить ID организаций и координаты их зданий в прямоугольной области,
+        включая точки на границе (для заполнения кеша ячеек сетки)
+        :param min_latitude: Минимальная широта
+        :param min_longitude: Минимальная долгота
+        :param max_latitude: Максимальная широта
+        :param max_longitude: Максимальная долгота
+        :return: Список (id организации, широта, долгота)
+        """
+
+        params = envelope_params(min_latitude, min_longitude, max_latitude, max_longitude)
+        
+        try:
+            result = await self.session.execute(_points_by_rectangle_stmt(), params)
+        except SQLAlchemyError as e:
+            raise DatabaseQueryError("Error listing organization points by rectangle (min_lat=%s, min_lon=%s, \
+            max_lat=%s, max_lon=%s): %s"
+                                     % (
+                                         min_latitude,
+                                         min_longitude,
+                                         max_latitude,
+                                         max_longitude,
+                                         e
+                                     )
+                                     )
+        
+        return [tuple(row) for row in result.all()]
+    
+    async def list_by_ids(self, org_ids: list[str]) -> list[OrganizationEntity]:
+        """
+        Получить организации по списку ID
+        :param org_ids: Список ID организаций
+        :return: Список найденных организаций по возрастанию id
+        """
+
+        if not org_ids:
+            return []
+        
+        try:
+            return await self._fetch(_by_ids_stmt(), {"org_ids": list(org_ids)})
+        except SQLAlchemyError as e:
+            raise DatabaseQueryError("Error listing organizations by ids: %s" % e)
+    
+    async def list_nearest(
+        self,
+        latitude: float,
+        longitude: float,
+        k: int,
+        activity_name: Optional[str] = None
+    ) -> list[OrganizationEntity]:
+        """
+        Получить k ближайших к точке организаций (KNN по индексу idx_buildings_geog)
+        :param latitude: Широта точки
+        :param longitude: Долгота точки
+        :param k: Количество организаций
+        :param activity_name: Точное название вида деятельности для фильтрации
+        :return: Список организаций по возрастанию расстояния, с заполненным distance_meters
+        """
 
-        models = list(result.scalars().all())
+        organization_ids = None
+        params = {"latitude": latitude, "longitude": longitude, "limit": k}
+        
+        if activity_name is not None:
+            activity_filter = self._organization_ids_by_activity(activity_name)
+            if activity_filter is None:
+                return []
+            organization_ids, activity_params = activity_filter
+            params.update(activity_params)
+        
+        try:
+            return await self._fetch(_nearest_stmt(organization_ids), params)
+        except SQLAlchemyError as e:
+            raise DatabaseQueryError("Error listing nearest organizations (lat=%s, lon=%s, k=%s): %s"
+                                     % (
+                                         latitude,
+                                         longitude,
+                                         k,
+                                         e
+                                     )
+                                     )
+    
+    async def list_clusters(
+        self,
+        min_latitude: float,
+        min_longitude: float,
+        max_latitude: float,
+        max_longitude: float,
+        grid_size: float
+    ) -> list[ClusterEntity]:
+        """
+        Получить кластеры организаций в прямоугольной области: здания группируются
+        по ячейкам сетки (ST_SnapToGrid), для каждой ячейки считаются количество
+        организаций и их центр.
+        :param min_latitude: Минимальная широта
+        :param min_longitude: Минимальная долгота
+        :param max_latitude: Максимальная широта
+        :param max_longitude: Максимальная долгота
+        :param grid_size: Размер ячейки сетки в градусах
+        :return: Список кластеров
+        """
 
-        return [self._mapper.to_entity(model) for model in models]
+        params = {
+            **envelope_params(min_latitude, min_longitude, max_latitude, max_longitude),
+            "grid_size": grid_size
+        }
+        
+        try:
+            result = await self.session.execute(_clusters_stmt(), params)
+        except SQLAlchemyError as e:
+            raise DatabaseQueryError("Error listing organization clusters (min_lat=%s, min_lon=%s, \
+            max_lat=%s, max_lon=%s, grid=%s): %s"
+                                     % (
+                                         min_latitude,
+                                         min_longitude,
+                                         max_latitude,
+                                         max_longitude,
+                                         grid_size,
+                                         e
+                                     )
+                                     )
+        
+        return [
+            ClusterEntity(latitude=row.latitude, longitude=row.longitude, count=row.count)
+            for row in result
+        ]
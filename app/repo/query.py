@@ -0,0 +1,33 @@
+from dataclasses import replace
+from typing import TypeVar
+from sqlalchemy import any_, bindparam
+from sqlalchemy.dialects.postgresql import ARRAY
+
+
+T = TypeVar("T")
+
+
+def any_of(column, name: str, item_type):
+    """
+    Условие column = ANY(:name) с одним параметром-массивом вместо IN со списком параметров:
+    текст запроса не зависит от количества значений
+    :param column: Колонка
+    :param name: Имя параметра-массива
+    :param item_type: SQL тип элемента массива
+    :return: SQL условие
+    """
+
+    return column == any_(bindparam(name, type_=ARRAY(item_type)))
+
+
+def with_extra(entity: T, row) -> T:
+    """
+    Перенос дополнительных колонок строки (все после первой) в поля Entity
+    :param entity: Entity (dataclass)
+    :param row: Строка результата запроса
+    :return: Entity с заполненными дополнительными полями
+    """
+
+    if len(row) == 1:
+        return entity
+    return replace(entity, **dict(zip(row._fields[1:], row[1:])))
@@ -0,0 +1,220 @@
+import math
+from typing import Optional, Tuple
+import numpy as np
+
+
+# Сфероид WGS 84 (SRID 4326)
+SPHEROID_A = 6378137.0
+SPHEROID_F = 1 / 298.257223563
+SPHEROID_B = SPHEROID_A * (1 - SPHEROID_F)
+
+# Радиус сферы, по которой PostGIS считает расстояние <-> для geography:
+# средний радиус сфероида (2a + b) / 3
+SPHERE_RADIUS = (2 * SPHEROID_A + SPHEROID_B) / 3
+
+# Наименьший радиус кривизны сфероида (меридиан на экваторе) - по нему оценивается
+# рамка координат, заведомо содержащая все точки в радиусе
+MIN_CURVATURE_RADIUS = SPHEROID_B ** 2 / SPHEROID_A
+
+# Запас рамки на погрешность оценки по сфере
+BOUNDS_MARGIN = 1.01
+
+# Квадрат эксцентриситета сфероида
+SPHEROID_E2 = SPHEROID_F * (2 - SPHEROID_F)
+
+# Запас границ отношения расстояний по сфероиду и по сфере на погрешность вычислений
+RATIO_MARGIN = 1e-9
+
+# Точность сходимости формулы Винсенти (радианы)
+VINCENTY_TOLERANCE = 1e-12
+
+
+def sphere_distance(latitude: float, longitude: float, other_latitude: float, other_longitude: float) -> float:
+    """
+    Расстояние по сфере в метрах, как оператор <-> для geography в PostGIS
+    (sphere_distance в liblwgeom)
+    :return: Расстояние в метрах
+    """
+
+    latitude, other_latitude = math.radians(latitude), math.radians(other_latitude)
+    delta = math.radians(other_longitude - longitude)
+    cos_delta = math.cos(delta)
+    sin_start, cos_start = math.sin(latitude), math.cos(latitude)
+    sin_end, cos_end = math.sin(other_latitude), math.cos(other_latitude)
+    
+    a = math.hypot(cos_end * math.sin(delta), cos_start * sin_end - sin_start * cos_end * cos_delta)
+    b = sin_start * sin_end + cos_start * cos_end * cos_delta
+    return math.atan2(a, b) * SPHERE_RADIUS
+
+
+def spheroid_distance(latitude: float, longitude: float, other_latitude: float, other_longitude: float) -> float:
+    """
+    Расстояние по сфероиду WGS 84 в метрах (формула Винсенти), как ST_Distance и ST_DWithin
+    для geography. Для почти противоположных точек, где формула не сходится, - расстояние по сфере.
+    :return: Расстояние в метрах
+    """
+
+    f = SPHEROID_F
+    delta = math.radians(other_longitude - longitude)
+    u1 = math.atan((1 - f) * math.tan(math.radians(latitude)))
+    u2 = math.atan((1 - f) * math.tan(math.radians(other_latitude)))
+    sin_u1, cos_u1 = math.sin(u1), math.cos(u1)
+    sin_u2, cos_u2 = math.sin(u2), math.cos(u2)
+    
+    lam = delta
+    for _ in range(200):
+        sin_lam, cos_lam = math.sin(lam), math.cos(lam)
+        sin_sigma = math.hypot(cos_u2 * sin_lam, cos_u1 * sin_u2 - sin_u1 * cos_u2 * cos_lam)
+        if sin_sigma == 0:
+            return 0.0
+        cos_sigma = sin_u1 * sin_u2 + cos_u1 * cos_u2 * cos_lam
+        sigma = math.atan2(sin_sigma, cos_sigma)
+        sin_alpha = cos_u1 * cos_u2 * sin_lam / sin_sigma
+        cos2_alpha = 1 - sin_alpha ** 2
+        cos_2sigma_m = cos_sigma - 2 * sin_u1 * sin_u2 / cos2_alpha if cos2_alpha else 0.0
+        c = f / 16 * cos2_alpha * (4 + f * (4 - 3 * cos2_alpha))
+        previous, lam = lam, delta + (1 - c) * f * sin_alpha * (
+            sigma + c * sin_sigma * (cos_2sigma_m + c * cos_sigma * (2 * cos_2sigma_m ** 2 - 1))
+        )
+        if abs(lam - previous) < VINCENTY_TOLERANCE:
+            break
+    else:
+        return sphere_distance(latitude, longitude, other_latitude, other_longitude)
+    
+    u_squared = cos2_alpha * (SPHEROID_A ** 2 - SPHEROID_B ** 2) / SPHEROID_B ** 2
+    big_a = 1 + u_squared / 16384 * (4096 + u_squared * (-768 + u_squared * (320 - 175 * u_squared)))
+    big_b = u_squared / 1024 * (256 + u_squared * (-128 + u_squared * (74 - 47 * u_squared)))
+    delta_sigma = big_b * sin_sigma * (
+        cos_2sigma_m + big_b / 4 * (
+            cos_sigma * (2 * cos_2sigma_m ** 2 - 1)
+            - big_b / 6 * cos_2sigma_m * (4 * sin_sigma ** 2 - 3) * (4 * cos_2sigma_m ** 2 - 3)
+        )
+    )
+    return SPHEROID_B * big_a * (sigma - delta_sigma)
+
+
+def spheroid_ratio_bounds(min_latitude: float, max_latitude: float) -> Tuple[float, float]:
+    """
+    Границы отношения длины пути по сфероиду к длине того же пути по сфере SPHERE_RADIUS
+    (с широтой и долготой как координатами на сфере) для путей внутри полосы широт.
+    Сфероид растягивает сферу в точке широты φ от M(φ)/R (вдоль меридиана) до N(φ)/R (вдоль параллели),
+    M <= N, и оба растут с |φ|. Кратчайшие пути между центром и точками круга не выходят из его рамки,
+    поэтому для таких точек: расстояние по сфероиду / расстояние по сфере - в этих границах.
+    :param min_latitude: Минимальная широта полосы
+    :param max_latitude: Максимальная широта полосы
+    :return: (нижняя граница, верхняя граница)
+    """
+
+    min_latitude, max_latitude = max(min_latitude, -90.0), min(max_latitude, 90.0)
+    farthest = math.radians(max(abs(min_latitude), abs(max_latitude)))
+    nearest = 0.0 if min_latitude <= 0 <= max_latitude else math.radians(min(abs(min_latitude), abs(max_latitude)))
+    
+    meridian = SPHEROID_A * (1 - SPHEROID_E2) / (1 - SPHEROID_E2 * math.sin(nearest) ** 2) ** 1.5
+    prime_vertical = SPHEROID_A / math.sqrt(1 - SPHEROID_E2 * math.sin(farthest) ** 2)
+    return meridian / SPHERE_RADIUS * (1 - RATIO_MARGIN), prime_vertical / SPHERE_RADIUS * (1 + RATIO_MARGIN)
+
+
+def sphere_distances(
+    latitude: float,
+    longitude: float,
+    other_latitudes: np.ndarray,
+    other_longitudes: np.ndarray
+) -> np.ndarray:
+    """
+    Векторный sphere_distance: расстояния по сфере от точки до массива точек
+    :return: Массив расстояний в метрах
+    """
+
+    latitude = math.radians(latitude)
+    other_latitudes = np.radians(other_latitudes)
+    delta = np.radians(other_longitudes - longitude)
+    cos_delta = np.cos(delta)
+    sin_start, cos_start = math.sin(latitude), math.cos(latitude)
+    sin_end, cos_end = np.sin(other_latitudes), np.cos(other_latitudes)
+    
+    a = np.hypot(cos_end * np.sin(delta), cos_start * sin_end - sin_start * cos_end * cos_delta)
+    b = sin_start * sin_end + cos_start * cos_end * cos_delta
+    return np.arctan2(a, b) * SPHERE_RADIUS
+
+
+def spheroid_distances(
+    latitude: float,
+    longitude: float,
+    other_latitudes: np.ndarray,
+    other_longitudes: np.ndarray
+) -> np.ndarray:
+    """
+    Векторный spheroid_distance: расстояния по сфероиду от точки до массива точек.
+    Итерации идут, пока не сойдутся все точки; для несошедшихся - расстояние по сфере.
+    :return: Массив расстояний в метрах
+    """
+
+    f = SPHEROID_F
+    delta = np.radians(other_longitudes - longitude)
+    u1 = math.atan((1 - f) * math.tan(math.radians(latitude)))
+    u2 = np.arctan((1 - f) * np.tan(np.radians(other_latitudes)))
+    sin_u1, cos_u1 = math.sin(u1), math.cos(u1)
+    sin_u2, cos_u2 = np.sin(u2), np.cos(u2)
+    
+    lam = delta
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for _ in range(200):
+            sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+            sin_sigma = np.hypot(cos_u2 * sin_lam, cos_u1 * sin_u2 - sin_u1 * cos_u2 * cos_lam)
+            cos_sigma = sin_u1 * sin_u2 + cos_u1 * cos_u2 * cos_lam
+            sigma = np.arctan2(sin_sigma, cos_sigma)
+            sin_alpha = np.where(sin_sigma == 0, 0.0, cos_u1 * cos_u2 * sin_lam / sin_sigma)
+            cos2_alpha = 1 - sin_alpha ** 2
+            cos_2sigma_m = np.where(cos2_alpha == 0, 0.0, cos_sigma - 2 * sin_u1 * sin_u2 / cos2_alpha)
+            c = f / 16 * cos2_alpha * (4 + f * (4 - 3 * cos2_alpha))
+            previous, lam = lam, delta + (1 - c) * f * sin_alpha * (
+                sigma + c * sin_sigma * (cos_2sigma_m + c * cos_sigma * (2 * cos_2sigma_m ** 2 - 1))
+            )
+            converged = np.abs(lam - previous) < VINCENTY_TOLERANCE
+            if converged.all():
+                break
+    
+    u_squared = cos2_alpha * (SPHEROID_A ** 2 - SPHEROID_B ** 2) / SPHEROID_B ** 2
+    big_a = 1 + u_squared / 16384 * (4096 + u_squared * (-768 + u_squared * (320 - 175 * u_squared)))
+    big_b = u_squared / 1024 * (256 + u_squared * (-128 + u_squared * (74 - 47 * u_squared)))
+    delta_sigma = big_b * sin_sigma * (
+        cos_2sigma_m + big_b / 4 * (
+            cos_sigma * (2 * cos_2sigma_m ** 2 - 1)
+            - big_b / 6 * cos_2sigma_m * (4 * sin_sigma ** 2 - 3) * (4 * cos_2sigma_m ** 2 - 3)
+        )
+    )
+    distances = SPHEROID_B * big_a * (sigma - delta_sigma)
+    distances[sin_sigma == 0] = 0.0
+    if not converged.all():
+        distances[~converged] = sphere_distances(
+            latitude, longitude, other_latitudes[~converged], other_longitudes[~converged]
+        )
+    return distances
+
+
+def radius_bounds(
+    latitude: float,
+    longitude: float,
+    radius_meters: float,
+    sphere_radius: float = MIN_CURVATURE_RADIUS
+) -> Tuple[float, float, Optional[float]]:
+    """
+    Рамка координат, содержащая все точки в радиусе от центра
+    :param latitude: Широта центра
+    :param longitude: Долгота центра
+    :param radius_meters: Радиус в метрах
+    :param sphere_radius: Радиус сферы оценки, по умолчанию - заведомо не больше радиуса кривизны сфероида
+    :return: (минимальная широта, максимальная широта, максимальное отклонение долготы в градусах
+        или None, если в радиус попадает полюс и долгота не ограничена)
+    """
+
+    angle = min(radius_meters / sphere_radius, math.pi) * BOUNDS_MARGIN
+    delta_latitude = math.degrees(angle)
+    
+    sin_angle = math.sin(min(angle, math.pi / 2))
+    cos_latitude = math.cos(math.radians(latitude))
+    if angle >= math.pi / 2 or sin_angle >= cos_latitude:
+        delta_longitude = None
+    else:
+        delta_longitude = math.degrees(math.asin(sin_angle / cos_latitude)) * BOUNDS_MARGIN
+    return latitude - delta_latitude, latitude + delta_latitude, delta_longitude
@@ -0,0 +1,13 @@
+from sqlalchemy import BigInteger, CheckConstraint, Column, SmallInteger, Table
+from app.database import Base
+
+
+# Версия содержимого таблиц справочника - одна строка со счетчиком,
+# который увеличивают триггеры изменяющих запросов (миграция f3b1d9a27c54)
+directory_version = Table(
+    "directory_version",
+    Base.metadata,
+    Column("id", SmallInteger, primary_key=True),
+    Column("version", BigInteger, nullable=False, server_default="0"),
+    CheckConstraint("id = 1", name="ck_directory_version_single_row"),
+)
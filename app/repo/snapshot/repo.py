@@ -0,0 +1,322 @@
+import bisect
+import copy
+from typing import List, Optional, Sequence, Tuple, Union
+import numpy as np
+from app.config import settings
+from app.repo.organization.models import normalize_title
+from app.repo.organization.repo import RadiusOrder, ACTIVITY_HIERARCHY_DEPTH, STREAM_BATCH_SIZE
+from app.repo.snapshot.snapshot import DirectorySnapshot, trigrams, similarity
+from app.repo.stream import SequenceStream
+from app.entity.organization import OrganizationEntity
+from app.entity.building import BuildingEntity
+from app.entity.cluster import ClusterEntity
+
+
+class OrganizationSnapshotRepo:
+    """
+    Репозиторий организаций, отвечающий из снимка справочника в памяти процесса
+    (ORGANIZATION_FETCH_MODE=snapshot) без запросов к БД.
+    Условия, сортировка, курсоры и дополнительные поля (search_rank, distance_meters, distance_order)
+    совпадают с OrganizationRepo: похожесть названий считается как в pg_trgm,
+    попадание в радиус и distance_meters - по сфероиду, как ST_DWithin и ST_Distance,
+    порядок по расстоянию - по сфере, как <->.
+    """
+
+    def __init__(self, snapshot: DirectorySnapshot):
+        """
+        :param snapshot: Снимок справочника. Репозиторий держит один снимок до конца запроса,
+            даже если за это время его заменили более новым.
+        """
+
+        self._snapshot = snapshot
+        self._stream_batch_size: Optional[int] = None
+    
+    def streaming(self, batch_size: int = STREAM_BATCH_SIZE) -> "OrganizationSnapshotRepo":
+        """
+        Копия репозитория, списочные методы которой возвращают поток (SequenceStream):
+        Entity собираются порциями по batch_size по мере отправки ответа
+        :param batch_size: Размер порции
+        :return: Репозиторий в потоковом режиме
+        """
+
+        repo = copy.copy(self)
+        repo._stream_batch_size = batch_size
+        return repo
+    
+    def _result(
+        self,
+        items: Sequence,
+        extra_fields: Sequence[str] = ()
+    ) -> Union[List[OrganizationEntity], SequenceStream[OrganizationEntity]]:
+        """
+        Entity для строк ответа: в потоковом режиме - поток, собирающий их порциями
+        :param items: Номера строк организаций или кортежи (номер строки, значения extra_fields)
+        :param extra_fields: Дополнительные поля Entity
+        :return: Список организаций или SequenceStream
+        """
+
+        def to_entities(batch: Sequence) -> List[OrganizationEntity]:
+            return self._snapshot.to_entities(batch, extra_fields)
+        
+        if self._stream_batch_size is not None:
+            return SequenceStream(items, to_entities, self._stream_batch_size)
+        return to_entities(items)
+    
+    def _page(self, rows: Sequence[int], limit: Optional[int], after: Optional[Tuple[str]]) -> Sequence[int]:
+        """
+        Keyset страница строк, отсортированных по id
+        :param rows: Номера строк организаций по возрастанию
+        :param limit: Размер страницы
+        :param after: Ключ последней организации предыдущей страницы - (id,)
+        :return: Номера строк страницы
+        """
+
+        start = 0
+        if after is not None:
+            first_row = bisect.bisect_right(self._snapshot.organization_ids, after[0])
+            start = bisect.bisect_left(rows, first_row)
+        return rows[start:None if limit is None else start + limit]
+    
+    def _rows_by_activity(self, activity_name: str) -> List[int]:
+        normalized_name = activity_name.strip().lower()
+        if not normalized_name:
+            return []
+        return self._snapshot.organizations_by_activities(self._snapshot.taxonomy.resolve(normalized_name))
+    
+    async def get_org_by_id(self, org_id: str) -> Optional[OrganizationEntity]:
+        row = self._snapshot.organization_index.get(org_id)
+        if row is None:
+            return None
+        return self._snapshot.to_entities([row])[0]
+    
+    async def get_org_by_name(
+        self,
+        organization_name: str,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[float, str]] = None
+    ) -> List[OrganizationEntity]:
+        """
+        Получить организации, нормализованное название которых содержит строку,
+        по убыванию похожести названия, затем по id
+        :param organization_name: Часть названия организации для поиска
+        :param limit: Максимальное количество результатов (не больше ORG_NAME_SEARCH_MAX_LIMIT)
+        :param after: Ключ последней организации предыдущей страницы - (search_rank, id)
+        :return: Список организаций
+        """
+
+        normalized_name = normalize_title(organization_name)
+        if len(normalized_name) < settings.ORG_NAME_SEARCH_MIN_LENGTH:
+            return []
+        
+        if limit is None:
+            limit = settings.ORG_NAME_SEARCH_DEFAULT_LIMIT
+        limit = min(limit, settings.ORG_NAME_SEARCH_MAX_LIMIT)
+        
+        snapshot = self._snapshot
+        name_trigrams = trigrams(normalized_name)
+        ranked = sorted(
+            (-similarity(trigrams(snapshot.titles_normalized[row]), name_trigrams), row)
+            for row in snapshot.organizations_by_title(normalized_name)
+        )
+        
+        if after is not None:
+            after_rank, after_id = after
+            ranked = [
+                (rank, row) for rank, row in ranked
+                if -rank < after_rank or (-rank == after_rank and snapshot.organization_ids[row] > after_id)
+            ]
+        return self._result([(row, -rank) for rank, row in ranked[:limit]], ("search_rank",))
+    
+    async def list_by_building(
+        self,
+        building_id: str,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[str]] = None
+    ) -> List[OrganizationEntity]:
+        building_row = self._snapshot.building_index.get(building_id)
+        if building_row is None:
+            return self._result([])
+        return self._result(self._page(self._snapshot.organizations_of_building(building_row), limit, after))
+    
+    async def list_by_activity_exact(
+        self,
+        activity_name: str,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[str]] = None
+    ) -> List[OrganizationEntity]:
+        return self._result(self._page(self._rows_by_activity(activity_name), limit, after))
+    
+    async def list_by_activity_hierarchy(
+        self,
+        activity_name: str,
+        up_depth: Optional[int] = None,
+        down_depth: Optional[int] = None,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[str]] = None
+    ) -> List[OrganizationEntity]:
+        """
+        Получить организации по виду деятельности, его предкам и потомкам
+        :param activity_name: Название вида деятельности
+        :param up_depth: Глубина поиска предков, по умолчанию ACTIVITY_HIERARCHY_DEPTH
+        :param down_depth: Глубина поиска потомков, по умолчанию ACTIVITY_HIERARCHY_DEPTH
+        :param limit: Размер страницы
+        :param after: Ключ последней организации предыдущей страницы - (id,)
+        :return: Список организаций
+        """
+
+        normalized_name = activity_name.strip().lower()
+        if not normalized_name:
+            return []
+        
+        if up_depth is None:
+            up_depth = ACTIVITY_HIERARCHY_DEPTH
+        if down_depth is None:
+            down_depth = ACTIVITY_HIERARCHY_DEPTH
+        
+        activity_ids = self._snapshot.taxonomy.hierarchy_ids(normalized_name, up_depth, down_depth)
+        rows = self._snapshot.organizations_by_activities(activity_ids)
+        return self._result(self._page(rows, limit, after))
+    
+    async def list_by_radius(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_meters: float,
+        order: RadiusOrder = "id",
+        limit: Optional[int] = None,
+        after: Optional[Tuple] = None
+    ) -> List[OrganizationEntity]:
+        """
+        Получить организации в радиусе от точки
+        :param latitude: Широта центральной точки
+        :param longitude: Долгота центральной точки
+        :param radius_meters: Радиус поиска в метрах
+        :param order: id - по ID организации, distance - по расстоянию до точки
+            (заполняет distance_meters и distance_order)
+        :param limit: Размер страницы
+        :param after: Ключ последней организации предыдущей страницы - (id,) или (distance_order, id)
+        :return: Список организаций
+        """
+
+        snapshot = self._snapshot
+        building_rows, distances = snapshot.buildings_in_radius(latitude, longitude, radius_meters)
+        
+        if order != "distance":
+            return self._result(self._page(snapshot.organizations_of_buildings(building_rows), limit, after))
+        
+        rows, distances = snapshot.organizations_with_distances(building_rows, distances)
+        if after is not None:
+            after_distance, after_id = after
+            first_row = bisect.bisect_right(snapshot.organization_ids, after_id)
+            mask = (distances > after_distance) | ((distances == after_distance) & (rows >= first_row))
+            rows, distances = rows[mask], distances[mask]
+        order = np.lexsort((rows, distances))[:limit]
+        rows, distances = rows[order], distances[order]
+        meters = snapshot.spheroid_distances(rows, latitude, longitude)
+        return self._result(
+            list(zip(rows.tolist(), meters.tolist(), distances.tolist())),
+            ("distance_meters", "distance_order")
+        )
+    
+    async def list_by_rectangle(
+        self,
+        min_latitude: float,
+        min_longitude: float,
+        max_latitude: float,
+        max_longitude: float,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[str]] = None
+    ) -> List[OrganizationEntity]:
+        building_rows = self._snapshot.buildings_in_rectangle(min_latitude, min_longitude, max_latitude, max_longitude)
+        rows = self._snapshot.organizations_of_buildings(building_rows)
+        return self._result(self._page(rows, limit, after))
+    
+    async def list_points_by_rectangle(
+        self,
+        min_latitude: float,
+        min_longitude: float,
+        max_latitude: float,
+        max_longitude: float
+    ) -> List[Tuple[str, float, float]]:
+        """
+        Получить ID организаций и координаты их зданий в прямоугольной области, включая границу
+        :return: Список (id организации, широта, долгота)
+        """
+
+        snapshot = self._snapshot
+        return [
+            (snapshot.organization_ids[row], snapshot.latitudes[building_row], snapshot.longitudes[building_row])
+            for building_row in snapshot.buildings_in_rectangle(
+                min_latitude, min_longitude, max_latitude, max_longitude, inclusive=True
+            ).tolist()
+            for row in snapshot.organizations_of_building(building_row)
+        ]
+    
+    async def list_by_ids(self, org_ids: List[str]) -> List[OrganizationEntity]:
+        index = self._snapshot.organization_index
+        return self._result(sorted({index[org_id] for org_id in org_ids if org_id in index}))
+    
+    async def list_nearest(
+        self,
+        latitude: float,
+        longitude: float,
+        k: int,
+        activity_name: Optional[str] = None
+    ) -> List[OrganizationEntity]:
+        """
+        Получить k ближайших к точке организаций
+        :param latitude: Широта точки
+        :param longitude: Долгота точки
+        :param k: Количество организаций
+        :param activity_name: Точное название вида деятельности для фильтрации
+        :return: Список организаций по возрастанию расстояния, с заполненным distance_meters
+        """
+
+        rows = None
+        if activity_name is not None:
+            rows = self._rows_by_activity(activity_name)
+            if not rows:
+                return []
+        
+        nearest = self._snapshot.nearest(latitude, longitude, k, rows)
+        rows = [row for _, row in nearest]
+        meters = self._snapshot.spheroid_distances(np.asarray(rows, dtype=np.int64), latitude, longitude)
+        return self._result(list(zip(rows, meters.tolist())), ("distance_meters",))
+    
+    async def list_clusters(
+        self,
+        min_latitude: float,
+        min_longitude: float,
+        max_latitude: float,
+        max_longitude: float,
+        grid_size: float
+    ) -> List[ClusterEntity]:
+        return self._snapshot.clusters(min_latitude, min_longitude, max_latitude, max_longitude, grid_size)
+
+
+class BuildingSnapshotRepo:
+    """
+    Репозиторий зданий, отвечающий из снимка справочника в памяти процесса
+    """
+
+    def __init__(self, snapshot: DirectorySnapshot):
+        self._snapshot = snapshot
+    
+    async def list_by_radius(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_meters: float
+    ) -> List[BuildingEntity]:
+        building_rows, _ = self._snapshot.buildings_in_radius(latitude, longitude, radius_meters)
+        return [self._snapshot.building(building_row) for building_row in building_rows.tolist()]
+    
+    async def list_by_rectangle(
+        self,
+        min_latitude: float,
+        min_longitude: float,
+        max_latitude: float,
+        max_longitude: float
+    ) -> List[BuildingEntity]:
+        building_rows = self._snapshot.buildings_in_rectangle(min_latitude, min_longitude, max_latitude, max_longitude)
+        return [self._snapshot.building(building_row) for building_row in building_rows.tolist()]
@@ -0,0 +1,513 @@
+import asyncio
+import bisect
+import math
+import re
+import struct
+from array import array
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.exc import SQLAlchemyError
+from app.repo.organization.models import Organization, OrganizationPhone, organization_activities
+from app.repo.activity.models import Activity
+from app.repo.activity.taxonomy import ActivityTaxonomy
+from app.repo.building.models import Building
+from app.repo.snapshot.models import directory_version
+from app.repo.snapshot.geo import SPHERE_RADIUS, spheroid_distances
+from app.repo.snapshot.spatial import GridIndex
+from app.entity.organization import OrganizationEntity, OrganizationPhoneEntity
+from app.entity.activity import ActivityEntity
+from app.entity.building import BuildingEntity
+from app.entity.cluster import ClusterEntity
+from app.exceptions import DatabaseQueryError
+from app.logger import logger
+
+
+buildings = Building.__table__
+organizations = Organization.__table__
+activities = Activity.__table__
+phones = OrganizationPhone.__table__
+
+SNAPSHOT_TABLES = (buildings, organizations, activities, organization_activities, phones)
+
+BUILDINGS_QUERY = select(buildings.c.id, buildings.c.address, buildings.c.latitude, buildings.c.longitude)
+ORGANIZATIONS_QUERY = select(
+    organizations.c.id,
+    organizations.c.title,
+    organizations.c.title_normalized,
+    organizations.c.building_id
+)
+ACTIVITIES_QUERY = select(activities.c.id, activities.c.name, activities.c.parent_id)
+ORGANIZATION_ACTIVITIES_QUERY = select(organization_activities.c.organization_id, organization_activities.c.activity_id)
+PHONES_QUERY = select(phones.c.organization_id, phones.c.id, phones.c.phone_number)
+# Версия содержимого справочника - счетчик изменений таблиц SNAPSHOT_TABLES, который ведут
+# триггеры: проверка читает одну строку, а не хеширует все таблицы
+VERSION_QUERY = select(directory_version.c.version).where(directory_version.c.id == 1)
+
+# Разделитель названий в общей строке поиска: в text Postgres нулевого символа быть не может
+TITLE_SEPARATOR = "\x00"
+
+# Начальный радиус поиска ближайших организаций, увеличивается, пока их меньше k
+NEAREST_START_RADIUS_METERS = 1000
+
+_WORD = re.compile(r"[^\W_]+")
+_FLOAT4 = struct.Struct("f")
+
+
+def trigrams(value: str) -> frozenset:
+    """
+    Триграммы строки, как в pg_trgm: слова из букв и цифр, дополненные
+    двумя пробелами в начале и одним в конце
+    :param value: Нормализованная строка
+    :return: Множество триграмм
+    """
+
+    result = set()
+    for word in _WORD.findall(value):
+        padded = "  %s " % word
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(result)
+
+
+def similarity(value_trigrams: frozenset, other_trigrams: frozenset) -> float:
+    """
+    Похожесть строк, как similarity() pg_trgm, с точностью real (float4)
+    :return: Доля общих триграмм от всех триграмм обеих строк
+    """
+
+    if not value_trigrams or not other_trigrams:
+        return 0.0
+    common = len(value_trigrams & other_trigrams)
+    return _FLOAT4.unpack(_FLOAT4.pack(common / (len(value_trigrams) + len(other_trigrams) - common)))[0]
+
+
+def _offsets(keys: Sequence[int], size: int) -> array:
+    """
+    Границы групп в отсортированном массиве ключей
+    :param keys: Отсортированные ключи (номера строк)
+    :param size: Количество групп
+    :return: offsets, группа i - позиции offsets[i]:offsets[i + 1]
+    """
+
+    return array("i", (bisect.bisect_left(keys, i) for i in range(size + 1)))
+
+
+@dataclass(frozen=True)
+class DirectorySnapshot:
+    """
+    Неизменяемый снимок справочника (организации, здания, виды деятельности, телефоны)
+    в колоночном виде: значения полей хранятся отдельными списками и массивами array,
+    связи - массивами границ групп (offsets), Entity собираются только для строк ответа.
+    Организации и здания упорядочены по id, поэтому номер строки задает порядок сортировки
+    по id, а отсортированный список строк - это keyset страница.
+    id сравниваются по кодам символов, как при сортировке Postgres для id из uuid.
+    """
+    version: str
+    organization_ids: List[str]
+    organization_index: Mapping[str, int]
+    titles: List[str]
+    titles_normalized: List[str]
+    # Нормализованные названия через TITLE_SEPARATOR и начало каждого в этой строке
+    titles_text: str
+    title_starts: array
+    organization_buildings: array
+    activity_offsets: array
+    activity_ids: array
+    phone_offsets: array
+    phone_ids: List[str]
+    phone_numbers: List[str]
+    building_ids: List[str]
+    building_index: Mapping[str, int]
+    addresses: List[str]
+    latitudes: array
+    longitudes: array
+    building_organization_offsets: np.ndarray
+    building_organizations: np.ndarray
+    # Пространственный индекс зданий, точка индекса - строка здания
+    spatial: GridIndex
+    activities: Mapping[int, ActivityEntity]
+    activity_organizations: Mapping[int, array]
+    taxonomy: ActivityTaxonomy
+    
+    @classmethod
+    def build(
+        cls,
+        building_rows: Iterable[Tuple[str, str, float, float]],
+        organization_rows: Iterable[Tuple[str, str, str, str]],
+        activity_rows: Iterable[Tuple[int, str, Optional[int]]],
+        organization_activity_rows: Iterable[Tuple[str, int]],
+        phone_rows: Iterable[Tuple[str, str, str]],
+        version: str
+    ) -> "DirectorySnapshot":
+        """
+        Построение снимка по строкам таблиц, прочитанным в одной транзакции
+        :param building_rows: (id, address, latitude, longitude)
+        :param organization_rows: (id, title, title_normalized, building_id)
+        :param activity_rows: (id, name, parent_id)
+        :param organization_activity_rows: (organization_id, activity_id)
+        :param phone_rows: (organization_id, id, phone_number)
+        :param version: Версия содержимого таблиц
+        :return: DirectorySnapshot
+        """
+
+        building_rows = sorted(building_rows)
+        building_ids = [row[0] for row in building_rows]
+        building_index = {building_id: i for i, building_id in enumerate(building_ids)}
+        latitudes = array("d", (row[2] for row in building_rows))
+        longitudes = array("d", (row[3] for row in building_rows))
+        
+        organization_rows = sorted(organization_rows)
+        organization_ids = [row[0] for row in organization_rows]
+        organization_index = {organization_id: i for i, organization_id in enumerate(organization_ids)}
+        titles_normalized = [row[2] for row in organization_rows]
+        organization_buildings = array("i", (building_index[row[3]] for row in organization_rows))
+        
+        title_starts = array("i", [0])
+        for title in titles_normalized:
+            title_starts.append(title_starts[-1] + len(title) + len(TITLE_SEPARATOR))
+        
+        by_building = sorted(range(len(organization_ids)), key=organization_buildings.__getitem__)
+        
+        links = sorted(
+            (organization_index[organization_id], activity_id)
+            for organization_id, activity_id in organization_activity_rows
+        )
+        activity_organizations: Dict[int, array] = {}
+        for row, activity_id in links:
+            activity_organizations.setdefault(activity_id, array("i")).append(row)
+        
+        phone_rows = sorted(
+            (organization_index[organization_id], phone_id, phone_number)
+            for organization_id, phone_id, phone_number in phone_rows
+        )
+        
+        activity_rows = list(activity_rows)
+        return cls(
+            version=version,
+            organization_ids=organization_ids,
+            organization_index=organization_index,
+            titles=[row[1] for row in organization_rows],
+            titles_normalized=titles_normalized,
+            titles_text="".join(title + TITLE_SEPARATOR for title in titles_normalized),
+            title_starts=title_starts,
+            organization_buildings=organization_buildings,
+            activity_offsets=_offsets([row for row, _ in links], len(organization_ids)),
+            activity_ids=array("i", (activity_id for _, activity_id in links)),
+            phone_offsets=_offsets([row[0] for row in phone_rows], len(organization_ids)),
+            phone_ids=[row[1] for row in phone_rows],
+            phone_numbers=[row[2] for row in phone_rows],
+            building_ids=building_ids,
+            building_index=building_index,
+            addresses=[row[1] for row in building_rows],
+            latitudes=latitudes,
+            longitudes=longitudes,
+            building_organization_offsets=np.array(
+                _offsets([organization_buildings[row] for row in by_building], len(building_ids)), dtype=np.int64
+            ),
+            building_organizations=np.array(by_building, dtype=np.int32),
+            spatial=GridIndex(latitudes, longitudes),
+            activities={row[0]: ActivityEntity(*row) for row in activity_rows},
+            activity_organizations=activity_organizations,
+            taxonomy=ActivityTaxonomy.build(activity_rows, version),
+        )
+    
+    def building(self, building_row: int) -> BuildingEntity:
+        return BuildingEntity(
+            self.building_ids[building_row],
+            self.addresses[building_row],
+            self.latitudes[building_row],
+            self.longitudes[building_row]
+        )
+    
+    def to_entities(self, items: Sequence, extra_fields: Sequence[str] = ()) -> List[OrganizationEntity]:
+        """
+        Entity организаций, здания общие для организаций пачки, виды деятельности - для всего снимка
+        :param items: Номера строк организаций или кортежи (номер строки, значения extra_fields)
+        :param extra_fields: Дополнительные поля Entity, например distance_meters
+        :return: Список OrganizationEntity
+        """
+
+        buildings: Dict[int, BuildingEntity] = {}
+        if not extra_fields:
+            return [self._entity(row, buildings) for row in items]
+        return [self._entity(row, buildings, **dict(zip(extra_fields, values))) for row, *values in items]
+    
+    def _entity(self, row: int, buildings: Dict[int, BuildingEntity], **extra) -> OrganizationEntity:
+        building_row = self.organization_buildings[row]
+        building = buildings.get(building_row)
+        if building is None:
+            building = buildings[building_row] = self.building(building_row)
+        
+        start, end = self.activity_offsets[row], self.activity_offsets[row + 1]
+        activities = [self.activities[activity_id] for activity_id in self.activity_ids[start:end]]
+        
+        start, end = self.phone_offsets[row], self.phone_offsets[row + 1]
+        phones = [OrganizationPhoneEntity(self.phone_ids[i], self.phone_numbers[i]) for i in range(start, end)]
+        
+        return OrganizationEntity(
+            id=self.organization_ids[row],
+            title=self.titles[row],
+            building_id=building.id,
+            building=building,
+            activities=activities or None,
+            phones=phones or None,
+            **extra
+        )
+    
+    def organizations_of_building(self, building_row: int) -> List[int]:
+        """Строки организаций здания по возрастанию id"""
+        offsets = self.building_organization_offsets
+        return self.building_organizations[offsets[building_row]:offsets[building_row + 1]].tolist()
+    
+    def organizations_of_buildings(self, building_rows: np.ndarray) -> List[int]:
+        """Строки организаций зданий по возрастанию id"""
+        rows, _ = self.organizations_with_distances(building_rows, np.zeros(len(building_rows)))
+        return np.sort(rows).tolist()
+    
+    def organizations_by_activities(self, activity_ids: Iterable[int]) -> List[int]:
+        """Строки организаций хотя бы с одним из видов деятельности, по возрастанию id"""
+        rows = set()
+        for activity_id in activity_ids:
+            rows.update(self.activity_organizations.get(activity_id, ()))
+        return sorted(rows)
+    
+    def organizations_by_title(self, normalized_name: str) -> List[int]:
+        """
+        Строки организаций, нормализованное название которых содержит строку
+        (LIKE '%name%'), по возрастанию id
+        :param normalized_name: Нормализованная строка поиска
+        :return: Список строк
+        """
+
+        if not normalized_name or TITLE_SEPARATOR in normalized_name:
+            return []
+        
+        rows = []
+        position = self.titles_text.find(normalized_name)
+        while position >= 0:
+            row = bisect.bisect_right(self.title_starts, position) - 1
+            rows.append(row)
+            position = self.titles_text.find(normalized_name, self.title_starts[row + 1])
+        return rows
+    
+    def buildings_in_rectangle(
+        self,
+        min_latitude: float,
+        min_longitude: float,
+        max_latitude: float,
+        max_longitude: float,
+        inclusive: bool = False
+    ) -> np.ndarray:
+        """
+        Здания внутри прямоугольника (ST_Within) или внутри и на границе (ST_Intersects)
+        :param inclusive: Включать здания на границе
+        :return: Строки зданий по возрастанию id
+        """
+
+        return self.spatial.rectangle(min_latitude, min_longitude, max_latitude, max_longitude, inclusive)
+    
+    def buildings_in_radius(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_meters: float,
+        spheroid: bool = True
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Здания на расстоянии не больше радиуса от точки
+        :param spheroid: Расстояние по сфероиду (как ST_DWithin для geography), иначе - по сфере
+        :return: (строки зданий по возрастанию id, расстояния <-> до них)
+        """
+
+        return self.spatial.radius(latitude, longitude, radius_meters, spheroid)
+        
+    def organizations_with_distances(
+        self,
+        building_rows: np.ndarray,
+        distances: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Организации зданий с расстояниями зданий
+        :param building_rows: Строки зданий
+        :param distances: Расстояния до зданий
+        :return: (строки организаций, расстояния до них)
+        """
+    
+        offsets = self.building_organization_offsets
+        starts, counts = offsets[building_rows], offsets[building_rows + 1] - offsets[building_rows]
+        positions = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        return self.building_organizations[positions], np.repeat(distances, counts)
+    
+    def spheroid_distances(self, rows: np.ndarray, latitude: float, longitude: float) -> np.ndarray:
+        """
+        Расстояния по сфероиду от зданий организаций до точки, как ST_Distance для geography
+        :param rows: Строки организаций
+        :return: Массив расстояний в метрах
+        """
+
+        building_rows = np.frombuffer(self.organization_buildings, dtype=np.int32)[rows]
+        return spheroid_distances(
+            latitude, longitude, self.spatial.latitudes[building_rows], self.spatial.longitudes[building_rows]
+        )
+    
+    def nearest(
+        self,
+        latitude: float,
+        longitude: float,
+        k: int,
+        rows: Optional[Sequence[int]] = None
+    ) -> List[Tuple[float, int]]:
+        """
+        k ближайших к точке организаций по расстоянию <->, при равенстве - по id.
+        Без фильтра здания ищутся в круге, радиус которого растет, пока в нем меньше k организаций.
+        :param rows: Строки организаций, среди которых идет поиск, None - все организации
+        :return: Пары (расстояние, строка организации) по возрастанию расстояния
+        """
+
+        if k <= 0:
+            return []
+        
+        if rows is not None:
+            rows = np.asarray(rows, dtype=np.int64)
+            building_rows = np.frombuffer(self.organization_buildings, dtype=np.int32)[rows]
+            distances = self.spatial.distances(building_rows, latitude, longitude)
+        else:
+            radius_meters = NEAREST_START_RADIUS_METERS
+            while True:
+                building_rows, distances = self.buildings_in_radius(latitude, longitude, radius_meters, spheroid=False)
+                rows, distances = self.organizations_with_distances(building_rows, distances)
+                if len(rows) >= k or radius_meters >= math.pi * SPHERE_RADIUS:
+                    break
+                radius_meters *= 4
+        
+        order = np.lexsort((rows, distances))[:k]
+        return list(zip(distances[order].tolist(), rows[order].tolist()))
+    
+    def clusters(
+        self,
+        min_latitude: float,
+        min_longitude: float,
+        max_latitude: float,
+        max_longitude: float,
+        grid_size: float
+    ) -> List[ClusterEntity]:
+        """
+        Количество и центр организаций по ячейкам сетки (ST_SnapToGrid) внутри прямоугольника
+        :return: Список кластеров
+        """
+
+        building_rows = self.buildings_in_rectangle(min_latitude, min_longitude, max_latitude, max_longitude)
+        offsets = self.building_organization_offsets
+        counts = offsets[building_rows + 1] - offsets[building_rows]
+        building_rows, counts = building_rows[counts > 0], counts[counts > 0]
+            
+        latitudes, longitudes = self.spatial.latitudes[building_rows], self.spatial.longitudes[building_rows]
+        # Узлы сетки, как ST_SnapToGrid: np.rint округляет половину к четному
+        nodes = np.stack([np.rint(longitudes / grid_size), np.rint(latitudes / grid_size)], axis=1)
+        _, cells = np.unique(nodes, axis=0, return_inverse=True)
+        cells = cells.reshape(-1)
+        totals = np.bincount(cells, weights=counts)
+        latitude_sums = np.bincount(cells, weights=latitudes * counts)
+        longitude_sums = np.bincount(cells, weights=longitudes * counts)
+        
+        return [
+            ClusterEntity(latitude=latitude_sum / count, longitude=longitude_sum / count, count=int(count))
+            for latitude_sum, longitude_sum, count in zip(
+                latitude_sums.tolist(), longitude_sums.tolist(), totals.tolist()
+            )
+        ]
+    
+    def __len__(self) -> int:
+        return len(self.organization_ids)
+
+
+class DirectorySnapshotCache:
+    """
+    Снимок справочника в памяти процесса для ORGANIZATION_FETCH_MODE=snapshot.
+    Новый снимок собирается отдельно от текущего и заменяет его одной операцией
+    присваивания: запросы, начатые на старом снимке, дочитывают его, новые видят новый.
+    """
+
+    def __init__(self):
+        self._snapshot: Optional[DirectorySnapshot] = None
+    
+    @property
+    def current(self) -> Optional[DirectorySnapshot]:
+        """Текущий снимок или None, если справочник еще не загружен"""
+        return self._snapshot
+    
+    async def load(self, session: AsyncSession) -> DirectorySnapshot:
+        """
+        Загрузить справочник из БД и заменить текущий снимок.
+        Таблицы читаются в одной транзакции REPEATABLE READ - согласованно между собой.
+        Снимок собирается в отдельном потоке, event loop в это время обслуживает запросы.
+        :param session: Сессия БД без начатой транзакции
+        :return: Новый снимок
+        """
+
+        try:
+            await session.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+            version = await self._fetch_version(session)
+            rows = []
+            for query in (
+                BUILDINGS_QUERY,
+                ORGANIZATIONS_QUERY,
+                ACTIVITIES_QUERY,
+                ORGANIZATION_ACTIVITIES_QUERY,
+                PHONES_QUERY
+            ):
+                rows.append((await session.execute(query)).all())
+        except SQLAlchemyError as e:
+            raise DatabaseQueryError("Error loading directory snapshot: %s" % e)
+        
+        snapshot = await asyncio.to_thread(DirectorySnapshot.build, *rows, version)
+        self._snapshot = snapshot
+        return snapshot
+    
+    async def refresh(self, session: AsyncSession) -> bool:
+        """
+        Перезагрузить справочник, если версия содержимого таблиц изменилась
+        :param session: Сессия БД без начатой транзакции
+        :return: True, если снимок был заменен
+        """
+
+        try:
+            version = await self._fetch_version(session)
+        except SQLAlchemyError as e:
+            raise DatabaseQueryError("Error checking directory snapshot version: %s" % e)
+        
+        if self._snapshot is not None and self._snapshot.version == version:
+            return False
+        
+        await session.rollback()
+        await self.load(session)
+        return True
+    
+    async def run_refresh_loop(self, session_maker: async_sessionmaker, interval: float) -> None:
+        """
+        Периодическая проверка версии справочника, ошибки логируются и не прерывают цикл
+        :param session_maker: Фабрика сессий БД
+        :param interval: Период проверки в секундах
+        """
+
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                async with session_maker() as session:
+                    if await self.refresh(session):
+                        logger.info(
+                            "Directory snapshot reloaded: %d organizations, version %s",
+                            len(self._snapshot), self._snapshot.version
+                        )
+            except (DatabaseQueryError, OSError) as e:
+                logger.warning("Directory snapshot refresh failed: %s", e)
+    
+    @staticmethod
+    async def _fetch_version(session: AsyncSession) -> str:
+        result = await session.execute(VERSION_QUERY)
+        return str(result.scalar_one())
+
+
+directory_snapshot = DirectorySnapshotCache()
@@ -0,0 +1,244 @@
+import math
+from typing import Iterable, List, Sequence, Tuple
+import numpy as np
+from app.repo.snapshot.geo import (
+    MIN_CURVATURE_RADIUS,
+    SPHERE_RADIUS,
+    radius_bounds,
+    sphere_distances,
+    spheroid_distance,
+    spheroid_distances,
+    spheroid_ratio_bounds,
+)
+
+
+# Среднее количество точек в ячейке сетки
+POINTS_PER_CELL = 8
+
+# Наименьший размер ячейки в градусах (около 1 см)
+MIN_CELL_DEGREES = 1e-7
+
+# До стольких точек у границы радиуса расстояние по сфероиду считается по одной:
+# векторная формула Винсенти дороже из-за постоянных затрат на итерации
+SCALAR_SPHEROID_POINTS = 32
+
+
+class GridIndex:
+    """
+    Пространственный индекс точек (зданий) - равномерная сетка по широте и долготе
+    над массивами NumPy. Размер ячейки подбирается по рамке точек так, чтобы в ячейке
+    было в среднем POINTS_PER_CELL точек.
+    Точки упорядочены по ячейкам: по строке сетки (широте), внутри строки - по столбцу (долготе),
+    а cell_starts хранит начало каждой ячейки, поэтому точки соседних ячеек одной строки -
+    непрерывный срез массивов координат. Запрос берет срезы ячеек, пересекающих рамку,
+    и проверяет точки в них векторно: маской по рамке для прямоугольника,
+    расстоянием по сфере (и по сфероиду у границы радиуса) для круга.
+    Точки обозначаются номерами - позициями в исходных массивах координат.
+    """
+
+    def __init__(
+        self,
+        latitudes: Sequence[float],
+        longitudes: Sequence[float],
+        points_per_cell: int = POINTS_PER_CELL
+    ):
+        """
+        Построение индекса по всем точкам сразу
+        :param latitudes: Широты точек
+        :param longitudes: Долготы точек
+        :param points_per_cell: Среднее количество точек в ячейке
+        """
+
+        self.latitudes = np.asarray(latitudes, dtype=np.float64)
+        self.longitudes = np.asarray(longitudes, dtype=np.float64)
+        size = len(self.latitudes)
+        
+        if size:
+            self._min_latitude, self._max_latitude = float(self.latitudes.min()), float(self.latitudes.max())
+            self._min_longitude, self._max_longitude = float(self.longitudes.min()), float(self.longitudes.max())
+        else:
+            self._min_latitude = self._max_latitude = self._min_longitude = self._max_longitude = 0.0
+        
+        latitude_span = self._max_latitude - self._min_latitude
+        longitude_span = self._max_longitude - self._min_longitude
+        cells = max(1, size // points_per_cell)
+        self._cell_degrees = max(
+            math.sqrt(latitude_span * longitude_span / cells),
+            max(latitude_span, longitude_span) / cells,
+            MIN_CELL_DEGREES
+        )
+        self._rows = int(latitude_span // self._cell_degrees) + 1
+        self._columns = int(longitude_span // self._cell_degrees) + 1
+        
+        keys = self._row(self.latitudes) * self._columns + self._column(self.longitudes)
+        self._points = np.argsort(keys, kind="stable").astype(np.int32)
+        self._cell_starts = np.searchsorted(keys[self._points], np.arange(self._rows * self._columns + 1))
+        self._cell_latitudes = self.latitudes[self._points]
+        self._cell_longitudes = self.longitudes[self._points]
+    
+    @classmethod
+    def from_buildings(cls, buildings: Iterable, points_per_cell: int = POINTS_PER_CELL) -> "GridIndex":
+        """
+        Индекс по строкам зданий (Building или BuildingEntity), точка - позиция здания в buildings
+        :param buildings: Здания с полями latitude и longitude
+        :param points_per_cell: Среднее количество точек в ячейке
+        :return: GridIndex
+        """
+
+        buildings = list(buildings)
+        return cls(
+            [building.latitude for building in buildings],
+            [building.longitude for building in buildings],
+            points_per_cell
+        )
+    
+    def _row(self, latitudes):
+        rows = np.floor((np.asarray(latitudes) - self._min_latitude) / self._cell_degrees)
+        return np.clip(rows, 0, self._rows - 1).astype(np.int64)
+    
+    def _column(self, longitudes):
+        columns = np.floor((np.asarray(longitudes) - self._min_longitude) / self._cell_degrees)
+        return np.clip(columns, 0, self._columns - 1).astype(np.int64)
+    
+    def _spans(
+        self,
+        min_latitude: float,
+        max_latitude: float,
+        longitude_ranges: List[Tuple[float, float]]
+    ) -> List[Tuple[int, int]]:
+        """
+        Срезы массивов точек по ячейкам, пересекающим рамку
+        :param longitude_ranges: Диапазоны долгот рамки (два, если рамка пересекает 180-й меридиан)
+        :return: Непересекающиеся срезы (начало, конец)
+        """
+
+        if not len(self._points) or min_latitude > self._max_latitude or max_latitude < self._min_latitude:
+            return []
+        
+        columns = []
+        for first, last in sorted(
+            (int(self._column(start)), int(self._column(end)))
+            for start, end in longitude_ranges
+            if start <= self._max_longitude and end >= self._min_longitude
+        ):
+            # Диапазоны долгот могут попасть в одни и те же столбцы сетки
+            if columns and first <= columns[-1][1] + 1:
+                columns[-1] = (columns[-1][0], max(columns[-1][1], last))
+            else:
+                columns.append((first, last))
+        
+        spans = []
+        for row in range(int(self._row(min_latitude)), int(self._row(max_latitude)) + 1):
+            for first, last in columns:
+                start = self._cell_starts[row * self._columns + first]
+                end = self._cell_starts[row * self._columns + last + 1]
+                if start == end:
+                    continue
+                if spans and spans[-1][1] == start:
+                    spans[-1] = (spans[-1][0], end)
+                else:
+                    spans.append((start, end))
+        return spans
+    
+    def _candidates(
+        self,
+        min_latitude: float,
+        max_latitude: float,
+        longitude_ranges: List[Tuple[float, float]]
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Точки ячеек, пересекающих рамку
+        :return: (номера точек, широты, долготы)
+        """
+
+        spans = self._spans(min_latitude, max_latitude, longitude_ranges)
+        if len(spans) == 1:
+            start, end = spans[0]
+            return self._points[start:end], self._cell_latitudes[start:end], self._cell_longitudes[start:end]
+        return tuple(
+            np.concatenate([values[start:end] for start, end in spans]) if spans else values[:0]
+            for values in (self._points, self._cell_latitudes, self._cell_longitudes)
+        )
+    
+    def rectangle(
+        self,
+        min_latitude: float,
+        min_longitude: float,
+        max_latitude: float,
+        max_longitude: float,
+        inclusive: bool = False
+    ) -> np.ndarray:
+        """
+        Точки внутри прямоугольника (ST_Within) или внутри и на границе (ST_Intersects)
+        :param inclusive: Включать точки на границе
+        :return: Номера точек по возрастанию
+        """
+
+        points, latitudes, longitudes = self._candidates(min_latitude, max_latitude, [(min_longitude, max_longitude)])
+        if inclusive:
+            mask = (latitudes >= min_latitude) & (latitudes <= max_latitude)
+            mask &= (longitudes >= min_longitude) & (longitudes <= max_longitude)
+        else:
+            mask = (latitudes > min_latitude) & (latitudes < max_latitude)
+            mask &= (longitudes > min_longitude) & (longitudes < max_longitude)
+        return np.sort(points[mask])
+    
+    def radius(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_meters: float,
+        spheroid: bool = True
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Точки на расстоянии не больше радиуса от центра
+        :param spheroid: Расстояние по сфероиду (как ST_DWithin для geography), иначе - по сфере (как <->).
+            По сфероиду считаются только точки, для которых это не следует из расстояния по сфере
+            и границ их отношения (spheroid_ratio_bounds).
+        :return: (номера точек по возрастанию, расстояния по сфере до них)
+        """
+
+        min_latitude, max_latitude, delta_longitude = radius_bounds(
+            latitude, longitude, radius_meters, MIN_CURVATURE_RADIUS if spheroid else SPHERE_RADIUS
+        )
+        if delta_longitude is None or delta_longitude >= 180:
+            longitude_ranges = [(-180.0, 180.0)]
+        else:
+            start, end = longitude - delta_longitude, longitude + delta_longitude
+            longitude_ranges = [(start, end)]
+            if start < -180:
+                longitude_ranges.append((start + 360, 180.0))
+            if end > 180:
+                longitude_ranges.append((-180.0, end - 360))
+        
+        points, latitudes, longitudes = self._candidates(min_latitude, max_latitude, longitude_ranges)
+        distances = sphere_distances(latitude, longitude, latitudes, longitudes)
+        if spheroid:
+            lower, upper = spheroid_ratio_bounds(min_latitude, max_latitude)
+            mask = distances * upper <= radius_meters
+            near_border = np.flatnonzero(~mask & (distances * lower <= radius_meters))
+            if len(near_border) > SCALAR_SPHEROID_POINTS:
+                mask[near_border] = spheroid_distances(
+                    latitude, longitude, latitudes[near_border], longitudes[near_border]
+                ) <= radius_meters
+            else:
+                for i in near_border.tolist():
+                    mask[i] = spheroid_distance(latitude, longitude, latitudes[i], longitudes[i]) <= radius_meters
+        else:
+            mask = distances <= radius_meters
+        
+        points, distances = points[mask], distances[mask]
+        order = np.argsort(points)
+        return points[order], distances[order]
+    
+    def distances(self, points: np.ndarray, latitude: float, longitude: float) -> np.ndarray:
+        """
+        Расстояния по сфере от точек индекса до точки, как оператор <-> для geography
+        :param points: Номера точек
+        :return: Массив расстояний в метрах
+        """
+
+        return sphere_distances(latitude, longitude, self.latitudes[points], self.longitudes[points])
+    
+    def __len__(self) -> int:
+        return len(self.latitudes)
@@ -0,0 +1,87 @@
+from typing import AsyncIterator, Callable, Generic, List, Sequence, TypeVar
+from sqlalchemy.ext.asyncio import AsyncResult
+from sqlalchemy.exc import SQLAlchemyError
+from app.exceptions import DatabaseQueryError
+
+
+T = TypeVar("T")
+
+
+class EntityStream(Generic[T]):
+    """
+    Поток Entity, читаемый порциями из серверного курсора (AsyncSession.stream()).
+    Одновременно в памяти находится только одна порция строк.
+    """
+
+    def __init__(self, result: AsyncResult, to_entities: Callable[[Sequence], List[T]]):
+        """
+        :param result: Результат запроса с execution_options(yield_per=...)
+        :param to_entities: Преобразование порции строк результата в Entity
+        """
+
+        self._result = result
+        self._to_entities = to_entities
+        self._partitions = result.partitions()
+        self._first: List[T] = []
+
+    async def open(self) -> "EntityStream[T]":
+        """
+        Прочитать первую порцию: ошибки запроса возникают до начала ответа,
+        а пустой результат определяется без чтения всего потока
+        :return: Этот же поток
+        """
+
+        rows = await anext(self._partitions, [])
+        self._first = self._to_entities(rows)
+        return self
+
+    def __bool__(self) -> bool:
+        return bool(self._first)
+
+    async def __aiter__(self) -> AsyncIterator[T]:
+        first, self._first = self._first, []
+        for entity in first:
+            yield entity
+
+        try:
+            async for rows in self._partitions:
+                for entity in self._to_entities(rows):
+                    yield entity
+        except SQLAlchemyError as e:
+            raise DatabaseQueryError("Error streaming query result: %s" % e)
+
+    async def aclose(self) -> None:
+        """Закрыть серверный курсор, в том числе не дочитанный до конца"""
+        await self._result.close()
+
+
+class SequenceStream(Generic[T]):
+    """
+    Поток Entity из последовательности в памяти (например, строк снимка справочника)
+    с интерфейсом EntityStream: элементы преобразуются в Entity порциями по мере чтения.
+    """
+
+    def __init__(self, items: Sequence, to_entities: Callable[[Sequence], List[T]], batch_size: int):
+        """
+        :param items: Элементы в порядке ответа
+        :param to_entities: Преобразование порции элементов в Entity
+        :param batch_size: Размер порции
+        """
+
+        self._items = items
+        self._to_entities = to_entities
+        self._batch_size = batch_size
+    
+    async def open(self) -> "SequenceStream[T]":
+        return self
+    
+    def __bool__(self) -> bool:
+        return bool(self._items)
+    
+    async def __aiter__(self) -> AsyncIterator[T]:
+        for start in range(0, len(self._items), self._batch_size):
+            for entity in self._to_entities(self._items[start:start + self._batch_size]):
+                yield entity
+    
+    async def aclose(self) -> None:
+        pass
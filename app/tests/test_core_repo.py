@@ -0,0 +1,73 @@
+import pytest
+from collections import namedtuple
+from unittest.mock import AsyncMock, MagicMock
+from app.repo.organization.core_repo import OrganizationCoreRepo
+from app.repo.building.repo import BuildingRepo
+from app.entity.building import BuildingEntity
+
+
+OrganizationRow = namedtuple("OrganizationRow", ["id", "title", "building_id", "distance_meters", "distance_order"])
+
+
+def _result(rows):
+    result = MagicMock()
+    result.all.return_value = rows
+    result.__iter__.return_value = iter(rows)
+    return result
+
+
+class TestOrganizationCoreRepo:
+    """Тесты для OrganizationCoreRepo"""
+    
+    @pytest.mark.asyncio
+    async def test_rows_mapped_to_entities(self):
+        """Тест сборки Entity из строк основного запроса и трех запросов связанных данных"""
+        session = MagicMock()
+        session.execute = AsyncMock(side_effect=[
+            _result([
+                OrganizationRow("org-1", "Молоко", "building-1", 10.5, 10.4),
+                OrganizationRow("org-2", "Сыр", "building-1", 20.0, 19.9),
+            ]),
+            _result([("building-1", "Москва", 55.7, 37.6)]),
+            _result([("org-1", 3, "Молочная продукция", 1), ("org-2", 3, "Молочная продукция", 1)]),
+            _result([("org-1", "phone-1", "+7 000")]),
+        ])
+        repo = OrganizationCoreRepo(session)
+        
+        first, second = await repo.list_by_radius(55.7, 37.6, 1000, order="distance", limit=2)
+        
+        assert first.building == BuildingEntity("building-1", "Москва", 55.7, 37.6)
+        assert first.building is second.building
+        assert first.activities[0] is second.activities[0]
+        assert [phone.phone_number for phone in first.phones] == ["+7 000"]
+        assert second.phones is None
+        assert (first.distance_meters, second.distance_meters) == (10.5, 20.0)
+        assert (first.distance_order, second.distance_order) == (10.4, 19.9)
+        
+        statement = str(session.execute.call_args_list[0].args[0])
+        assert statement.startswith("SELECT organizations.id, organizations.title, organizations.building_id,")
+        assert "organizations.title_normalized" not in statement
+    
+    @pytest.mark.asyncio
+    async def test_empty_result_single_query(self):
+        """Тест: без организаций связанные данные не запрашиваются"""
+        session = MagicMock()
+        session.execute = AsyncMock(return_value=_result([]))
+        
+        assert await OrganizationCoreRepo(session).list_by_building("building-1", limit=10) == []
+        session.execute.assert_called_once()
+
+
+class TestBuildingRepo:
+    """Тесты для BuildingRepo"""
+    
+    @pytest.mark.asyncio
+    async def test_rows_mapped_to_entities(self):
+        """Тест: здания выбираются колонками и собираются в Entity без ORM моделей"""
+        session = MagicMock()
+        session.execute = AsyncMock(return_value=_result([("building-1", "Москва", 55.7, 37.6)]))
+        
+        buildings = await BuildingRepo(session).list_by_rectangle(55.0, 37.0, 56.0, 38.0)
+        
+        assert buildings == [BuildingEntity("building-1", "Москва", 55.7, 37.6)]
+        assert "buildings.geom" not in str(session.execute.call_args.args[0]).split("FROM")[0]
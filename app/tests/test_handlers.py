@@ -1,4 +1,5 @@
 import pytest
+from dataclasses import replace
 from unittest.mock import AsyncMock, MagicMock, patch, MagicMock as MockModule
 from fastapi import HTTPException
 from fastapi.testclient import TestClient
@@ -21,7 +22,34 @@ from app.main import app
 from app.api.dependencies import get_organization_use_case, get_geo_search_use_case, verify_api_key
 from app.usecase.organization.get_organization import GetOrganizationUseCase
 from app.usecase.geo_search.search_use_case import GeoSearchUseCase
+from app.api.pagination import NEXT_CURSOR_HEADER, DISTANCE_CURSOR, decode_cursor
+from app.entity.organization import OrganizationEntity
+from app.entity.cluster import ClusterEntity
+from app.repo.stream import EntityStream
 from app.exceptions import NotFoundError, UseCaseExecutionError, DatabaseError
+from app.config import settings
+
+
+class FakeStreamResult:
+    """Результат AsyncSession.stream() с заданными порциями строк"""
+    
+    def __init__(self, partitions):
+        self._partitions = partitions
+        self.closed = False
+    
+    async def partitions(self):
+        for partition in self._partitions:
+            yield partition
+    
+    async def close(self):
+        self.closed = True
+
+
+def _stream_of(result: FakeStreamResult):
+    """side_effect для AsyncMock, возвращающий поток Entity из result"""
+    async def open_stream(*args, **kwargs):
+        return await EntityStream(result, list).open()
+    return open_stream
 
 
 # Мокируем verify_api_key для всех тестов handlers
@@ -68,6 +96,79 @@ class TestGetOrganizationsByBuilding:
         assert data[0]["title"] == "Магазин продуктов"
         assert data[1]["title"] == "Супермаркет"
     
+    def test_next_cursor(self, client, mock_use_case, sample_organization_entities):
+        """Тест выдачи курсора для полной страницы и перехода по нему"""
+        mock_use_case.list_by_building = AsyncMock(return_value=sample_organization_entities[:2])
+        
+        response = client.get(
+            "/api/v1/organizations/by-building/building-1?limit=2",
+            headers={"X-API-Key": "test-api-key"}
+        )
+        
+        assert response.status_code == 200
+        cursor = response.headers["X-Next-Cursor"]
+        mock_use_case.list_by_building.assert_called_once_with("building-1", limit=2, after=None)
+        
+        mock_use_case.list_by_building = AsyncMock(return_value=sample_organization_entities[2:])
+        response = client.get(
+            "/api/v1/organizations/by-building/building-1?limit=2&cursor=%s" % cursor,
+            headers={"X-API-Key": "test-api-key"}
+        )
+        
+        assert response.status_code == 200
+        assert "X-Next-Cursor" not in response.headers
+        mock_use_case.list_by_building.assert_called_once_with("building-1", limit=2, after=("org-2",))
+    
+    def test_stream(self, client, mock_use_case, sample_organization_entities):
+        """Тест потокового ответа: все порции курсора в одном JSON массиве без курсора страницы"""
+        result = FakeStreamResult([sample_organization_entities[:2], sample_organization_entities[2:]])
+        mock_use_case.streaming.return_value = mock_use_case
+        mock_use_case.list_by_building = AsyncMock(side_effect=_stream_of(result))
+        
+        response = client.get(
+            "/api/v1/organizations/by-building/building-1?stream=true&limit=1",
+            headers={"X-API-Key": "test-api-key"}
+        )
+        
+        assert response.status_code == 200
+        assert [org["title"] for org in response.json()] == [org.title for org in sample_organization_entities]
+        assert "X-Next-Cursor" not in response.headers
+        assert result.closed
+        mock_use_case.list_by_building.assert_called_once_with("building-1", limit=None, after=None)
+    
+    def test_stream_not_found(self, client, mock_use_case):
+        """Тест: пустой поток дает 404, как и пустая первая страница"""
+        mock_use_case.streaming.return_value = mock_use_case
+        mock_use_case.list_by_building = AsyncMock(side_effect=NotFoundError("Not found"))
+        
+        response = client.get(
+            "/api/v1/organizations/by-building/building-1?stream=true",
+            headers={"X-API-Key": "test-api-key"}
+        )
+        
+        assert response.status_code == 404
+    
+    def test_invalid_cursor(self, client, mock_use_case):
+        """Тест некорректного курсора"""
+        mock_use_case.list_by_building = AsyncMock(return_value=[])
+        
+        response = client.get(
+            "/api/v1/organizations/by-building/building-1?cursor=not-a-cursor",
+            headers={"X-API-Key": "test-api-key"}
+        )
+        
+        assert response.status_code == 400
+        mock_use_case.list_by_building.assert_not_called()
+    
+    def test_limit_above_max(self, client, mock_use_case):
+        """Тест превышения максимального размера страницы"""
+        response = client.get(
+            "/api/v1/organizations/by-building/building-1?limit=100000",
+            headers={"X-API-Key": "test-api-key"}
+        )
+        
+        assert response.status_code == 422
+    
     def test_not_found(self, client, mock_use_case):
         """Тест случая, когда организации не найдены"""
         mock_use_case.list_by_building = AsyncMock(side_effect=NotFoundError("Organizations for building building-999 not found"))
@@ -120,6 +221,62 @@ class TestGetOrganizationsByActivityExact:
         assert len(data) == 1
         assert data[0]["title"] == "Магазин продуктов"
 
+    def test_blank_activity_name(self, client, mock_use_case):
+        """Тест: название из одних пробелов не проходит проверку"""
+        mock_use_case.list_by_activity_exact = AsyncMock(return_value=[])
+        
+        response = client.get(
+            "/api/v1/organizations/by-activity/exact?activity_name=%20%20",
+            headers={"X-API-Key": "test-api-key"}
+        )
+        
+        assert response.status_code == 422
+        mock_use_case.list_by_activity_exact.assert_not_called()
+
+
+class TestGetOrganizationsByActivityTree:
+    """Тесты для handler get_organizations_by_activity_tree"""
+    
+    @pytest.fixture
+    def mock_use_case(self):
+        return MagicMock(spec=GetOrganizationUseCase)
+    
+    @pytest.fixture
+    def client(self, mock_use_case):
+        app.dependency_overrides[get_organization_use_case] = lambda: mock_use_case
+        yield TestClient(app)
+        app.dependency_overrides.clear()
+    
+    def test_depths_passed_to_use_case(self, client, mock_use_case, sample_organization_entities):
+        """Тест передачи глубины поиска вверх и вниз по иерархии"""
+        mock_use_case.list_by_activity_tree = AsyncMock(return_value=sample_organization_entities[:1])
+        
+        response = client.get(
+            "/api/v1/organizations/by-activity/tree?activity_name=Еда&up_depth=0&down_depth=4",
+            headers={"X-API-Key": "test-api-key"}
+        )
+        
+        assert response.status_code == 200
+        mock_use_case.list_by_activity_tree.assert_called_once_with(
+            "Еда",
+            up_depth=0,
+            down_depth=4,
+            limit=50,
+            after=None
+        )
+    
+    def test_depth_above_max(self, client, mock_use_case):
+        """Тест глубины поиска больше максимальной"""
+        mock_use_case.list_by_activity_tree = AsyncMock(return_value=[])
+        
+        response = client.get(
+            "/api/v1/organizations/by-activity/tree?activity_name=Еда&down_depth=100",
+            headers={"X-API-Key": "test-api-key"}
+        )
+        
+        assert response.status_code == 422
+        mock_use_case.list_by_activity_tree.assert_not_called()
+
 
 class TestGetOrgByName:
     """Тесты для handler get_org_by_name"""
@@ -148,6 +305,60 @@ class TestGetOrgByName:
         assert len(data) == 2
         assert any(org["title"] == "Магазин продуктов" for org in data)
         assert any(org["title"] == "Супермаркет" for org in data)
+        mock_use_case.get_by_name.assert_called_once_with("магазин", limit=20, after=None)
+    
+    def test_custom_limit(self, client, mock_use_case, sample_organization_entities):
+        """Тест передачи лимита результатов"""
+        mock_use_case.get_by_name = AsyncMock(return_value=sample_organization_entities[:1])
+        
+        response = client.get(
+            "/api/v1/organizations/by-name?organization_name=магазин&limit=5",
+            headers={"X-API-Key": "test-api-key"}
+        )
+        
+        assert response.status_code == 200
+        mock_use_case.get_by_name.assert_called_once_with("магазин", limit=5, after=None)
+    
+    def test_too_short_query(self, client, mock_use_case):
+        """Тест слишком короткой строки поиска"""
+        mock_use_case.get_by_name = AsyncMock(return_value=[])
+        
+        response = client.get(
+            "/api/v1/organizations/by-name?organization_name=а",
+            headers={"X-API-Key": "test-api-key"}
+        )
+        
+        assert response.status_code == 422
+        mock_use_case.get_by_name.assert_not_called()
+    
+    def test_padded_query_stripped_before_length_check(self, client, mock_use_case, sample_organization_entities):
+        """Тест: пробелы по краям не засчитываются в длину строки поиска и не передаются в use case"""
+        mock_use_case.get_by_name = AsyncMock(return_value=sample_organization_entities[:1])
+        
+        response = client.get(
+            "/api/v1/organizations/by-name?organization_name=%20%D0%B0%20",
+            headers={"X-API-Key": "test-api-key"}
+        )
+        
+        assert response.status_code == 422
+        mock_use_case.get_by_name.assert_not_called()
+        
+        response = client.get(
+            "/api/v1/organizations/by-name?organization_name=%20магазин%20",
+            headers={"X-API-Key": "test-api-key"}
+        )
+        
+        assert response.status_code == 200
+        assert mock_use_case.get_by_name.call_args.args[0] == "магазин"
+    
+    def test_limit_above_max(self, client, mock_use_case):
+        """Тест превышения максимального лимита"""
+        response = client.get(
+            "/api/v1/organizations/by-name?organization_name=магазин&limit=1000",
+            headers={"X-API-Key": "test-api-key"}
+        )
+        
+        assert response.status_code == 422
     
     def test_not_found(self, client, mock_use_case):
         """Тест случая, когда организации не найдены"""
@@ -212,6 +423,65 @@ class TestGetOrgById:
         assert response.json()["detail"] == "Internal server error"
 
 
+class TestGetOrgsByIds:
+    """Тесты для handler get_orgs_by_ids"""
+    
+    @pytest.fixture
+    def mock_use_case(self):
+        return MagicMock(spec=GetOrganizationUseCase)
+    
+    @pytest.fixture
+    def client(self, mock_use_case):
+        app.dependency_overrides[get_organization_use_case] = lambda: mock_use_case
+        yield TestClient(app)
+        app.dependency_overrides.clear()
+    
+    def test_success_with_missing(self, client, mock_use_case, sample_organization_entities):
+        """Тест: найденные организации по ID и список отсутствующих ID вместо 404"""
+        found = {entity.id: entity for entity in sample_organization_entities[:2]}
+        mock_use_case.get_by_ids = AsyncMock(return_value=(found, ["org-999"]))
+        
+        response = client.post(
+            "/api/v1/organizations/batch",
+            json={"ids": ["org-1", "org-999", "org-2"]},
+            headers={"X-API-Key": "test-api-key"}
+        )
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert list(data["organizations"]) == ["org-1", "org-2"]
+        assert data["organizations"]["org-2"]["title"] == "Супермаркет"
+        assert data["missing"] == ["org-999"]
+        mock_use_case.get_by_ids.assert_called_once_with(["org-1", "org-999", "org-2"])
+    
+    def test_ids_limits(self, client, mock_use_case):
+        """Тест: пустой список и список длиннее ORGANIZATION_BATCH_MAX_IDS отклоняются"""
+        mock_use_case.get_by_ids = AsyncMock()
+        
+        for ids in ([], ["org-%d" % i for i in range(settings.ORGANIZATION_BATCH_MAX_IDS + 1)]):
+            response = client.post(
+                "/api/v1/organizations/batch",
+                json={"ids": ids},
+                headers={"X-API-Key": "test-api-key"}
+            )
+            assert response.status_code == 422
+        
+        mock_use_case.get_by_ids.assert_not_called()
+    
+    def test_internal_error(self, client, mock_use_case):
+        """Тест случая внутренней ошибки сервера"""
+        mock_use_case.get_by_ids = AsyncMock(side_effect=UseCaseExecutionError("Internal error"))
+        
+        response = client.post(
+            "/api/v1/organizations/batch",
+            json={"ids": ["org-1"]},
+            headers={"X-API-Key": "test-api-key"}
+        )
+        
+        assert response.status_code == 500
+        assert response.json()["detail"] == "Internal server error"
+
+
 class TestSearchByRadius:
     """Тесты для handler search_by_radius"""
     
@@ -239,6 +509,77 @@ class TestSearchByRadius:
         assert "organizations" in data
         assert len(data["organizations"]) == 2
     
+    def test_grouped_format(self, client, mock_use_case, sample_organization_entity, sample_building_entity):
+        """Тест ответа со зданиями, сгруппированными по ID"""
+        neighbour = OrganizationEntity(
+            id="org-5",
+            title="Соседняя организация",
+            building_id=sample_building_entity.id,
+            building=sample_building_entity
+        )
+        mock_use_case.search_by_radius = AsyncMock(return_value=([sample_organization_entity, neighbour], []))
+        
+        response = client.get(
+            "/api/v1/organizations/search/radius?latitude=55.7558&longitude=37.6173&radius_meters=1000&format=grouped",
+            headers={"X-API-Key": "test-api-key"}
+        )
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert list(data["buildings"]) == ["building-1"]
+        assert data["buildings"]["building-1"]["address"] == "Москва, ул. Тестовая, д. 1"
+        assert [org["building_id"] for org in data["organizations"]] == ["building-1", "building-1"]
+        assert "building" not in data["organizations"][0]
+    
+    def test_order_by_distance(self, client, mock_use_case, sample_organization_entities):
+        """Тест сортировки по расстоянию: distance_meters в ответе и курсор (distance_order, id)"""
+        entities = [
+            replace(entity, distance_meters=distance, distance_order=distance - 0.5)
+            for distance, entity in zip((10.0, 20.5), sample_organization_entities)
+        ]
+        mock_use_case.search_by_radius = AsyncMock(return_value=(entities, []))
+        
+        response = client.get(
+            "/api/v1/organizations/search/radius?latitude=55.7558&longitude=37.6173&radius_meters=1000"
+            "&order=distance&limit=2",
+            headers={"X-API-Key": "test-api-key"}
+        )
+        
+        assert response.status_code == 200
+        assert [org["distance_meters"] for org in response.json()["organizations"]] == [10.0, 20.5]
+        assert "distance_order" not in response.json()["organizations"][0]
+        assert decode_cursor(response.headers[NEXT_CURSOR_HEADER], DISTANCE_CURSOR) == (20.0, "org-2")
+        
+        response = client.get(
+            "/api/v1/organizations/search/radius?latitude=55.7558&longitude=37.6173&radius_meters=1000"
+            "&order=distance&limit=2&cursor=" + response.headers[NEXT_CURSOR_HEADER],
+            headers={"X-API-Key": "test-api-key"}
+        )
+        
+        assert response.status_code == 200
+        assert mock_use_case.search_by_radius.call_args.kwargs["after"] == (20.0, "org-2")
+        assert mock_use_case.search_by_radius.call_args.kwargs["order"] == "distance"
+        
+        response = client.get(
+            "/api/v1/organizations/search/radius?latitude=55.7558&longitude=37.6173&radius_meters=1000"
+            "&order=distance&format=grouped",
+            headers={"X-API-Key": "test-api-key"}
+        )
+        
+        assert response.status_code == 200
+        assert [org["distance_meters"] for org in response.json()["organizations"]] == [10.0, 20.5]
+    
+    def test_unknown_format(self, client, mock_use_case):
+        """Тест неизвестного формата ответа"""
+        mock_use_case.search_by_radius = AsyncMock(return_value=([], []))
+        
+        response = client.get(
+            "/api/v1/organizations/search/radius?latitude=55.7558&longitude=37.6173&radius_meters=1000&format=flat",
+            headers={"X-API-Key": "test-api-key"}
+        )
+        
+        assert response.status_code == 422
+    
     def test_internal_error(self, client, mock_use_case):
         """Тест случая внутренней ошибки сервера"""
         mock_use_case.search_by_radius = AsyncMock(side_effect=UseCaseExecutionError("Internal error"))
@@ -252,6 +593,93 @@ class TestSearchByRadius:
         assert response.json()["detail"] == "Internal server error"
 
 
+class TestSearchNearest:
+    """Тесты для handler search_nearest"""
+    
+    @pytest.fixture
+    def mock_use_case(self):
+        return MagicMock(spec=GeoSearchUseCase)
+    
+    @pytest.fixture
+    def client(self, mock_use_case):
+        app.dependency_overrides[get_geo_search_use_case] = lambda: mock_use_case
+        yield TestClient(app)
+        app.dependency_overrides.clear()
+    
+    def test_success(self, client, mock_use_case, sample_organization_entity):
+        """Тест поиска ближайших организаций с расстоянием"""
+        entity = replace(sample_organization_entity, distance_meters=125.5)
+        mock_use_case.search_nearest = AsyncMock(return_value=[entity])
+        
+        response = client.get(
+            "/api/v1/organizations/search/nearest?latitude=55.7558&longitude=37.6173&k=5&activity_name=Еда",
+            headers={"X-API-Key": "test-api-key"}
+        )
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["organizations"][0]["distance_meters"] == 125.5
+        assert data["organizations"][0]["building"]["id"] == "building-1"
+        mock_use_case.search_nearest.assert_called_once_with(55.7558, 37.6173, 5, activity_name="Еда")
+    
+    def test_k_above_max(self, client, mock_use_case):
+        """Тест k больше максимального"""
+        mock_use_case.search_nearest = AsyncMock(return_value=[])
+        
+        response = client.get(
+            "/api/v1/organizations/search/nearest?latitude=55.7558&longitude=37.6173&k=1000",
+            headers={"X-API-Key": "test-api-key"}
+        )
+        
+        assert response.status_code == 422
+        mock_use_case.search_nearest.assert_not_called()
+
+
+class TestSearchClusters:
+    """Тесты для handler search_clusters"""
+
+    @pytest.fixture
+    def mock_use_case(self):
+        return MagicMock(spec=GeoSearchUseCase)
+
+    @pytest.fixture
+    def client(self, mock_use_case):
+        app.dependency_overrides[get_geo_search_use_case] = lambda: mock_use_case
+        yield TestClient(app)
+        app.dependency_overrides.clear()
+
+    def test_success(self, client, mock_use_case):
+        """Тест получения кластеров"""
+        mock_use_case.search_clusters = AsyncMock(
+            return_value=(0.05, [ClusterEntity(latitude=55.5, longitude=37.5, count=12)])
+        )
+
+        response = client.get(
+            "/api/v1/organizations/search/clusters?min_latitude=55.0&min_longitude=37.0"
+            "&max_latitude=56.0&max_longitude=38.0&zoom=9",
+            headers={"X-API-Key": "test-api-key"}
+        )
+
+        assert response.status_code == 200
+        assert response.json() == {
+            "grid_size": 0.05,
+            "clusters": [{"latitude": 55.5, "longitude": 37.5, "count": 12}]
+        }
+        mock_use_case.search_clusters.assert_called_once_with(55.0, 37.0, 56.0, 38.0, grid_size=None, zoom=9)
+
+    def test_internal_error(self, client, mock_use_case):
+        """Тест случая внутренней ошибки сервера"""
+        mock_use_case.search_clusters = AsyncMock(side_effect=UseCaseExecutionError("Internal error"))
+
+        response = client.get(
+            "/api/v1/organizations/search/clusters?min_latitude=55.0&min_longitude=37.0"
+            "&max_latitude=56.0&max_longitude=38.0",
+            headers={"X-API-Key": "test-api-key"}
+        )
+
+        assert response.status_code == 500
+
+
 class TestSearchByRectangle:
     """Тесты для handler search_by_rectangle"""
     
@@ -279,6 +707,37 @@ class TestSearchByRectangle:
         assert "organizations" in data
         assert len(data["organizations"]) == 1
     
+    def test_stream(self, client, mock_use_case, sample_organization_entities):
+        """Тест потокового ответа геопоиска в формате nested"""
+        result = FakeStreamResult([sample_organization_entities])
+        mock_use_case.streaming.return_value = mock_use_case
+        
+        async def search(*args, **kwargs):
+            return await _stream_of(result)(), []
+        
+        mock_use_case.search_by_rectangle = AsyncMock(side_effect=search)
+        
+        response = client.get(
+            "/api/v1/organizations/search/rectangle?min_latitude=55.0&min_longitude=37.0&max_latitude=56.0&max_longitude=38.0"
+            "&stream=true",
+            headers={"X-API-Key": "test-api-key"}
+        )
+        
+        assert response.status_code == 200
+        assert len(response.json()["organizations"]) == len(sample_organization_entities)
+        assert mock_use_case.search_by_rectangle.call_args.kwargs["limit"] is None
+    
+    def test_stream_grouped_format(self, client, mock_use_case):
+        """Тест: формат grouped не поддерживается в потоковом режиме"""
+        response = client.get(
+            "/api/v1/organizations/search/rectangle?min_latitude=55.0&min_longitude=37.0&max_latitude=56.0&max_longitude=38.0"
+            "&stream=true&format=grouped",
+            headers={"X-API-Key": "test-api-key"}
+        )
+        
+        assert response.status_code == 400
+        mock_use_case.search_by_rectangle.assert_not_called()
+    
     def test_internal_error(self, client, mock_use_case):
         """Тест случая внутренней ошибки сервера"""
         mock_use_case.search_by_rectangle = AsyncMock(side_effect=UseCaseExecutionError("Internal error"))
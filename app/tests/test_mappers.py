@@ -1,107 +1,221 @@
 import pytest
-from app.api.schemas.mappers import (
-    organization_entity_to_response,
-    organization_entity_to_simple_response,
-    organization_entity_to_with_building_response,
-    building_entity_to_response
+import orjson
+from dataclasses import replace
+from types import SimpleNamespace
+from app.api.schemas.encoders import (
+    organization_entity_to_dict,
+    organization_entity_to_simple_dict,
+    organization_entity_to_with_building_dict,
+    organization_entity_to_with_building_id_dict,
+    organization_entity_to_with_distance_dict,
+    organization_entity_to_with_building_id_distance_dict,
+    organization_entities_to_grouped_geo_dict,
+    building_entity_to_dict
 )
 from app.api.schemas.organization import (
     OrganizationResponse,
     OrganizationSimpleResponse,
-    OrganizationWithBuildingResponse
+    OrganizationWithBuildingResponse,
+    OrganizationWithBuildingIdResponse,
+    OrganizationWithDistanceResponse,
+    OrganizationWithBuildingIdDistanceResponse
 )
 from app.api.schemas.building import BuildingResponse
+from app.api.schemas.geo_search import GroupedGeoSearchResponse
+from app.entity.mappers.organization_document_mapper import OrganizationDocumentMapper
+from app.entity.mappers.organization_mapper import OrganizationMapper
 
 
-class TestOrganizationEntityToResponse:
-    """Тесты для organization_entity_to_response"""
+class TestOrganizationEntityToDict:
+    """Тесты для organization_entity_to_dict"""
     
     def test_full_organization_mapping(self, sample_organization_entity):
         """Тест преобразования полной организации"""
-        result = organization_entity_to_response(sample_organization_entity)
+        result = organization_entity_to_dict(sample_organization_entity)
         
-        assert isinstance(result, OrganizationResponse)
-        assert result.id == "org-1"
-        assert result.title == "Тестовый магазин"
-        assert result.building_id == "building-1"
-        assert result.building is not None
-        assert result.building.id == "building-1"
-        assert result.building.address == "Москва, ул. Тестовая, д. 1"
-        assert len(result.activities) == 1
-        assert result.activities[0].name == "Розничная торговля"
-        assert len(result.phones) == 2
-        assert result.phones[0].phone_number == "+7 123 456 7890"
+        assert result["id"] == "org-1"
+        assert result["title"] == "Тестовый магазин"
+        assert result["building_id"] == "building-1"
+        assert result["building"] is not None
+        assert result["building"]["id"] == "building-1"
+        assert result["building"]["address"] == "Москва, ул. Тестовая, д. 1"
+        assert len(result["activities"]) == 1
+        assert result["activities"][0]["name"] == "Розничная торговля"
+        assert len(result["phones"]) == 2
+        assert result["phones"][0]["phone_number"] == "+7 123 456 7890"
     
     def test_minimal_organization_mapping(self, sample_organization_entity_minimal):
         """Тест преобразования минимальной организации"""
-        result = organization_entity_to_response(sample_organization_entity_minimal)
+        result = organization_entity_to_dict(sample_organization_entity_minimal)
         
-        assert isinstance(result, OrganizationResponse)
-        assert result.id == "org-2"
-        assert result.title == "Минимальная организация"
-        assert result.building is None
-        assert result.activities is None
-        assert result.phones is None
+        assert result["id"] == "org-2"
+        assert result["title"] == "Минимальная организация"
+        assert result["building"] is None
+        assert result["activities"] is None
+        assert result["phones"] is None
 
 
-class TestOrganizationEntityToSimpleResponse:
-    """Тесты для organization_entity_to_simple_response"""
+class TestOrganizationEntityToSimpleDict:
+    """Тесты для organization_entity_to_simple_dict"""
     
     def test_simple_response_with_phones(self, sample_organization_entity):
         """Тест преобразования в упрощенный ответ с телефонами"""
-        result = organization_entity_to_simple_response(sample_organization_entity)
+        result = organization_entity_to_simple_dict(sample_organization_entity)
         
-        assert isinstance(result, OrganizationSimpleResponse)
-        assert result.title == "Тестовый магазин"
-        assert len(result.phones) == 2
-        assert "+7 123 456 7890" in result.phones
-        assert "+7 098 765 4321" in result.phones
+        assert result["title"] == "Тестовый магазин"
+        assert len(result["phones"]) == 2
+        assert "+7 123 456 7890" in result["phones"]
+        assert "+7 098 765 4321" in result["phones"]
     
     def test_simple_response_without_phones(self, sample_organization_entity_minimal):
         """Тест преобразования в упрощенный ответ без телефонов"""
-        result = organization_entity_to_simple_response(sample_organization_entity_minimal)
+        result = organization_entity_to_simple_dict(sample_organization_entity_minimal)
         
-        assert isinstance(result, OrganizationSimpleResponse)
-        assert result.title == "Минимальная организация"
-        assert result.phones == []
+        assert result["title"] == "Минимальная организация"
+        assert result["phones"] == []
 
 
-class TestOrganizationEntityToWithBuildingResponse:
-    """Тесты для organization_entity_to_with_building_response"""
+class TestOrganizationEntityToWithBuildingDict:
+    """Тесты для organization_entity_to_with_building_dict"""
     
     def test_with_building_response_full(self, sample_organization_entity):
         """Тест преобразования с зданием и телефонами"""
-        result = organization_entity_to_with_building_response(sample_organization_entity)
+        result = organization_entity_to_with_building_dict(sample_organization_entity)
         
-        assert isinstance(result, OrganizationWithBuildingResponse)
-        assert result.title == "Тестовый магазин"
-        assert len(result.phones) == 2
-        assert result.building is not None
-        assert result.building.id == "building-1"
-        assert result.building.address == "Москва, ул. Тестовая, д. 1"
-        assert result.building.latitude == 55.7558
-        assert result.building.longitude == 37.6173
+        assert result["title"] == "Тестовый магазин"
+        assert len(result["phones"]) == 2
+        assert result["building"] is not None
+        assert result["building"]["id"] == "building-1"
+        assert result["building"]["address"] == "Москва, ул. Тестовая, д. 1"
+        assert result["building"]["latitude"] == 55.7558
+        assert result["building"]["longitude"] == 37.6173
     
     def test_with_building_response_no_building(self, sample_organization_entity_minimal):
         """Тест преобразования без здания"""
-        result = organization_entity_to_with_building_response(sample_organization_entity_minimal)
+        result = organization_entity_to_with_building_dict(sample_organization_entity_minimal)
         
-        assert isinstance(result, OrganizationWithBuildingResponse)
-        assert result.title == "Минимальная организация"
-        assert result.phones == []
-        assert result.building is None
+        assert result["title"] == "Минимальная организация"
+        assert result["phones"] == []
+        assert result["building"] is None
 
 
-class TestBuildingEntityToResponse:
-    """Тесты для building_entity_to_response"""
+class TestBuildingEntityToDict:
+    """Тесты для building_entity_to_dict"""
     
     def test_building_mapping(self, sample_building_entity):
         """Тест преобразования здания"""
-        result = building_entity_to_response(sample_building_entity)
+        result = building_entity_to_dict(sample_building_entity)
+        
+        assert result["id"] == "building-1"
+        assert result["address"] == "Москва, ул. Тестовая, д. 1"
+        assert result["latitude"] == 55.7558
+        assert result["longitude"] == 37.6173
+
+
+class TestOrganizationEntitiesToGroupedGeoDict:
+    """Тесты для organization_entities_to_grouped_geo_dict"""
+    
+    def test_buildings_deduplicated(self, sample_organization_entity, sample_organization_entity_minimal):
+        """Тест: здание передается один раз, организации ссылаются на него по ID"""
+        entities = [sample_organization_entity, sample_organization_entity, sample_organization_entity_minimal]
+        
+        result = organization_entities_to_grouped_geo_dict(entities)
+        
+        assert list(result["buildings"]) == ["building-1"]
+        assert result["buildings"]["building-1"]["address"] == "Москва, ул. Тестовая, д. 1"
+        assert [org["building_id"] for org in result["organizations"]] == ["building-1", "building-1", "building-2"]
+        assert result["organizations"][0]["phones"] == ["+7 123 456 7890", "+7 098 765 4321"]
+
+
+class TestOrganizationDocumentMapper:
+    """Тесты для OrganizationDocumentMapper"""
+
+    def test_full_document_mapping(self, sample_organization_entity):
+        """Тест преобразования JSON документа, собранного в Postgres"""
+        document = orjson.loads(orjson.dumps(organization_entity_to_dict(sample_organization_entity)))
+
+        result = OrganizationDocumentMapper().to_entity(document)
+
+        assert result == sample_organization_entity
+
+    def test_document_without_relations(self):
+        """Тест документа без здания, видов деятельности и телефонов (json_agg вернул null)"""
+        document = {
+            "id": "org-2",
+            "title": "Минимальная организация",
+            "building_id": "building-2",
+            "building": None,
+            "activities": None,
+            "phones": None,
+        }
+
+        result = OrganizationDocumentMapper().to_entity(document)
+
+        assert result.id == "org-2"
+        assert result.building is None
+        assert result.activities is None
+        assert result.phones is None
+
+    def test_batch_shares_buildings_and_activities(self, sample_organization_entity):
+        """Тест: организации пачки ссылаются на общие здание и вид деятельности"""
+        document = orjson.loads(orjson.dumps(organization_entity_to_dict(sample_organization_entity)))
         
-        assert isinstance(result, BuildingResponse)
-        assert result.id == "building-1"
-        assert result.address == "Москва, ул. Тестовая, д. 1"
-        assert result.latitude == 55.7558
-        assert result.longitude == 37.6173
+        first, second = OrganizationDocumentMapper().to_entities([document, dict(document, id="org-5")])
+        
+        assert first.building is second.building
+        assert first.activities[0] is second.activities[0]
+        assert second.id == "org-5"
+
 
+class TestOrganizationMapper:
+    """Тесты для OrganizationMapper"""
+    
+    def test_batch_shares_buildings_and_activities(self):
+        """Тест: здание и вид деятельности преобразуются один раз на пачку"""
+        building = SimpleNamespace(id="building-1", address="Москва", latitude=55.7, longitude=37.6)
+        activity = SimpleNamespace(id=1, name="Еда", parent_id=None)
+        models = [
+            SimpleNamespace(id="org-%d" % i, title="Организация", building_id="building-1",
+                            building=building, activities=[activity], phones=[])
+            for i in range(3)
+        ]
+        
+        entities = OrganizationMapper().to_entities(models)
+        
+        assert [entity.id for entity in entities] == ["org-0", "org-1", "org-2"]
+        assert len({id(entity.building) for entity in entities}) == 1
+        assert len({id(entity.activities[0]) for entity in entities}) == 1
+        assert OrganizationMapper().to_entity(models[0]).building is not entities[0].building
+
+
+class TestEncoders:
+    """Тесты быстрого пути сериализации: dict совпадает со схемой response_model"""
+    
+    @pytest.mark.parametrize("encoder, schema", [
+        (organization_entity_to_dict, OrganizationResponse),
+        (organization_entity_to_simple_dict, OrganizationSimpleResponse),
+        (organization_entity_to_with_building_dict, OrganizationWithBuildingResponse),
+        (organization_entity_to_with_building_id_dict, OrganizationWithBuildingIdResponse),
+        (organization_entity_to_with_distance_dict, OrganizationWithDistanceResponse),
+        (organization_entity_to_with_building_id_distance_dict, OrganizationWithBuildingIdDistanceResponse),
+        (building_entity_to_dict, BuildingResponse),
+    ])
+    def test_same_json_as_schema(self, encoder, schema, sample_organization_entity, sample_organization_entity_minimal):
+        """Тест: проверка по схеме не меняет ни поля, ни их порядок, ни значения"""
+        for entity in (sample_organization_entity, sample_organization_entity_minimal):
+            entity = replace(entity, distance_meters=12.5)
+            encoded = encoder(entity.building if schema is BuildingResponse else entity)
+            if encoded is None:
+                continue
+            assert list(encoded) == list(schema.model_fields)
+            assert orjson.dumps(encoded) == schema.model_validate(encoded).model_dump_json().encode()
+    
+    def test_distance_and_grouped(self, sample_organization_entity, sample_organization_entity_minimal):
+        """Тест ответа с расстоянием и сгруппированного ответа"""
+        entity = replace(sample_organization_entity, distance_meters=12.5)
+        entities = [entity, sample_organization_entity_minimal]
+        
+        assert organization_entity_to_with_distance_dict(entity)["distance_meters"] == 12.5
+        assert "distance_meters" not in organization_entity_to_with_building_dict(entity)
+        encoded = organization_entities_to_grouped_geo_dict(entities)
+        assert orjson.dumps(encoded) == GroupedGeoSearchResponse.model_validate(encoded).model_dump_json().encode()
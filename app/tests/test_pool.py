@@ -0,0 +1,69 @@
+import pytest
+from unittest.mock import MagicMock, patch
+from sqlalchemy import exc
+from sqlalchemy.util import greenlet_spawn
+from fastapi.testclient import TestClient
+from app.main import app
+from app.api.dependencies import verify_api_key
+from app.config import settings
+from app.database import get_database_params
+from app.pool import MonitoredQueuePool, get_pool_stats
+
+
+class TestMonitoredQueuePool:
+    """Тесты для MonitoredQueuePool"""
+    
+    @pytest.mark.asyncio
+    async def test_checkouts_and_timeouts_counted(self):
+        """Тест: занятые соединения и таймаут ожидания попадают в статистику"""
+        pool = MonitoredQueuePool(MagicMock, pool_size=1, max_overflow=0, timeout=0.01)
+        
+        connection = await greenlet_spawn(pool.connect)
+        with pytest.raises(exc.TimeoutError):
+            await greenlet_spawn(pool.connect)
+        
+        stats = get_pool_stats(pool, max_overflow=0)
+        assert (stats["max_overflow"], stats["max_connections"]) == (0, 1)
+        assert (stats["opened"], stats["checked_out"], stats["overflow"]) == (1, 1, 0)
+        assert (stats["checkouts"], stats["timeouts"]) == (2, 1)
+        assert stats["wait_seconds_max"] >= 0.01
+        
+        await greenlet_spawn(connection.close)
+        assert get_pool_stats(pool, max_overflow=0)["checked_in"] == 1
+
+
+class TestDatabaseParams:
+    """Тесты для параметров create_async_engine"""
+    
+    def test_statement_cache_from_settings(self):
+        """Тест: без pgbouncer кеш подготовленных выражений задается DB_STATEMENT_CACHE_SIZE"""
+        with patch.object(settings, "DB_PGBOUNCER", False), patch.object(settings, "DB_STATEMENT_CACHE_SIZE", 250):
+            params = get_database_params()
+        
+        assert params["pool_size"] == settings.DB_POOL_SIZE
+        assert params["connect_args"] == {"prepared_statement_cache_size": 250, "statement_cache_size": 250}
+    
+    def test_pgbouncer_disables_statement_cache(self):
+        """Тест: в режиме pgbouncer кеш отключен, имена подготовленных выражений уникальны"""
+        with patch.object(settings, "DB_PGBOUNCER", True):
+            connect_args = get_database_params()["connect_args"]
+        
+        assert connect_args["prepared_statement_cache_size"] == 0
+        assert connect_args["statement_cache_size"] == 0
+        name_func = connect_args["prepared_statement_name_func"]
+        assert name_func() != name_func()
+
+
+def test_pool_stats_endpoint():
+    """Тест эндпоинта статистики пула соединений"""
+    app.dependency_overrides[verify_api_key] = lambda: "test-api-key"
+    try:
+        response = TestClient(app).get("/api/v1/stats/pool")
+    finally:
+        app.dependency_overrides.clear()
+    
+    assert response.status_code == 200
+    data = response.json()
+    assert data["size"] == settings.DB_POOL_SIZE
+    assert data["max_connections"] == settings.DB_POOL_SIZE + settings.DB_POOL_MAX_OVERFLOW
+    assert data["checked_out"] == 0
@@ -0,0 +1,166 @@
+import pytest
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock
+from sqlalchemy import text
+from sqlalchemy.pool import NullPool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from app.config import settings, get_db_url
+from app.database import parse_replica_host
+from app.replicas import ReadRouter, ReadTarget
+
+
+class FakeEngine:
+    """AsyncEngine, соединение которого падает с заданной ошибкой"""
+    
+    def __init__(self, error=None):
+        self.error = error
+    
+    @asynccontextmanager
+    async def connect(self):
+        if self.error is not None:
+            raise self.error
+        connection = MagicMock()
+        
+        async def execute(statement):
+            return None
+        
+        connection.execute = execute
+        yield connection
+
+
+def _target(name: str, engine=None) -> ReadTarget:
+    @asynccontextmanager
+    async def session_maker():
+        yield name
+    
+    return ReadTarget(name, engine or FakeEngine(), session_maker)
+
+
+class TestReadRouter:
+    """Тесты для ReadRouter"""
+    
+    def test_least_outstanding_replica(self):
+        """Тест: выбирается реплика с наименьшим количеством открытых сессий"""
+        first, second = _target("replica-1"), _target("replica-2")
+        first.outstanding = 2
+        router = ReadRouter(_target("primary"), [first, second], check_timeout=1)
+        
+        assert [router.choose() for _ in range(3)] == [second, second, second]
+    
+    def test_equal_load_alternates(self):
+        """Тест: при равной загрузке реплики чередуются"""
+        first, second = _target("replica-1"), _target("replica-2")
+        router = ReadRouter(_target("primary"), [first, second], check_timeout=1)
+        
+        assert [router.choose().name for _ in range(4)] == ["replica-1", "replica-2", "replica-1", "replica-2"]
+    
+    def test_fallback_to_primary(self):
+        """Тест: без исправных реплик сессии открываются на основном сервере"""
+        primary, replica = _target("primary"), _target("replica-1")
+        replica.healthy = False
+        
+        assert ReadRouter(primary, [replica], check_timeout=1).choose() is primary
+        assert ReadRouter(primary, [], check_timeout=1).choose() is primary
+    
+    @pytest.mark.asyncio
+    async def test_session_counts_outstanding(self):
+        """Тест: открытая сессия учитывается в outstanding до выхода из контекста"""
+        replica = _target("replica-1")
+        router = ReadRouter(_target("primary"), [replica], check_timeout=1)
+        
+        async with router.session() as session:
+            assert session == "replica-1"
+            assert replica.outstanding == 1
+        assert replica.outstanding == 0
+    
+    @pytest.mark.asyncio
+    async def test_lazy_session_opened_on_first_query(self):
+        """Тест: ленивая сессия не выбирает сервер и не учитывается в outstanding до первого запроса"""
+        session = MagicMock()
+        session.execute = AsyncMock(return_value="result")
+        replica = _target("replica-1")
+        
+        @asynccontextmanager
+        async def session_maker():
+            yield session
+        
+        replica.session_maker = session_maker
+        router = ReadRouter(_target("primary"), [replica], check_timeout=1)
+        
+        async with router.lazy_session() as lazy:
+            assert replica.outstanding == 0
+            assert router._turn == 0
+        assert lazy.opened is False
+        
+        async with router.lazy_session() as lazy:
+            assert await lazy.execute("statement", {"id": 1}) == "result"
+            assert await lazy.execute("statement") == "result"
+            assert replica.outstanding == 1
+        assert replica.outstanding == 0
+        assert session.execute.await_count == 2
+    
+    @pytest.mark.asyncio
+    async def test_health_check_marks_and_restores(self):
+        """Тест: реплика с ошибкой соединения исключается, после успешной проверки возвращается"""
+        engine = FakeEngine(OSError("connection refused"))
+        replica = _target("replica-1", engine)
+        router = ReadRouter(_target("primary"), [replica], check_timeout=1)
+        
+        await router.check_all()
+        assert replica.healthy is False
+        assert router.choose().name == "primary"
+        
+        engine.error = None
+        await router.check_all()
+        assert replica.healthy is True
+        assert router.choose() is replica
+
+
+def test_parse_replica_host():
+    """Тест разбора адресов DB_REPLICA_HOSTS"""
+    assert parse_replica_host("replica-1:5433") == ("replica-1", 5433)
+    assert parse_replica_host(" replica-2 ") == ("replica-2", settings.DB_PORT)
+
+
+SYSTEM_IDENTIFIER = text("SELECT system_identifier FROM pg_control_system()")
+
+
+def _real_target(host: str, port: int) -> ReadTarget:
+    engine = create_async_engine(get_db_url(host, port), poolclass=NullPool)
+    return ReadTarget("%s:%s" % (host, port), engine, async_sessionmaker(engine))
+
+
+async def _system_identifier(router: ReadRouter) -> int:
+    async with router.session() as session:
+        return (await session.execute(SYSTEM_IDENTIFIER)).scalar_one()
+
+
+@pytest.mark.skipif(not settings.DB_REPLICA_HOSTS, reason="Нужны два Postgres: DB_HOST и DB_REPLICA_HOSTS (make test-replicas)")
+class TestReadRouterPostgres:
+    """Тесты ReadRouter на двух локальных серверах Postgres"""
+    
+    @pytest.mark.asyncio
+    async def test_reads_go_to_replica(self):
+        """Тест: сессии открываются на реплике, а не на основном сервере"""
+        primary = _real_target(settings.DB_HOST, settings.DB_PORT)
+        replica = _real_target(*parse_replica_host(settings.DB_REPLICA_HOSTS[0]))
+        router = ReadRouter(primary, [replica], check_timeout=5)
+        
+        await router.check_all()
+        assert replica.healthy is True
+        
+        primary_id = await _system_identifier(ReadRouter(primary, [], check_timeout=5))
+        assert await _system_identifier(router) != primary_id
+    
+    @pytest.mark.asyncio
+    async def test_unreachable_replica_falls_back_to_primary(self):
+        """Тест: недоступная реплика не проходит проверку, чтение идет с основного сервера"""
+        primary = _real_target(settings.DB_HOST, settings.DB_PORT)
+        replica = _real_target(settings.DB_HOST, 1)
+        router = ReadRouter(primary, [replica], check_timeout=5)
+        
+        await router.check_all()
+        assert replica.healthy is False
+        
+        primary_id = await _system_identifier(ReadRouter(primary, [], check_timeout=5))
+        assert await _system_identifier(router) == primary_id
@@ -0,0 +1,265 @@
+import asyncio
+import pytest
+from dataclasses import replace
+from unittest.mock import AsyncMock, MagicMock
+from fastapi.testclient import TestClient
+from app.main import app
+from app.api.dependencies import verify_api_key
+from app.usecase.organization.result_cache import ResultCache, estimate_size
+from app.usecase.organization.get_organization import GetOrganizationUseCase
+from app.entity.building import BuildingEntity
+from app.entity.organization import OrganizationEntity
+from app.exceptions import NotFoundError, UseCaseExecutionError, DatabaseQueryError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+
+def _cache(clock=None, max_bytes=100, rand=lambda: 0.0, beta=1.0):
+    return ResultCache(
+        max_bytes=max_bytes,
+        ttl_seconds=10,
+        early_refresh_beta=beta,
+        max_entry_bytes=50,
+        sizeof=len,
+        clock=clock or FakeClock(),
+        rand=rand
+    )
+
+
+def _loader(*values):
+    return AsyncMock(side_effect=list(values))
+
+
+class TestResultCache:
+    """Тесты для ResultCache"""
+    
+    @pytest.mark.asyncio
+    async def test_hit_after_miss(self):
+        """Тест: повторный запрос берет значение из кеша"""
+        cache = _cache()
+        load = _loader("value")
+        
+        assert await cache.get_or_load("key", load) == "value"
+        assert await cache.get_or_load("key", load) == "value"
+        
+        load.assert_called_once()
+        assert (cache.hits, cache.misses, cache.bytes) == (1, 1, 5)
+    
+    @pytest.mark.asyncio
+    async def test_expired_value_reloaded(self):
+        """Тест: значение живет ttl_seconds"""
+        clock = FakeClock()
+        cache = _cache(clock)
+        load = _loader("old", "new")
+        
+        await cache.get_or_load("key", load)
+        clock.now = 10
+        
+        assert await cache.get_or_load("key", load) == "new"
+        assert cache.expirations == 1
+    
+    @pytest.mark.asyncio
+    async def test_lru_eviction_by_size(self):
+        """Тест: при превышении max_bytes вытесняются давно не использованные значения"""
+        cache = _cache(max_bytes=100)
+        
+        for key in ("a", "b", "c"):
+            await cache.get_or_load(key, _loader("x" * 40))
+        
+        assert len(cache) == 2 and cache.bytes == 80
+        assert cache.evictions == 1
+        
+        await cache.get_or_load("b", _loader("unused"))
+        await cache.get_or_load("d", _loader("x" * 40))
+        assert await cache.get_or_load("b", _loader("reloaded")) == "x" * 40
+        assert await cache.get_or_load("c", _loader("reloaded")) == "reloaded"
+    
+    @pytest.mark.asyncio
+    async def test_oversized_value_not_cached(self):
+        """Тест: значение больше max_entry_bytes возвращается, но не кешируется"""
+        cache = _cache()
+        
+        assert await cache.get_or_load("key", _loader("x" * 60)) == "x" * 60
+        assert len(cache) == 0 and cache.oversized == 1
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_load_once(self):
+        """Тест: одновременные промахи по одному ключу ждут одну загрузку"""
+        cache = _cache()
+        release = asyncio.Event()
+        calls = 0
+        
+        async def load():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return "value"
+        
+        tasks = [asyncio.create_task(cache.get_or_load("key", load)) for _ in range(10)]
+        await asyncio.sleep(0)
+        release.set()
+        
+        assert await asyncio.gather(*tasks) == ["value"] * 10
+        assert calls == 1
+        assert (cache.misses, cache.coalesced) == (1, 9)
+    
+    @pytest.mark.asyncio
+    async def test_early_refresh_serves_current_value(self):
+        """Тест: перед истечением один запрос обновляет значение, остальные получают текущее"""
+        clock = FakeClock()
+        cache = _cache(clock, rand=lambda: 0.99)
+        release = asyncio.Event()
+        
+        async def slow_load():
+            clock.now += 1
+            await release.wait()
+            return "new"
+        
+        await cache.get_or_load("key", _loader("old"))
+        cache._entries["key"].delta = 1.0
+        
+        # -ln(0.01) ~ 4.6 секунды до истечения: при now = 6 ранний срок наступил
+        clock.now = 6
+        refresh = asyncio.create_task(cache.get_or_load("key", slow_load))
+        await asyncio.sleep(0)
+        
+        assert await cache.get_or_load("key", _loader("unused")) == "old"
+        release.set()
+        assert await refresh == "new"
+        assert cache.early_refreshes == 1
+        assert await cache.get_or_load("key", _loader("unused")) == "new"
+    
+    @pytest.mark.asyncio
+    async def test_no_early_refresh_far_from_expiry(self):
+        """Тест: далеко от истечения значение не обновляется"""
+        clock = FakeClock()
+        cache = _cache(clock, rand=lambda: 0.99)
+        await cache.get_or_load("key", _loader("old"))
+        cache._entries["key"].delta = 1.0
+        
+        clock.now = 4
+        assert await cache.get_or_load("key", _loader("unused")) == "old"
+        assert cache.early_refreshes == 0
+    
+    @pytest.mark.asyncio
+    async def test_error_shared_and_not_cached(self):
+        """Тест: ошибка загрузки получают все ожидавшие, значение не кешируется"""
+        cache = _cache()
+        release = asyncio.Event()
+        
+        async def failing_load():
+            await release.wait()
+            raise DatabaseQueryError("boom")
+        
+        tasks = [asyncio.create_task(cache.get_or_load("key", failing_load)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        assert all(isinstance(result, DatabaseQueryError) for result in results)
+        assert await cache.get_or_load("key", _loader("value")) == "value"
+    
+    @pytest.mark.asyncio
+    async def test_cancelled_load_retried_by_waiter(self):
+        """Тест: если запрос, загружавший значение, отменен, загрузку повторяет ожидавший"""
+        cache = _cache()
+        
+        leader = asyncio.create_task(cache.get_or_load("key", asyncio.Event().wait))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get_or_load("key", _loader("value")))
+        await asyncio.sleep(0)
+        
+        leader.cancel()
+        assert await waiter == "value"
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+
+
+def test_estimate_size_counts_shared_objects_once():
+    """Тест: общее здание учитывается в размере один раз"""
+    building = BuildingEntity("building-1", "Москва, ул. Тестовая, д. 1", 55.75, 37.61)
+    
+    def organization(org_id: str, with_building: BuildingEntity) -> OrganizationEntity:
+        return OrganizationEntity(org_id, "Организация", "building-1", with_building, None, None)
+    
+    shared = [organization("org-1", building), organization("org-2", building)]
+    copied = [organization("org-1", building), organization("org-2", replace(building))]
+    
+    assert estimate_size(shared) < estimate_size(copied)
+    assert estimate_size(shared) > estimate_size([organization("org-1", None)])
+
+
+class TestGetOrganizationUseCaseCache:
+    """Тесты GetOrganizationUseCase с кешем результатов"""
+    
+    @pytest.fixture
+    def mock_repo(self):
+        return MagicMock()
+    
+    @pytest.fixture
+    def use_case(self, mock_repo):
+        return GetOrganizationUseCase(mock_repo, ResultCache(max_bytes=1024 * 1024, ttl_seconds=60))
+    
+    @pytest.mark.asyncio
+    async def test_get_by_id_cached(self, use_case, mock_repo, sample_organization_entity):
+        """Тест: повторный запрос организации по ID не обращается к репозиторию"""
+        mock_repo.get_org_by_id = AsyncMock(return_value=sample_organization_entity)
+        
+        assert await use_case.get_by_id("org-1") is sample_organization_entity
+        assert await use_case.get_by_id("org-1") is sample_organization_entity
+        mock_repo.get_org_by_id.assert_called_once_with("org-1")
+    
+    @pytest.mark.asyncio
+    async def test_pages_cached_separately(self, use_case, mock_repo, sample_organization_entities):
+        """Тест: страницы с разными курсорами - разные ключи кеша"""
+        mock_repo.list_by_building = AsyncMock(side_effect=[
+            sample_organization_entities[:2], sample_organization_entities[2:]
+        ])
+        
+        first = await use_case.list_by_building("building-1", limit=2)
+        second = await use_case.list_by_building("building-1", limit=2, after=("org-2",))
+        
+        assert await use_case.list_by_building("building-1", limit=2) is first
+        assert await use_case.list_by_building("building-1", limit=2, after=("org-2",)) is second
+        assert mock_repo.list_by_building.call_count == 2
+    
+    @pytest.mark.asyncio
+    async def test_not_found_cached(self, use_case, mock_repo):
+        """Тест: отсутствие организации кешируется, NotFoundError выбрасывается каждый раз"""
+        mock_repo.get_org_by_id = AsyncMock(return_value=None)
+        
+        for _ in range(2):
+            with pytest.raises(NotFoundError):
+                await use_case.get_by_id("org-999")
+        mock_repo.get_org_by_id.assert_called_once()
+    
+    @pytest.mark.asyncio
+    async def test_database_error_not_cached(self, use_case, mock_repo, sample_organization_entity):
+        """Тест: ошибка БД не кешируется"""
+        mock_repo.get_org_by_id = AsyncMock(side_effect=[DatabaseQueryError("boom"), sample_organization_entity])
+        
+        with pytest.raises(UseCaseExecutionError):
+            await use_case.get_by_id("org-1")
+        assert await use_case.get_by_id("org-1") is sample_organization_entity
+    
+    def test_streaming_bypasses_cache(self, use_case, mock_repo):
+        """Тест: потоковый UseCase работает без кеша"""
+        assert use_case.streaming()._result_cache is None
+
+
+def test_cache_stats_endpoint():
+    """Тест эндпоинта счетчиков кешей"""
+    app.dependency_overrides[verify_api_key] = lambda: "test-api-key"
+    try:
+        response = TestClient(app).get("/api/v1/stats/cache")
+    finally:
+        app.dependency_overrides.clear()
+    
+    assert response.status_code == 200
+    assert {"hits", "misses", "evictions", "bytes"} <= set(response.json()["organizations"])
@@ -0,0 +1,232 @@
+import fcntl
+import multiprocessing
+import os
+import pytest
+from dataclasses import make_dataclass
+from unittest.mock import AsyncMock
+from app.usecase.organization.result_cache import ResultCache
+from app.usecase.organization.shared_cache import (
+    SharedMemorySegment, SharedResultCache, key_digest, layout_version, HEADER_SIZE, SEQ
+)
+from app.entity.building import BuildingEntity
+from app.entity.organization import OrganizationEntity
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+
+
+def _segment(path, arena_bytes=4096, slots=16, clock=None, version=1):
+    return SharedMemorySegment(
+        str(path / "segment"), arena_bytes=arena_bytes, slots=slots, clock=clock or FakeClock(), version=version
+    )
+
+
+def _rewrite(path, rounds):
+    segment = _segment(path, arena_bytes=1024)
+    for i in range(rounds):
+        fill = i % 256
+        segment.put(key_digest("key"), bytes([fill]) * (50 + fill % 50), 10 ** 12)
+
+
+def _put_from_child(segment):
+    assert segment.put(key_digest("child"), b"child", 10 ** 12)
+
+
+class TestSharedMemorySegment:
+    """Тесты для SharedMemorySegment"""
+    
+    def test_value_visible_to_other_mapping(self, tmp_path):
+        """Тест: значение, записанное одним процессом, читается через другое отображение файла"""
+        writer, reader = _segment(tmp_path), _segment(tmp_path)
+        
+        assert writer.put(key_digest(("get_by_id", "org-1")), b"payload", 2000.0)
+        
+        assert reader.get(key_digest(("get_by_id", "org-1"))) == b"payload"
+        assert reader.get(key_digest(("get_by_id", "org-2"))) is None
+    
+    def test_expired_value_not_returned(self, tmp_path):
+        """Тест: значение после времени истечения не возвращается"""
+        clock = FakeClock()
+        segment = _segment(tmp_path, clock=clock)
+        segment.put(key_digest("key"), b"payload", 1010.0)
+        
+        clock.now = 1010.0
+        
+        assert segment.get(key_digest("key")) is None
+    
+    def test_overwritten_data_detected(self, tmp_path):
+        """Тест: данные, перезаписанные после оборота кольца, не возвращаются"""
+        segment = _segment(tmp_path, arena_bytes=800)
+        segment.put(key_digest("old"), b"o" * 100, 2000.0)
+        for i in range(8):
+            segment.put(key_digest(("new", i)), b"n" * 100, 2000.0)
+        
+        assert segment.get(key_digest("old")) is None
+        assert segment.overwritten == 1
+        assert segment.get(key_digest(("new", 7))) == b"n" * 100
+    
+    def test_slot_being_written_not_returned(self, tmp_path):
+        """Тест: слот с нечетным seq (запись не закончена) не читается"""
+        segment = _segment(tmp_path, slots=1)
+        segment.put(key_digest("key"), b"payload", 2000.0)
+        mapped = segment._map()
+        seq = SEQ.unpack_from(mapped, HEADER_SIZE)[0]
+        
+        SEQ.pack_into(mapped, HEADER_SIZE, seq + 1)
+        
+        assert segment.get(key_digest("key")) is None
+        assert segment.torn_reads > 0
+    
+    def test_oversized_value_not_stored(self, tmp_path):
+        """Тест: значение больше max_entry_bytes не сохраняется"""
+        segment = _segment(tmp_path, arena_bytes=800)
+        
+        assert not segment.put(key_digest("key"), b"x" * 101, 2000.0)
+        assert segment.get(key_digest("key")) is None
+    
+    def test_other_layout_version_resets_segment(self, tmp_path):
+        """Тест: сегмент, записанный с другой структурой Entity, очищается при открытии"""
+        _segment(tmp_path, version=1).put(key_digest("key"), b"payload", 2000.0)
+        
+        assert _segment(tmp_path, version=1).get(key_digest("key")) == b"payload"
+        assert _segment(tmp_path, version=2).get(key_digest("key")) is None
+        assert _segment(tmp_path, version=1).get(key_digest("key")) is None
+    
+    def test_layout_version_follows_fields(self):
+        """Тест: версия структуры меняется при изменении полей Entity"""
+        before = make_dataclass("BuildingEntity", [("id", str), ("address", str)])
+        same = make_dataclass("BuildingEntity", [("id", str), ("address", str)])
+        after = make_dataclass("BuildingEntity", [("id", str), ("address", str), ("latitude", float)])
+        
+        assert layout_version(before) == layout_version(same)
+        assert layout_version(before) != layout_version(after)
+    
+    def test_locked_segment_write_skipped(self, tmp_path):
+        """Тест: пока сегмент пишет другой процесс, запись пропускается без ожидания блокировки"""
+        segment = _segment(tmp_path)
+        segment._map()
+        fd = os.open(segment.path, os.O_RDWR)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            assert not segment.put(key_digest("key"), b"payload", 2000.0)
+        finally:
+            os.close(fd)
+        
+        assert segment.write_conflicts == 1
+        assert segment.get(key_digest("key")) is None
+        assert segment.put(key_digest("key"), b"payload", 2000.0)
+    
+    def test_reopened_after_fork(self, tmp_path):
+        """Тест: после fork процесс открывает сегмент заново и закрывает унаследованное отображение"""
+        segment = _segment(tmp_path)
+        inherited = segment._map()
+        child = multiprocessing.get_context("fork").Process(target=_put_from_child, args=(segment,))
+        child.start()
+        child.join()
+        
+        assert child.exitcode == 0
+        assert segment.get(key_digest("child")) == b"child"
+        
+        segment._pid = -1
+        assert segment._map() is not inherited
+        assert inherited.closed
+    
+    def test_concurrent_writer_never_returns_torn_value(self, tmp_path):
+        """Тест: чтение во время записи из другого процесса возвращает только целые значения"""
+        reader = _segment(tmp_path, arena_bytes=1024)
+        reader.get(key_digest("key"))
+        writer = multiprocessing.get_context("fork").Process(target=_rewrite, args=(tmp_path, 20000))
+        writer.start()
+        
+        reads = 0
+        while writer.is_alive():
+            payload = reader.get(key_digest("key"))
+            if payload is not None:
+                reads += 1
+                assert payload == payload[:1] * (50 + payload[0] % 50)
+        writer.join()
+        
+        assert writer.exitcode == 0
+        assert reads > 0
+
+
+class TestSharedResultCache:
+    """Тесты для SharedResultCache"""
+    
+    @pytest.mark.asyncio
+    async def test_value_loaded_once_across_workers(self, tmp_path):
+        """Тест: значение, загруженное одним воркером, другой воркер берет из общего сегмента"""
+        building = BuildingEntity("building-1", "Москва", 55.7, 37.6)
+        value = [OrganizationEntity("org-1", "Молоко", "building-1", building=building)]
+        first = SharedResultCache(_segment(tmp_path), ttl_seconds=30)
+        second = SharedResultCache(_segment(tmp_path), ttl_seconds=30)
+        load = AsyncMock(return_value=value)
+        
+        assert await first.get_or_load(("list_by_building", "building-1"), load) == value
+        assert await second.get_or_load(("list_by_building", "building-1"), load) == value
+        
+        load.assert_awaited_once()
+        assert (first.misses, first.stores, second.hits) == (1, 1, 1)
+    
+    @pytest.mark.asyncio
+    async def test_none_result_cached(self, tmp_path):
+        """Тест: отсутствие организации кешируется как значение"""
+        cache = SharedResultCache(_segment(tmp_path), ttl_seconds=30)
+        load = AsyncMock(return_value=None)
+        
+        assert await cache.get_or_load(("get_by_id", "missing"), load) is None
+        assert await cache.get_or_load(("get_by_id", "missing"), load) is None
+        
+        load.assert_awaited_once()
+    
+    @pytest.mark.asyncio
+    async def test_unavailable_segment_bypassed(self, tmp_path):
+        """Тест: без доступного сегмента запросы идут в load()"""
+        segment = SharedMemorySegment(str(tmp_path / "missing" / "segment"), arena_bytes=4096, slots=16)
+        cache = SharedResultCache(segment, ttl_seconds=30)
+        load = AsyncMock(return_value="value")
+        
+        assert await cache.get_or_load("key", load) == "value"
+        assert await cache.get_or_load("key", load) == "value"
+        
+        assert load.await_count == 2
+        assert cache.stats()["available"] is False
+    
+    @pytest.mark.asyncio
+    async def test_local_cache_misses_go_to_shared_tier(self, tmp_path):
+        """Тест: промах ResultCache воркера берет значение из общего кеша, не из БД"""
+        shared = SharedResultCache(_segment(tmp_path), ttl_seconds=30)
+        workers = [ResultCache(max_bytes=10 ** 6, ttl_seconds=60, next_tier=shared) for _ in range(2)]
+        load = AsyncMock(return_value=["org-1"])
+        
+        for worker in workers:
+            assert await worker.get_or_load("key", load) == ["org-1"]
+            assert await worker.get_or_load("key", load) == ["org-1"]
+        
+        load.assert_awaited_once()
+        assert (shared.misses, shared.hits) == (1, 1)
+        assert [worker.hits for worker in workers] == [1, 1]
+
+    @pytest.mark.asyncio
+    async def test_early_refresh_bypasses_shared_tier(self, tmp_path):
+        """Тест: раннее обновление ResultCache загружает значение из БД и перезаписывает общий сегмент"""
+        clock = FakeClock()
+        shared = SharedResultCache(_segment(tmp_path), ttl_seconds=30)
+        worker = ResultCache(max_bytes=10 ** 6, ttl_seconds=10, clock=clock, rand=lambda: 0.99, next_tier=shared)
+        other = ResultCache(max_bytes=10 ** 6, ttl_seconds=10, next_tier=shared)
+        
+        assert await worker.get_or_load("key", AsyncMock(return_value="old")) == "old"
+        worker._entries["key"].delta = 1.0
+        
+        clock.now += 6
+        load = AsyncMock(return_value="new")
+        assert await worker.get_or_load("key", load) == "new"
+        
+        load.assert_awaited_once()
+        assert (worker.early_refreshes, shared.refreshes, shared.hits) == (1, 1, 0)
+        assert await other.get_or_load("key", AsyncMock(return_value="unused")) == "new"
@@ -0,0 +1,400 @@
+import random
+import numpy as np
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+from app.config import get_db_url
+from app.repo.organization.repo import OrganizationRepo
+from app.repo.building.repo import BuildingRepo
+from app.repo.snapshot.snapshot import DirectorySnapshot, DirectorySnapshotCache, trigrams, similarity
+from app.repo.snapshot.repo import OrganizationSnapshotRepo, BuildingSnapshotRepo
+from app.repo.snapshot.geo import sphere_distance, spheroid_distance, spheroid_distances
+from app.repo.snapshot.spatial import GridIndex
+from app.entity.building import BuildingEntity
+from app.exceptions import DatabaseQueryError
+
+
+BUILDINGS = [
+    ("b-1", "ул. Ленина, 1", 55.7558, 37.6176),
+    ("b-2", "ул. Пушкина, 10", 55.7517, 37.6178),
+    ("b-3", "Невский проспект, 5", 59.9343, 30.3351),
+    ("b-4", "ул. Тверская, 15", 55.7558, 37.6173),
+]
+ORGANIZATIONS = [
+    ("o-5", "Бар \"Рок\"", "бар \"рок\"", "b-2"),
+    ("o-1", "Мясной дом", "мясной дом", "b-1"),
+    ("o-2", "Сырная лавка", "сырная лавка", "b-1"),
+    ("o-3", "Бар \"Кружка\"", "бар \"кружка\"", "b-2"),
+    ("o-4", "Кинотеатр \"Луч\"", "кинотеатр \"луч\"", "b-3"),
+]
+ACTIVITIES = [(1, "Еда", None), (2, "Мясная продукция", 1), (3, "Колбасы", 2), (6, "Развлечения", None), (8, "Бары", 6)]
+ORGANIZATION_ACTIVITIES = [("o-1", 3), ("o-1", 2), ("o-2", 1), ("o-3", 8), ("o-5", 8), ("o-4", 6)]
+PHONES = [("o-1", "p-2", "+7 002"), ("o-1", "p-1", "+7 001"), ("o-3", "p-3", "+7 003")]
+
+
+def _snapshot() -> DirectorySnapshot:
+    return DirectorySnapshot.build(BUILDINGS, ORGANIZATIONS, ACTIVITIES, ORGANIZATION_ACTIVITIES, PHONES, "v1")
+
+
+def _ids(entities) -> list:
+    return [entity.id for entity in entities]
+
+
+def test_similarity_matches_pg_trgm():
+    """Тест: похожесть строк совпадает с примерами из документации pg_trgm"""
+    assert sorted(trigrams("cat")) == ["  c", " ca", "at ", "cat"]
+    assert similarity(trigrams("word"), trigrams("two words")) == pytest.approx(0.36363637, abs=1e-8)
+    assert similarity(trigrams("бар"), trigrams("бар \"рок\"")) == pytest.approx(0.5)
+    assert similarity(trigrams(""), trigrams("бар")) == 0.0
+
+
+def test_geo_helpers():
+    """Тест расстояния по сфероиду (контрольный пример Винсенти)"""
+    assert spheroid_distance(-37.95103341666667, 144.42486788888888, -37.65282113888889, 143.92649552777777) \
+        == pytest.approx(54972.271, abs=1e-3)
+
+
+def test_spheroid_distances_match_scalar():
+    """Тест: векторная формула Винсенти совпадает с поэлементной, включая совпадающие точки"""
+    rnd = random.Random(1)
+    latitudes = np.array([rnd.uniform(-90, 90) for _ in range(500)] + [10.0])
+    longitudes = np.array([rnd.uniform(-180, 180) for _ in range(500)] + [20.0])
+    
+    expected = [spheroid_distance(10.0, 20.0, lat, lon) for lat, lon in zip(latitudes, longitudes)]
+    
+    assert spheroid_distances(10.0, 20.0, latitudes, longitudes) == pytest.approx(expected, abs=1e-4)
+
+
+@pytest.mark.parametrize("latitude_range, longitude_range", [
+    ((-90, 90), (-180, 180)),
+    ((55, 56), (37, 38)),
+    ((-89.9, -85), (170, 180)),
+])
+def test_grid_index_matches_full_scan(latitude_range, longitude_range):
+    """Тест: радиус (по сфероиду и по сфере) и прямоугольник совпадают с полным перебором точек"""
+    rnd = random.Random(2)
+    latitudes = [rnd.uniform(*latitude_range) for _ in range(2000)]
+    longitudes = [rnd.choice([-1, 1]) * rnd.uniform(*longitude_range) for _ in range(2000)]
+    index = GridIndex(latitudes, longitudes)
+    points = list(zip(latitudes, longitudes))
+    
+    for i in range(20):
+        latitude, longitude = points[i] if i % 2 else (rnd.uniform(-90, 90), rnd.uniform(-180, 180))
+        radius = rnd.choice([1000, 50000, 500000, 3e6, 2e7])
+        
+        found, distances = index.radius(latitude, longitude, radius)
+        assert found.tolist() == [
+            j for j, point in enumerate(points) if spheroid_distance(latitude, longitude, *point) <= radius
+        ]
+        assert distances.tolist() == pytest.approx([sphere_distance(latitude, longitude, *points[j]) for j in found])
+        
+        found, _ = index.radius(latitude, longitude, radius, spheroid=False)
+        assert found.tolist() == [
+            j for j, point in enumerate(points) if sphere_distance(latitude, longitude, *point) <= radius
+        ]
+        
+        min_latitude, max_latitude = sorted([latitude, rnd.uniform(-90, 90)])
+        min_longitude, max_longitude = sorted([rnd.uniform(-180, 180), rnd.uniform(-180, 180)])
+        assert index.rectangle(min_latitude, min_longitude, max_latitude, max_longitude, inclusive=True).tolist() == [
+            j for j, (lat, lon) in enumerate(points)
+            if min_latitude <= lat <= max_latitude and min_longitude <= lon <= max_longitude
+        ]
+        assert index.rectangle(min_latitude, min_longitude, max_latitude, max_longitude).tolist() == [
+            j for j, (lat, lon) in enumerate(points)
+            if min_latitude < lat < max_latitude and min_longitude < lon < max_longitude
+        ]
+
+
+def test_grid_index_from_buildings():
+    """Тест построения индекса по строкам зданий, в том числе пустого"""
+    buildings = [BuildingEntity("b-%d" % i, "", 55.0 + i * 1e-3, 37.0) for i in range(3)]
+    
+    assert GridIndex.from_buildings(buildings).rectangle(54.0, 36.0, 55.0015, 38.0).tolist() == [0, 1]
+    assert len(GridIndex.from_buildings([]).radius(55.0, 37.0, 1e7)[0]) == 0
+
+
+class TestOrganizationSnapshotRepo:
+    """Тесты для OrganizationSnapshotRepo"""
+    
+    @pytest.mark.asyncio
+    async def test_entity_assembled_from_columns(self):
+        """Тест сборки Entity: здание, виды деятельности и телефоны по возрастанию id"""
+        repo = OrganizationSnapshotRepo(_snapshot())
+        
+        entity = await repo.get_org_by_id("o-1")
+        
+        assert entity.building == BuildingEntity("b-1", "ул. Ленина, 1", 55.7558, 37.6176)
+        assert [activity.id for activity in entity.activities] == [2, 3]
+        assert [phone.id for phone in entity.phones] == ["p-1", "p-2"]
+        assert (await repo.get_org_by_id("o-4")).phones is None
+        assert await repo.get_org_by_id("missing") is None
+    
+    @pytest.mark.asyncio
+    async def test_keyset_pages_by_id(self):
+        """Тест keyset страниц по id: организации здания и вида деятельности"""
+        repo = OrganizationSnapshotRepo(_snapshot())
+        
+        assert _ids(await repo.list_by_building("b-2", limit=1)) == ["o-3"]
+        assert _ids(await repo.list_by_building("b-2", limit=1, after=("o-3",))) == ["o-5"]
+        assert await repo.list_by_building("missing") == []
+        assert _ids(await repo.list_by_activity_exact(" бары ")) == ["o-3", "o-5"]
+        assert _ids(await repo.list_by_activity_exact("Бары", after=("o-3",))) == ["o-5"]
+        assert await repo.list_by_activity_exact("") == []
+    
+    @pytest.mark.asyncio
+    async def test_activity_hierarchy(self):
+        """Тест поиска по дереву видов деятельности с ограничением глубины"""
+        repo = OrganizationSnapshotRepo(_snapshot())
+        
+        assert _ids(await repo.list_by_activity_hierarchy("Еда", up_depth=0, down_depth=0)) == ["o-2"]
+        assert _ids(await repo.list_by_activity_hierarchy("Еда", up_depth=0, down_depth=1)) == ["o-1", "o-2"]
+        assert _ids(await repo.list_by_activity_hierarchy("Колбасы", up_depth=2, down_depth=0)) == ["o-1", "o-2"]
+    
+    @pytest.mark.asyncio
+    async def test_name_search_ranked(self):
+        """Тест поиска по названию: по убыванию похожести, затем по id, с курсором (search_rank, id)"""
+        repo = OrganizationSnapshotRepo(_snapshot())
+        
+        first = await repo.get_org_by_name("Бар")
+        assert _ids(first) == ["o-5", "o-3"]
+        assert first[0].search_rank > first[1].search_rank
+        
+        assert _ids(await repo.get_org_by_name("бар", after=(first[0].search_rank, "o-5"))) == ["o-3"]
+        assert await repo.get_org_by_name("ба") == []
+    
+    @pytest.mark.asyncio
+    async def test_radius_orders(self):
+        """Тест поиска в радиусе по id и по расстоянию с курсором (distance_order, id)"""
+        repo = OrganizationSnapshotRepo(_snapshot())
+        
+        assert _ids(await repo.list_by_radius(55.7558, 37.6173, 1000)) == ["o-1", "o-2", "o-3", "o-5"]
+        assert _ids(await repo.list_by_radius(55.7558, 37.6173, 10)) == []
+        
+        by_distance = await repo.list_by_radius(55.7558, 37.6176, 1000, order="distance", limit=3)
+        assert _ids(by_distance) == ["o-1", "o-2", "o-3"]
+        assert by_distance[0].distance_meters == by_distance[0].distance_order == 0.0
+        assert by_distance[2].distance_meters == pytest.approx(by_distance[2].distance_order, rel=0.01)
+        
+        after = (by_distance[-1].distance_order, by_distance[-1].id)
+        assert _ids(await repo.list_by_radius(55.7558, 37.6176, 1000, order="distance", after=after)) == ["o-5"]
+    
+    @pytest.mark.asyncio
+    async def test_rectangle_excludes_border_points_include_it(self):
+        """Тест: list_by_rectangle не включает здания на границе (ST_Within), точки - включают"""
+        repo = OrganizationSnapshotRepo(_snapshot())
+        
+        assert _ids(await repo.list_by_rectangle(55.7558, 37.0, 56.0, 38.0)) == []
+        assert _ids(await repo.list_by_rectangle(55.7, 37.0, 56.0, 38.0, limit=2)) == ["o-1", "o-2"]
+        points = await repo.list_points_by_rectangle(55.7558, 37.0, 56.0, 38.0)
+        assert sorted(point[0] for point in points) == ["o-1", "o-2"]
+    
+    @pytest.mark.asyncio
+    async def test_nearest_and_ids(self):
+        """Тест ближайших организаций (с фильтром по виду деятельности) и поиска по списку id"""
+        repo = OrganizationSnapshotRepo(_snapshot())
+        
+        nearest = await repo.list_nearest(59.9, 30.3, 2)
+        assert _ids(nearest)[0] == "o-4"
+        assert nearest[1].distance_meters > 600000
+        assert _ids(await repo.list_nearest(59.9, 30.3, 5, activity_name="Бары")) == ["o-3", "o-5"]
+        assert await repo.list_nearest(59.9, 30.3, 5, activity_name="Нет такого") == []
+        assert _ids(await repo.list_by_ids(["o-5", "missing", "o-1", "o-5"])) == ["o-1", "o-5"]
+    
+    @pytest.mark.asyncio
+    async def test_clusters(self):
+        """Тест кластеров: количество организаций и средние координаты по ячейкам сетки"""
+        repo = OrganizationSnapshotRepo(_snapshot())
+        
+        clusters = await repo.list_clusters(50.0, 30.0, 60.0, 40.0, 1.0)
+        
+        by_count = sorted(clusters, key=lambda cluster: cluster.count)
+        assert [cluster.count for cluster in by_count] == [1, 4]
+        assert by_count[1].latitude == pytest.approx((55.7558 * 2 + 55.7517 * 2) / 4)
+    
+    @pytest.mark.asyncio
+    async def test_streaming(self):
+        """Тест потокового режима: Entity собираются порциями при чтении"""
+        stream = await OrganizationSnapshotRepo(_snapshot()).streaming(batch_size=2).list_by_activity_exact("Бары")
+        
+        assert stream
+        assert [entity.id async for entity in stream] == ["o-3", "o-5"]
+        await stream.aclose()
+
+
+@pytest.mark.asyncio
+async def test_building_snapshot_repo():
+    """Тест поиска зданий в радиусе и прямоугольнике"""
+    repo = BuildingSnapshotRepo(_snapshot())
+    
+    assert [building.id for building in await repo.list_by_radius(55.7558, 37.6173, 100)] == ["b-1", "b-4"]
+    assert [building.id for building in await repo.list_by_rectangle(55.0, 37.0, 56.0, 38.0)] == ["b-1", "b-2", "b-4"]
+
+
+def _result(rows=None, scalar=None):
+    result = MagicMock()
+    result.all.return_value = rows
+    result.scalar_one.return_value = scalar
+    return result
+
+
+@pytest.mark.asyncio
+async def test_snapshot_refresh_checks_version_counter():
+    """Тест: обновление сверяет счетчик версии и перечитывает таблицы только при его изменении"""
+    cache = DirectorySnapshotCache()
+    session = MagicMock()
+    session.connection = AsyncMock()
+    session.rollback = AsyncMock()
+    tables = [BUILDINGS, ORGANIZATIONS, ACTIVITIES, ORGANIZATION_ACTIVITIES, PHONES]
+    session.execute = AsyncMock(side_effect=[
+        _result(scalar=1), *[_result(rows=rows) for rows in tables],
+        _result(scalar=1),
+        _result(scalar=2), _result(scalar=2), *[_result(rows=rows) for rows in tables],
+    ])
+    
+    await cache.load(session)
+    first = cache.current
+    
+    assert await cache.refresh(session) is False
+    assert cache.current is first
+    assert "directory_version" in str(session.execute.await_args.args[0])
+    
+    assert await cache.refresh(session) is True
+    assert (first.version, cache.current.version) == ("1", "2")
+
+
+def _comparable(entity) -> tuple:
+    return (
+        entity.id,
+        entity.title,
+        entity.building,
+        sorted(activity.id for activity in entity.activities or []),
+        sorted((phone.id, phone.phone_number) for phone in entity.phones or []),
+    )
+
+
+async def _walk(list_page, cursor, limit=2) -> list:
+    """Все страницы запроса: курсор каждой страницы берется из ее последней организации"""
+    entities, after = [], None
+    while True:
+        page = await list_page(limit=limit, after=after)
+        entities.extend(page)
+        if len(page) < limit:
+            return entities
+        after = cursor(page[-1])
+
+
+MOSCOW = (55.7558, 37.6173)
+RECTANGLES = [(55.70, 37.50, 55.80, 37.70), (55.7558, 37.5, 55.80, 37.6176), (-90.0, -180.0, 90.0, 180.0)]
+
+
+class TestSnapshotEquivalencePostgres:
+    """
+    Тесты эквивалентности: одни и те же запросы к OrganizationRepo/BuildingRepo
+    и к репозиториям снимка, загруженного из той же БД (make test)
+    """
+
+    @pytest.fixture
+    async def repos(self):
+        engine = create_async_engine(get_db_url(), poolclass=NullPool)
+        try:
+            async with AsyncSession(engine) as session:
+                snapshot = await DirectorySnapshotCache().load(session)
+        except (OSError, SQLAlchemyError, DatabaseQueryError) as e:
+            await engine.dispose()
+            pytest.skip("Нужен Postgres с миграциями и тестовыми данными (make test): %s" % e)
+        
+        async with AsyncSession(engine) as session:
+            yield (
+                OrganizationRepo(session),
+                OrganizationSnapshotRepo(snapshot),
+                BuildingRepo(session),
+                BuildingSnapshotRepo(snapshot),
+            )
+        await engine.dispose()
+    
+    @pytest.mark.asyncio
+    async def test_lookups(self, repos):
+        """Тест: по id, зданию, видам деятельности и списку id"""
+        sql, memory, _, _ = repos
+        all_entities = await sql.list_by_rectangle(-90.0, -180.0, 90.0, 180.0)
+        org_ids = [entity.id for entity in all_entities]
+        assert org_ids
+        
+        for org_id in org_ids + ["missing"]:
+            expected, actual = await sql.get_org_by_id(org_id), await memory.get_org_by_id(org_id)
+            assert (expected and _comparable(expected)) == (actual and _comparable(actual))
+        
+        for building_id in {entity.building_id for entity in all_entities} | {"missing"}:
+            expected = await _walk(lambda **page: sql.list_by_building(building_id, **page), lambda e: (e.id,), 1)
+            actual = await _walk(lambda **page: memory.list_by_building(building_id, **page), lambda e: (e.id,), 1)
+            assert [_comparable(e) for e in actual] == [_comparable(e) for e in expected]
+        
+        names = {activity.name for entity in all_entities for activity in entity.activities or []}
+        for name in sorted(names) + ["Нет такого"]:
+            expected = await _walk(lambda **page: sql.list_by_activity_exact(name, **page), lambda e: (e.id,))
+            actual = await _walk(lambda **page: memory.list_by_activity_exact(name, **page), lambda e: (e.id,))
+            assert _ids(actual) == _ids(expected)
+            
+            for up_depth, down_depth in [(0, 0), (1, 0), (0, 2), (3, 3)]:
+                expected = await sql.list_by_activity_hierarchy(name, up_depth, down_depth)
+                actual = await memory.list_by_activity_hierarchy(name, up_depth, down_depth)
+                assert _ids(actual) == _ids(expected)
+        
+        requested = org_ids[::2] + ["missing"]
+        assert _ids(await memory.list_by_ids(requested)) == _ids(await sql.list_by_ids(requested))
+    
+    @pytest.mark.asyncio
+    async def test_name_search(self, repos):
+        """Тест: поиск по названию, похожесть и страницы по (search_rank, id)"""
+        sql, memory, _, _ = repos
+        
+        for name in ["бар", "Ресторан", "магазин", "кинотеатр \"луч\"", "ёлка", "100%"]:
+            cursor = lambda e: (e.search_rank, e.id)
+            expected = await _walk(lambda **page: sql.get_org_by_name(name, **page), cursor)
+            actual = await _walk(lambda **page: memory.get_org_by_name(name, **page), cursor)
+            assert _ids(actual) == _ids(expected)
+            assert [e.search_rank for e in actual] == pytest.approx([e.search_rank for e in expected], abs=1e-6)
+    
+    @pytest.mark.asyncio
+    async def test_geo(self, repos):
+        """Тест: радиус (по id и по расстоянию), прямоугольник, точки, ближайшие и кластеры"""
+        sql, memory, sql_buildings, memory_buildings = repos
+        
+        for radius in [50, 300, 1000, 5000, 1000000]:
+            expected = await _walk(lambda **page: sql.list_by_radius(*MOSCOW, radius, **page), lambda e: (e.id,))
+            actual = await _walk(lambda **page: memory.list_by_radius(*MOSCOW, radius, **page), lambda e: (e.id,))
+            assert _ids(actual) == _ids(expected)
+            
+            cursor = lambda e: (e.distance_order, e.id)
+            expected = await _walk(lambda **page: sql.list_by_radius(*MOSCOW, radius, "distance", **page), cursor)
+            actual = await _walk(lambda **page: memory.list_by_radius(*MOSCOW, radius, "distance", **page), cursor)
+            assert _ids(actual) == _ids(expected)
+            assert [e.distance_meters for e in actual] == pytest.approx([e.distance_meters for e in expected])
+            
+            expected = await sql_buildings.list_by_radius(*MOSCOW, radius)
+            assert sorted(await memory_buildings.list_by_radius(*MOSCOW, radius), key=lambda b: b.id) \
+                == sorted(expected, key=lambda b: b.id)
+        
+        for bounds in RECTANGLES:
+            expected = await _walk(lambda **page: sql.list_by_rectangle(*bounds, **page), lambda e: (e.id,))
+            actual = await _walk(lambda **page: memory.list_by_rectangle(*bounds, **page), lambda e: (e.id,))
+            assert [_comparable(e) for e in actual] == [_comparable(e) for e in expected]
+            assert sorted(await memory.list_points_by_rectangle(*bounds)) \
+                == sorted(await sql.list_points_by_rectangle(*bounds))
+            assert sorted(await memory_buildings.list_by_rectangle(*bounds), key=lambda b: b.id) \
+                == sorted(await sql_buildings.list_by_rectangle(*bounds), key=lambda b: b.id)
+            
+            for grid_size in [0.001, 0.01, 1.0]:
+                expected = sorted(await sql.list_clusters(*bounds, grid_size), key=lambda c: (c.latitude, c.longitude))
+                actual = sorted(await memory.list_clusters(*bounds, grid_size), key=lambda c: (c.latitude, c.longitude))
+                assert [c.count for c in actual] == [c.count for c in expected]
+                assert [(c.latitude, c.longitude) for c in actual] \
+                    == pytest.approx([(c.latitude, c.longitude) for c in expected])
+        
+        for k, activity_name in [(1, None), (5, None), (100, None), (3, "Еда"), (3, "Нет такого")]:
+            expected = await sql.list_nearest(*MOSCOW, k, activity_name)
+            actual = await memory.list_nearest(*MOSCOW, k, activity_name)
+            assert [e.distance_meters for e in actual] == pytest.approx([e.distance_meters for e in expected])
+            assert sorted(_ids(actual)) == sorted(_ids(expected)) or len({e.distance_meters for e in expected}) < k
@@ -0,0 +1,96 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from sqlalchemy.dialects.postgresql import asyncpg
+from app.repo.organization.repo import OrganizationRepo
+from app.repo.organization.json_repo import OrganizationJsonRepo
+from app.repo.building.repo import BuildingRepo
+
+
+def _session():
+    result = MagicMock()
+    result.all.return_value = []
+    result.__iter__.return_value = iter([])
+    
+    session = MagicMock()
+    session.execute = AsyncMock(return_value=result)
+    return session
+
+
+def _compile(stmt, dialect, compiled_cache):
+    """Поиск скомпилированного SQL так же, как при выполнении через Connection"""
+    _, _, cache_hit = stmt._compile_w_cache(
+        dialect,
+        compiled_cache=compiled_cache,
+        column_keys=[],
+        for_executemany=False,
+        schema_translate_map=None
+    )
+    return cache_hit
+
+
+class TestStatementCache:
+    """Тесты повторного использования запросов репозиториев"""
+    
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("repo_class", [OrganizationRepo, OrganizationJsonRepo])
+    async def test_same_statement_for_different_values(self, repo_class):
+        """Тест: запрос собирается один раз, значения передаются параметрами"""
+        session = _session()
+        repo = repo_class(session)
+        
+        await repo.list_by_radius(55.75, 37.61, 1000, order="distance", limit=10, after=(5.0, "org-1"))
+        await repo.list_by_radius(59.93, 30.31, 500, order="distance", limit=20, after=(7.5, "org-2"))
+        
+        (first_stmt, first_params), (second_stmt, second_params) = [
+            call.args for call in session.execute.call_args_list
+        ]
+        assert first_stmt is second_stmt
+        assert first_params["latitude"] == 55.75
+        assert (second_params["latitude"], second_params["limit"], second_params["after_id"]) == (59.93, 20, "org-2")
+    
+    @pytest.mark.asyncio
+    async def test_compiled_cache_hit(self):
+        """Тест: повторный запрос с другими значениями берет скомпилированный SQL из кеша"""
+        session = _session()
+        repo = OrganizationRepo(session)
+        
+        await repo.list_by_rectangle(55.0, 37.0, 56.0, 38.0, limit=10, after=("org-1",))
+        await repo.list_by_rectangle(59.0, 30.0, 60.0, 31.0, limit=50, after=("org-9",))
+        await repo.list_by_ids(["org-1"])
+        await repo.list_by_ids(["org-1", "org-2", "org-3"])
+        
+        dialect = asyncpg.dialect()
+        compiled_cache = {}
+        cache_hits = [
+            _compile(call.args[0], dialect, compiled_cache)
+            for call in session.execute.call_args_list
+        ]
+        
+        assert cache_hits == [dialect.CACHE_MISS, dialect.CACHE_HIT, dialect.CACHE_MISS, dialect.CACHE_HIT]
+        assert len(compiled_cache) == 2
+    
+    @pytest.mark.asyncio
+    async def test_cursor_changes_statement_shape(self):
+        """Тест: первая страница и страницы после курсора - разные запросы, каждый собирается один раз"""
+        session = _session()
+        repo = OrganizationRepo(session)
+        
+        for after in (None, ("org-1",), None, ("org-2",)):
+            await repo.list_by_building("building-1", limit=10, after=after)
+        
+        first, second, third, fourth = [call.args[0] for call in session.execute.call_args_list]
+        assert first is third and second is fourth
+        assert first is not second
+    
+    @pytest.mark.asyncio
+    async def test_building_repo_prebuilt(self):
+        """Тест: запросы BuildingRepo не собираются заново"""
+        session = _session()
+        repo = BuildingRepo(session)
+        
+        await repo.list_by_rectangle(55.0, 37.0, 56.0, 38.0)
+        await repo.list_by_rectangle(59.0, 30.0, 60.0, 31.0)
+        
+        first, second = session.execute.call_args_list
+        assert first.args[0] is second.args[0]
+        assert second.args[1]["min_latitude"] == 59.0
@@ -0,0 +1,118 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from app.repo.activity.taxonomy import ActivityTaxonomy, ActivityTaxonomyCache
+from app.repo.organization.repo import OrganizationRepo
+
+
+# Еда -> Мясная продукция -> Колбасы, Еда -> Молочная продукция, Автомобили
+ACTIVITY_ROWS = [
+    (1, "Еда", None),
+    (2, "Мясная продукция", 1),
+    (3, "Молочная продукция", 1),
+    (4, "Колбасы", 2),
+    (5, "Автомобили", None),
+]
+
+
+def _result(rows=None, scalar=None):
+    result = MagicMock()
+    result.all.return_value = rows
+    result.scalar_one.return_value = scalar
+    return result
+
+
+class TestActivityTaxonomy:
+    """Тесты для ActivityTaxonomy"""
+    
+    @pytest.fixture
+    def taxonomy(self):
+        return ActivityTaxonomy.build(ACTIVITY_ROWS, "v1")
+    
+    def test_resolve_ignores_case(self, taxonomy):
+        """Тест разрешения названия без учета регистра и пробелов"""
+        assert taxonomy.resolve("  ЕДА ") == frozenset({1})
+        assert taxonomy.resolve("Неизвестно") == frozenset()
+    
+    def test_adjacency(self, taxonomy):
+        """Тест связей родитель/потомки"""
+        assert taxonomy.parents[4] == 2
+        assert taxonomy.children[1] == frozenset({2, 3})
+        assert taxonomy.children[4] == frozenset()
+    
+    def test_ancestors_and_descendants(self, taxonomy):
+        """Тест предрассчитанных предков и потомков с расстояниями"""
+        assert taxonomy.ancestors[4] == {4: 0, 2: 1, 1: 2}
+        assert taxonomy.descendants[1] == {1: 0, 2: 1, 3: 1, 4: 2}
+    
+    def test_hierarchy_ids(self, taxonomy):
+        """Тест поиска предков и потомков с ограничением глубины"""
+        assert taxonomy.hierarchy_ids("мясная продукция", 2, 2) == frozenset({1, 2, 4})
+        assert taxonomy.hierarchy_ids("еда", 1, 1) == frozenset({1, 2, 3})
+        assert taxonomy.hierarchy_ids("колбасы", 1, 0) == frozenset({2, 4})
+        assert taxonomy.hierarchy_ids("неизвестно", 2, 2) == frozenset()
+    
+    def test_cycle_does_not_hang(self):
+        """Тест построения дерева с циклом в данных"""
+        taxonomy = ActivityTaxonomy.build([(1, "a", 2), (2, "b", 1)], "v1")
+        
+        assert taxonomy.ancestors[1] == {1: 0, 2: 1}
+
+
+class TestActivityTaxonomyCache:
+    """Тесты для ActivityTaxonomyCache"""
+    
+    @pytest.mark.asyncio
+    async def test_refresh_swaps_on_version_change(self):
+        """Тест замены снимка только при изменении версии"""
+        cache = ActivityTaxonomyCache()
+        session = MagicMock()
+        session.execute = AsyncMock(side_effect=[
+            _result(scalar="v1"), _result(rows=ACTIVITY_ROWS),
+            _result(scalar="v1"),
+            _result(scalar="v2"), _result(scalar="v2"), _result(rows=ACTIVITY_ROWS[:1]),
+        ])
+        
+        await cache.load(session)
+        first = cache.current
+        
+        assert await cache.refresh(session) is False
+        assert cache.current is first
+        
+        assert await cache.refresh(session) is True
+        assert cache.current.version == "v2"
+        assert cache.current.resolve("Колбасы") == frozenset()
+        assert first.resolve("Колбасы") == frozenset({4})
+
+
+class TestOrganizationRepoTaxonomy:
+    """Тесты разрешения видов деятельности через дерево в памяти"""
+    
+    @pytest.fixture
+    def cache(self):
+        cache = ActivityTaxonomyCache()
+        cache._taxonomy = ActivityTaxonomy.build(ACTIVITY_ROWS, "v1")
+        return cache
+    
+    @pytest.mark.asyncio
+    async def test_unknown_activity_skips_database(self, cache):
+        """Тест: неизвестное название не приводит к запросу в БД"""
+        session = MagicMock()
+        session.execute = AsyncMock()
+        repo = OrganizationRepo(session, cache)
+        
+        assert await repo.list_by_activity_exact("Неизвестно") == []
+        assert await repo.list_by_activity_hierarchy("Неизвестно") == []
+        session.execute.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_known_activity_queries_by_ids(self, cache):
+        """Тест: запрос организаций идет по ID без обращения к activities"""
+        session = MagicMock()
+        session.execute = AsyncMock(return_value=_result(rows=[]))
+        repo = OrganizationRepo(session, cache)
+        
+        assert await repo.list_by_activity_hierarchy("Колбасы") == []
+        
+        statement = str(session.execute.call_args.args[0])
+        assert "activities.name" not in statement
+        assert "activity_closure" not in statement
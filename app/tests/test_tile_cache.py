@@ -0,0 +1,161 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from app.usecase.geo_search.tile_cache import TileCache, clip_and_merge
+from app.usecase.geo_search.search_use_case import GeoSearchUseCase
+from app.config import settings
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+
+def _cache(clock=None, max_tiles=100):
+    return TileCache(
+        tile_size=1.0,
+        max_tiles=max_tiles,
+        ttl_seconds=10,
+        max_tiles_per_query=16,
+        clock=clock or FakeClock()
+    )
+
+
+def _use_case(organization_repo):
+    return GeoSearchUseCase(
+        organization_repo,
+        MagicMock(),
+        _cache(),
+        cluster_max_cells=settings.CLUSTER_MAX_CELLS,
+        cluster_cells_per_tile=settings.CLUSTER_CELLS_PER_TILE
+    )
+
+
+class TestTileCache:
+    """Тесты для TileCache"""
+    
+    def test_tiles_for_rectangle(self):
+        """Тест покрытия области ячейками"""
+        cache = _cache()
+        
+        assert cache.tiles_for((0.5, 0.5, 1.5, 2.5)) == [(0, 0), (0, 1), (0, 2), (1, 0), (1, 1), (1, 2)]
+        assert cache.tile_of(-0.5, 1.0) == (-1, 1)
+        assert cache.count_tiles((0.5, 0.5, 1.5, 2.5)) == 6
+    
+    def test_ttl_expiration(self):
+        """Тест устаревания ячейки"""
+        clock = FakeClock()
+        cache = _cache(clock)
+        cache.put((0, 0), [("org-1", 0.5, 0.5)])
+        
+        assert cache.get((0, 0)) == [("org-1", 0.5, 0.5)]
+        clock.now = 10
+        assert cache.get((0, 0)) is None
+        assert (cache.hits, cache.misses) == (1, 1)
+        assert cache.stats() == {"tiles": 0, "max_tiles": 100, "hits": 1, "misses": 1, "evictions": 0, "expirations": 1}
+    
+    def test_lru_eviction(self):
+        """Тест вытеснения давно не использованной ячейки"""
+        cache = _cache(max_tiles=2)
+        cache.put((0, 0), [])
+        cache.put((0, 1), [])
+        cache.get((0, 0))
+        cache.put((0, 2), [])
+        
+        assert len(cache) == 2
+        assert cache.get((0, 1)) is None
+        assert cache.get((0, 0)) == []
+        assert (cache.evictions, cache.expirations) == (1, 0)
+    
+    def test_fill_distributes_points(self):
+        """Тест раскладки точек по загружаемым ячейкам"""
+        cache = _cache()
+        points = [("org-1", 0.5, 0.5), ("org-2", 0.5, 1.5), ("org-3", 5.5, 5.5)]
+        
+        tiles = cache.fill([(0, 0), (0, 1), (1, 1)], points)
+        
+        assert tiles == {(0, 0): [points[0]], (0, 1): [points[1]], (1, 1): []}
+        assert cache.get((1, 1)) == []
+
+
+class TestClipAndMerge:
+    """Тесты для clip_and_merge"""
+    
+    def test_clip_sort_and_page(self):
+        """Тест обрезки по области, сортировки, курсора и лимита"""
+        tiles = [
+            [("org-3", 0.5, 0.5), ("org-9", 0.1, 0.1)],
+            [("org-1", 0.5, 1.2), ("org-2", 0.9, 1.9)],
+        ]
+        
+        assert clip_and_merge(tiles, (0.2, 0.2, 1.0, 2.0)) == ["org-1", "org-2", "org-3"]
+        assert clip_and_merge(tiles, (0.2, 0.2, 1.0, 2.0), limit=1, after=("org-1",)) == ["org-2"]
+        assert clip_and_merge(tiles, (0.2, 0.2, 0.9, 1.9)) == ["org-1", "org-3"]
+
+
+class TestGeoSearchUseCaseTileCache:
+    """Тесты поиска в прямоугольной области через кеш ячеек"""
+    
+    @pytest.fixture
+    def organization_repo(self, sample_organization_entities):
+        repo = MagicMock()
+        repo.list_points_by_rectangle = AsyncMock(return_value=[
+            ("org-1", 0.5, 0.5),
+            ("org-2", 0.5, 1.5),
+            ("org-3", 1.5, 1.5),
+        ])
+        repo.list_by_ids = AsyncMock(return_value=sample_organization_entities[:2])
+        repo.list_by_rectangle = AsyncMock(return_value=[])
+        return repo
+    
+    @pytest.mark.asyncio
+    async def test_pan_uses_cached_tiles(self, organization_repo, sample_organization_entities):
+        """Тест: повторный запрос в тех же ячейках не обращается к БД за точками"""
+        use_case = _use_case(organization_repo)
+        
+        orgs, _ = await use_case.search_by_rectangle(0.1, 0.1, 1.9, 1.9, limit=2)
+        
+        assert orgs == sample_organization_entities[:2]
+        organization_repo.list_points_by_rectangle.assert_called_once()
+        organization_repo.list_by_ids.assert_called_once_with(["org-1", "org-2"])
+        
+        await use_case.search_by_rectangle(0.2, 0.2, 1.8, 1.8, after=("org-1",))
+        
+        organization_repo.list_points_by_rectangle.assert_called_once()
+        organization_repo.list_by_ids.assert_called_with(["org-2", "org-3"])
+        organization_repo.list_by_rectangle.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_large_area_bypasses_cache(self, organization_repo):
+        """Тест: область из большого числа ячеек ищется без кеша"""
+        use_case = _use_case(organization_repo)
+        
+        await use_case.search_by_rectangle(0.0, 0.0, 10.0, 10.0, limit=5)
+        
+        organization_repo.list_by_rectangle.assert_called_once_with(0.0, 0.0, 10.0, 10.0, limit=5, after=None)
+        organization_repo.list_points_by_rectangle.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_huge_area_not_enumerated(self, organization_repo):
+        """Тест: для области размером с весь мир ключи ячеек не перечисляются"""
+        use_case = _use_case(organization_repo)
+        use_case._tile_cache.tile_size = settings.GEO_TILE_SIZE_DEGREES
+        use_case._tile_cache.tiles_for = MagicMock(side_effect=AssertionError("tiles enumerated"))
+        
+        await use_case.search_by_rectangle(-90.0, -180.0, 90.0, 180.0, limit=5)
+        
+        organization_repo.list_by_rectangle.assert_called_once_with(-90.0, -180.0, 90.0, 180.0, limit=5, after=None)
+        organization_repo.list_points_by_rectangle.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_streaming_bypasses_cache(self, organization_repo):
+        """Тест: потоковый поиск идет через потоковый репозиторий без кеша"""
+        organization_repo.streaming.return_value = organization_repo
+        use_case = _use_case(organization_repo).streaming()
+        
+        await use_case.search_by_rectangle(0.1, 0.1, 1.9, 1.9)
+        
+        organization_repo.list_by_rectangle.assert_called_once_with(0.1, 0.1, 1.9, 1.9, limit=None, after=None)
+        organization_repo.list_points_by_rectangle.assert_not_called()
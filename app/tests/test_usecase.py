@@ -1,8 +1,11 @@
 import pytest
 from unittest.mock import AsyncMock, MagicMock
 from app.usecase.organization.get_organization import GetOrganizationUseCase
+from app.usecase.geo_search.search_use_case import GeoSearchUseCase, cluster_grid_size, MIN_CLUSTER_CELLS
+from app.entity.cluster import ClusterEntity
 from app.entity.organization import OrganizationEntity
 from app.exceptions import NotFoundError, UseCaseExecutionError, DatabaseError
+from app.config import settings
 
 
 class TestGetOrganizationUseCase:
@@ -48,6 +51,26 @@ class TestGetOrganizationUseCase:
         
         mock_repo.get_org_by_id.assert_called_once_with("org-1")
     
+    @pytest.mark.asyncio
+    async def test_get_by_ids(self, use_case, mock_repo, sample_organization_entities):
+        """Тест получения организаций по списку ID: один запрос без повторов, отсутствующие ID списком"""
+        mock_repo.list_by_ids = AsyncMock(return_value=sample_organization_entities[:2])
+        
+        organizations, missing = await use_case.get_by_ids(["org-2", "org-999", "org-1", "org-2"])
+        
+        assert list(organizations) == ["org-2", "org-1"]
+        assert organizations["org-1"] == sample_organization_entities[0]
+        assert missing == ["org-999"]
+        mock_repo.list_by_ids.assert_called_once_with(["org-2", "org-999", "org-1"])
+    
+    @pytest.mark.asyncio
+    async def test_get_by_ids_database_error(self, use_case, mock_repo):
+        """Тест получения организаций по списку ID при ошибке БД"""
+        mock_repo.list_by_ids = AsyncMock(side_effect=DatabaseError("Database connection error"))
+        
+        with pytest.raises(UseCaseExecutionError):
+            await use_case.get_by_ids(["org-1"])
+    
     @pytest.mark.asyncio
     async def test_get_by_name_success(self, use_case, mock_repo, sample_organization_entities):
         """Тест успешного получения организаций по частичному совпадению названия"""
@@ -58,7 +81,17 @@ class TestGetOrganizationUseCase:
         assert len(result) == 2
         assert result[0].title == "Магазин продуктов"
         assert result[1].title == "Супермаркет"
-        mock_repo.get_org_by_name.assert_called_once_with("магазин")
+        mock_repo.get_org_by_name.assert_called_once_with("магазин", limit=None, after=None)
+    
+    @pytest.mark.asyncio
+    async def test_get_by_name_with_limit(self, use_case, mock_repo, sample_organization_entities):
+        """Тест передачи лимита результатов в репозиторий"""
+        mock_repo.get_org_by_name = AsyncMock(return_value=sample_organization_entities[:1])
+        
+        result = await use_case.get_by_name("магазин", limit=1)
+        
+        assert len(result) == 1
+        mock_repo.get_org_by_name.assert_called_once_with("магазин", limit=1, after=None)
     
     @pytest.mark.asyncio
     async def test_get_by_name_not_found(self, use_case, mock_repo):
@@ -68,7 +101,7 @@ class TestGetOrganizationUseCase:
         with pytest.raises(NotFoundError, match="Organizations with name containing несуществующая not found"):
             await use_case.get_by_name("несуществующая")
         
-        mock_repo.get_org_by_name.assert_called_once_with("несуществующая")
+        mock_repo.get_org_by_name.assert_called_once_with("несуществующая", limit=None, after=None)
     
     @pytest.mark.asyncio
     async def test_list_by_building_success(self, use_case, mock_repo, sample_organization_entities):
@@ -78,7 +111,7 @@ class TestGetOrganizationUseCase:
         result = await use_case.list_by_building("building-1")
         
         assert len(result) == 3
-        mock_repo.list_by_building.assert_called_once_with("building-1")
+        mock_repo.list_by_building.assert_called_once_with("building-1", limit=None, after=None)
     
     @pytest.mark.asyncio
     async def test_list_by_building_not_found(self, use_case, mock_repo):
@@ -88,7 +121,7 @@ class TestGetOrganizationUseCase:
         with pytest.raises(NotFoundError, match="Organizations for building building-999 not found"):
             await use_case.list_by_building("building-999")
         
-        mock_repo.list_by_building.assert_called_once_with("building-999")
+        mock_repo.list_by_building.assert_called_once_with("building-999", limit=None, after=None)
     
     @pytest.mark.asyncio
     async def test_list_by_activity_exact_success(self, use_case, mock_repo, sample_organization_entities):
@@ -98,7 +131,7 @@ class TestGetOrganizationUseCase:
         result = await use_case.list_by_activity_exact("Розничная торговля")
         
         assert len(result) == 1
-        mock_repo.list_by_activity_exact.assert_called_once_with("Розничная торговля")
+        mock_repo.list_by_activity_exact.assert_called_once_with("Розничная торговля", limit=None, after=None)
     
     @pytest.mark.asyncio
     async def test_list_by_activity_exact_not_found(self, use_case, mock_repo):
@@ -108,7 +141,7 @@ class TestGetOrganizationUseCase:
         with pytest.raises(NotFoundError, match="Organizations for activity Несуществующая деятельность not found"):
             await use_case.list_by_activity_exact("Несуществующая деятельность")
         
-        mock_repo.list_by_activity_exact.assert_called_once_with("Несуществующая деятельность")
+        mock_repo.list_by_activity_exact.assert_called_once_with("Несуществующая деятельность", limit=None, after=None)
     
     @pytest.mark.asyncio
     async def test_list_by_activity_tree_success(self, use_case, mock_repo, sample_organization_entities):
@@ -118,7 +151,13 @@ class TestGetOrganizationUseCase:
         result = await use_case.list_by_activity_tree("Розничная торговля")
         
         assert len(result) == 3
-        mock_repo.list_by_activity_hierarchy.assert_called_once_with("Розничная торговля")
+        mock_repo.list_by_activity_hierarchy.assert_called_once_with(
+            "Розничная торговля",
+            up_depth=None,
+            down_depth=None,
+            limit=None,
+            after=None
+        )
     
     @pytest.mark.asyncio
     async def test_list_by_activity_tree_not_found(self, use_case, mock_repo):
@@ -128,5 +167,132 @@ class TestGetOrganizationUseCase:
         with pytest.raises(NotFoundError, match="Organizations for activity Несуществующая деятельность not found"):
             await use_case.list_by_activity_tree("Несуществующая деятельность")
         
-        mock_repo.list_by_activity_hierarchy.assert_called_once_with("Несуществующая деятельность")
+        mock_repo.list_by_activity_hierarchy.assert_called_once_with(
+            "Несуществующая деятельность",
+            up_depth=None,
+            down_depth=None,
+            limit=None,
+            after=None
+        )
+
+    @pytest.mark.asyncio
+    async def test_list_by_building_next_page(self, use_case, mock_repo, sample_organization_entities):
+        """Тест передачи параметров страницы в репозиторий"""
+        mock_repo.list_by_building = AsyncMock(return_value=sample_organization_entities[1:])
+        
+        result = await use_case.list_by_building("building-1", limit=2, after=("org-1",))
+        
+        assert len(result) == 2
+        mock_repo.list_by_building.assert_called_once_with("building-1", limit=2, after=("org-1",))
+    
+    @pytest.mark.asyncio
+    async def test_list_by_building_empty_next_page(self, use_case, mock_repo):
+        """Тест пустой страницы после курсора - не ошибка"""
+        mock_repo.list_by_building = AsyncMock(return_value=[])
+        
+        result = await use_case.list_by_building("building-1", limit=2, after=("org-3",))
+        
+        assert result == []
 
+
+class TestGeoSearchUseCase:
+    """Тесты для GeoSearchUseCase"""
+    
+    @pytest.fixture
+    def organization_repo(self):
+        return MagicMock()
+    
+    @pytest.fixture
+    def building_repo(self):
+        return MagicMock()
+    
+    @pytest.fixture
+    def use_case(self, organization_repo, building_repo):
+        return GeoSearchUseCase(
+            organization_repo,
+            building_repo,
+            cluster_max_cells=settings.CLUSTER_MAX_CELLS,
+            cluster_cells_per_tile=settings.CLUSTER_CELLS_PER_TILE
+        )
+    
+    @pytest.mark.asyncio
+    async def test_search_by_radius_skips_buildings(
+        self, use_case, organization_repo, building_repo, sample_organization_entities
+    ):
+        """Тест: без include_buildings запрос зданий не выполняется"""
+        organization_repo.list_by_radius = AsyncMock(return_value=sample_organization_entities)
+        building_repo.list_by_radius = AsyncMock(return_value=[])
+        
+        orgs, buildings = await use_case.search_by_radius(55.75, 37.61, 1000, limit=10)
+        
+        assert orgs == sample_organization_entities
+        assert buildings == []
+        organization_repo.list_by_radius.assert_called_once_with(
+            55.75, 37.61, 1000, order="id", limit=10, after=None
+        )
+        building_repo.list_by_radius.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_search_by_rectangle_with_buildings(
+        self, use_case, organization_repo, building_repo, sample_organization_entities, sample_building_entity
+    ):
+        """Тест: с include_buildings выполняются оба запроса"""
+        organization_repo.list_by_rectangle = AsyncMock(return_value=sample_organization_entities)
+        building_repo.list_by_rectangle = AsyncMock(return_value=[sample_building_entity])
+        
+        orgs, buildings = await use_case.search_by_rectangle(55.0, 37.0, 56.0, 38.0, include_buildings=True)
+        
+        assert orgs == sample_organization_entities
+        assert buildings == [sample_building_entity]
+        building_repo.list_by_rectangle.assert_called_once_with(55.0, 37.0, 56.0, 38.0)
+    
+    @pytest.mark.asyncio
+    async def test_search_by_radius_building_error(self, use_case, organization_repo, building_repo):
+        """Тест ошибки БД в запросе зданий"""
+        organization_repo.list_by_radius = AsyncMock(return_value=[])
+        building_repo.list_by_radius = AsyncMock(side_effect=DatabaseError("Database connection error"))
+        
+        with pytest.raises(UseCaseExecutionError):
+            await use_case.search_by_radius(55.75, 37.61, 1000, include_buildings=True)
+    
+    @pytest.mark.asyncio
+    async def test_search_nearest(self, use_case, organization_repo, sample_organization_entities):
+        """Тест поиска ближайших организаций"""
+        organization_repo.list_nearest = AsyncMock(return_value=sample_organization_entities)
+        
+        result = await use_case.search_nearest(55.75, 37.61, 3, activity_name="Еда")
+        
+        assert result == sample_organization_entities
+        organization_repo.list_nearest.assert_called_once_with(55.75, 37.61, 3, activity_name="Еда")
+    
+    @pytest.mark.asyncio
+    async def test_search_clusters(self, use_case, organization_repo):
+        """Тест кластеризации с размером ячейки по масштабу карты"""
+        clusters = [ClusterEntity(latitude=55.5, longitude=37.5, count=12)]
+        organization_repo.list_clusters = AsyncMock(return_value=clusters)
+        
+        grid, result = await use_case.search_clusters(55.0, 37.0, 56.0, 38.0, zoom=10)
+        
+        assert result == clusters
+        assert grid == pytest.approx(360 / 2 ** 10 / 4)
+        organization_repo.list_clusters.assert_called_once_with(55.0, 37.0, 56.0, 38.0, grid)
+
+
+class TestClusterGridSize:
+    """Тесты для cluster_grid_size"""
+    
+    def test_requested_size_kept(self):
+        """Тест: запрошенный размер ячейки сохраняется, если ячеек немного"""
+        assert cluster_grid_size((0.0, 0.0, 1.0, 1.0), 2500, 4, grid_size=0.1) == 0.1
+    
+    def test_wide_area_bounded(self):
+        """Тест: для большой области размер ячейки растет, количество ячеек ограничено"""
+        size = cluster_grid_size((-80.0, -170.0, 80.0, 170.0), 100, 4, grid_size=0.001, zoom=18)
+        
+        assert (160 // size + 2) * (340 // size + 2) <= 100
+
+    def test_too_small_limit_clamped(self):
+        """Тест: лимит меньше MIN_CLUSTER_CELLS не зацикливает подбор размера ячейки"""
+        size = cluster_grid_size((0.0, 0.0, 1.0, 1.0), 1, 4, grid_size=0.1)
+        
+        assert (1 // size + 2) * (1 // size + 2) <= MIN_CLUSTER_CELLS
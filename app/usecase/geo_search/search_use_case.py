@@ -1,60 +1,156 @@
-from typing import Tuple, List
+import asyncio
+import math
+from typing import Awaitable, Literal, Tuple, List, Optional
 from app.entity.organization import OrganizationEntity
 from app.entity.building import BuildingEntity
+from app.entity.cluster import ClusterEntity
 from app.usecase.protocols import IOrganizationRepo, IBuildingRepo
+from app.usecase.geo_search.tile_cache import TileCache, clip_and_merge
 from app.exceptions import UseCaseExecutionError, DatabaseError
 
 
+# Сетка из одной ячейки по краям области дает не меньше 2 x 2 ячеек
+MIN_CLUSTER_CELLS = 4
+
+async def _gather(*queries: Awaitable) -> list:
+    """
+    Конкурентное выполнение запросов к репозиториям.
+    При ошибке одного из запросов остальные отменяются до выхода из функции.
+    :param queries: Корутины запросов
+    :return: Результаты в порядке запросов
+    """
+
+    tasks = [asyncio.ensure_future(query) for query in queries]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+def cluster_grid_size(
+    bounds: Tuple[float, float, float, float],
+    max_cells: int,
+    cells_per_tile: int,
+    grid_size: Optional[float] = None,
+    zoom: Optional[int] = None
+) -> float:
+    """
+    Размер ячейки сетки кластеризации в градусах.
+    Запрошенный размер (или размер по масштабу карты) увеличивается так, чтобы
+    область покрывалась не более чем max_cells ячейками - это ограничивает размер ответа.
+    :param bounds: (min_latitude, min_longitude, max_latitude, max_longitude)
+    :param max_cells: Максимальное количество ячеек, не меньше MIN_CLUSTER_CELLS
+    :param cells_per_tile: Количество ячеек на сторону тайла карты при расчете по zoom
+    :param grid_size: Запрошенный размер ячейки в градусах
+    :param zoom: Масштаб карты (тайл на масштабе z - 360 / 2^z градусов)
+    :return: Размер ячейки
+    """
+
+    max_cells = max(max_cells, MIN_CLUSTER_CELLS)
+    height = max(bounds[2] - bounds[0], 0.0)
+    width = max(bounds[3] - bounds[1], 0.0)
+    
+    size = grid_size or 0.0
+    if zoom is not None:
+        size = max(size, 360.0 / 2 ** zoom / cells_per_tile)
+    size = max(size, math.sqrt(height * width / max_cells), 1e-6)
+    
+    # Ячейки ST_SnapToGrid центрированы на узлах сетки, по краям добавляется по ячейке
+    while (math.floor(height / size) + 2) * (math.floor(width / size) + 2) > max_cells:
+        size *= 1.1
+    return size
+
+
 class GeoSearchUseCase:
     """
-    UseCase для поиска организаций и зданий
+    UseCase для поиска организаций и зданий.
+    Здания ищутся только по запросу (include_buildings).
     """
     
     def __init__(
         self,
         organization_repo: IOrganizationRepo,
-        building_repo: IBuildingRepo
+        building_repo: IBuildingRepo,
+        tile_cache: Optional[TileCache] = None,
+        *,
+        cluster_max_cells: int,
+        cluster_cells_per_tile: int
     ):
+        """
+        :param organization_repo: Репозиторий организаций
+        :param building_repo: Репозиторий зданий
+        :param tile_cache: Кеш ячеек сетки для поиска в прямоугольной области
+        :param cluster_max_cells: Максимальное количество кластеров в ответе (CLUSTER_MAX_CELLS)
+        :param cluster_cells_per_tile: Количество ячеек кластеризации на сторону тайла карты (CLUSTER_CELLS_PER_TILE)
+        """
+
         self._organization_repo = organization_repo
         self._building_repo = building_repo
+        self._tile_cache = tile_cache
+        self._cluster_max_cells = cluster_max_cells
+        self._cluster_cells_per_tile = cluster_cells_per_tile
+    
+    def streaming(self) -> "GeoSearchUseCase":
+        """
+        UseCase поверх потокового репозитория организаций: поиск организаций
+        возвращает поток (EntityStream). Кеш ячеек не используется - он
+        загружает все ID области в память.
+        """
+
+        return GeoSearchUseCase(
+            self._organization_repo.streaming(),
+            self._building_repo,
+            cluster_max_cells=self._cluster_max_cells,
+            cluster_cells_per_tile=self._cluster_cells_per_tile
+        )
     
     async def search_by_radius(
         self,
         latitude: float,
         longitude: float,
-        radius_meters: float
+        radius_meters: float,
+        include_buildings: bool = False,
+        order: Literal["id", "distance"] = "id",
+        limit: Optional[int] = None,
+        after: Optional[Tuple] = None
     ) -> Tuple[List[OrganizationEntity], List[BuildingEntity]]:
         """
         Поиск организаций и зданий в заданном радиусе от точки
         :param latitude:  Широта центральной точки
         :param longitude: Долгота центральной точки
         :param radius_meters: Радиус поиска в метрах
-        :return: tuple - список организаций, список зданий
+        :param include_buildings: Искать также здания. Запросы организаций и зданий
+            выполняются конкурентно, поэтому репозитории должны работать на разных сессиях.
+        :param order: Порядок организаций: id или distance (с заполнением distance_meters)
+        :param limit: Размер страницы организаций
+        :param after: Ключ курсора организаций (id,) или (distance_order, id)
+        :return: tuple - список организаций, список зданий (пустой без include_buildings)
         """
 
-        try:
-            org_entities = await self._organization_repo.list_by_radius(
+        queries = [
+            self._organization_repo.list_by_radius(
                 latitude,
                 longitude,
-                radius_meters
+                radius_meters,
+                order=order,
+                limit=limit,
+                after=after
             )
-        except DatabaseError as e:
-            raise UseCaseExecutionError(
-                "Error searching organizations by radius (lat=%f, lon=%f, radius=%f m): %s"
-                %(
+        ]
+        if include_buildings:
+            queries.append(
+                self._building_repo.list_by_radius(
                     latitude,
                     longitude,
-                    radius_meters,
-                    e
+                    radius_meters
                 )
             )
         
         try:
-            building_entities = await self._building_repo.list_by_radius(
-                latitude,
-                longitude,
-                radius_meters
-            )
+            org_entities, *building_entities = await _gather(*queries)
         except DatabaseError as e:
             raise UseCaseExecutionError(
                 "Error searching organizations by radius (lat=%f, lon=%f, radius=%f m): %s"
@@ -66,14 +162,17 @@ class GeoSearchUseCase:
                 )
             )
         
-        return org_entities, building_entities
+        return org_entities, building_entities[0] if building_entities else []
     
     async def search_by_rectangle(
         self,
         min_latitude: float,
         min_longitude: float,
         max_latitude: float,
-        max_longitude: float
+        max_longitude: float,
+        include_buildings: bool = False,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[str]] = None
     ) -> Tuple[List[OrganizationEntity], List[BuildingEntity]]:
         """
         Поиск организаций и зданий в прямоугольной области
@@ -81,16 +180,31 @@ class GeoSearchUseCase:
         :param min_longitude: min долгота
         :param max_latitude: max широта
         :param max_longitude: max долгота
-        :return: tuple организаций, tuple зданий
+        :param include_buildings: Искать также здания (конкурентно с организациями)
+        :param limit: Размер страницы организаций
+        :param after: Ключ курсора организаций (id,)
+        :return: tuple организаций, tuple зданий (пустой без include_buildings)
         """
 
-        try:
-            org_entities = await self._organization_repo.list_by_rectangle(
-                min_latitude,
-                min_longitude,
-                max_latitude,
-                max_longitude
+        queries = [
+            self._list_by_rectangle(
+                (min_latitude, min_longitude, max_latitude, max_longitude),
+                limit=limit,
+                after=after
+            )
+        ]
+        if include_buildings:
+            queries.append(
+                self._building_repo.list_by_rectangle(
+                    min_latitude,
+                    min_longitude,
+                    max_latitude,
+                    max_longitude
+                )
             )
+        
+        try:
+            org_entities, *building_entities = await _gather(*queries)
         except DatabaseError as e:
             raise UseCaseExecutionError(
                 "Error searching organizations by rectangle (min_lat=%f, min_lon=%f, max_lat=%f, max_lon=%f): %s"
@@ -103,25 +217,130 @@ class GeoSearchUseCase:
                 )
             )
 
+        return org_entities, building_entities[0] if building_entities else []
+    
+    async def search_nearest(
+        self,
+        latitude: float,
+        longitude: float,
+        k: int,
+        activity_name: Optional[str] = None
+    ) -> List[OrganizationEntity]:
+        """
+        Поиск k ближайших к точке организаций
+        :param latitude: Широта точки
+        :param longitude: Долгота точки
+        :param k: Количество организаций
+        :param activity_name: Точное название вида деятельности для фильтрации
+        :return: Список организаций по возрастанию расстояния
+        """
+
+        try:
+            return await self._organization_repo.list_nearest(
+                latitude,
+                longitude,
+                k,
+                activity_name=activity_name
+            )
+        except DatabaseError as e:
+            raise UseCaseExecutionError(
+                "Error searching nearest organizations (lat=%f, lon=%f, k=%d): %s"
+                %(
+                    latitude,
+                    longitude,
+                    k,
+                    e
+                )
+            )
+        
+
+    async def search_clusters(
+        self,
+        min_latitude: float,
+        min_longitude: float,
+        max_latitude: float,
+        max_longitude: float,
+        grid_size: Optional[float] = None,
+        zoom: Optional[int] = None
+    ) -> Tuple[float, List[ClusterEntity]]:
+        """
+        Кластеры организаций в прямоугольной области
+        :param min_latitude: Минимальная широта
+        :param min_longitude: Минимальная долгота
+        :param max_latitude: Максимальная широта
+        :param max_longitude: Максимальная долгота
+        :param grid_size: Размер ячейки в градусах
+        :param zoom: Масштаб карты, по которому выбирается размер ячейки
+        :return: tuple - фактический размер ячейки, список кластеров
+        """
+
+        grid = cluster_grid_size(
+            (min_latitude, min_longitude, max_latitude, max_longitude),
+            self._cluster_max_cells,
+            self._cluster_cells_per_tile,
+            grid_size=grid_size,
+            zoom=zoom
+        )
         
         try:
-            building_entities = await self._building_repo.list_by_rectangle(
+            clusters = await self._organization_repo.list_clusters(
                 min_latitude,
                 min_longitude,
                 max_latitude,
-                max_longitude
+                max_longitude,
+                grid
             )
         except DatabaseError as e:
             raise UseCaseExecutionError(
-                "Error searching organizations by rectangle (min_lat=%f, min_lon=%f, max_lat=%f, max_lon=%f): %s"
+                "Error clustering organizations (min_lat=%f, min_lon=%f, max_lat=%f, max_lon=%f, grid=%f): %s"
                 %(
                     min_latitude,
                     min_longitude,
                     max_latitude,
                     max_longitude,
+                    grid,
                     e
                 )
             )
         
-        return org_entities, building_entities
+        return grid, clusters
+
+    async def _list_by_rectangle(
+        self,
+        bounds: Tuple[float, float, float, float],
+        limit: Optional[int],
+        after: Optional[Tuple[str]]
+    ) -> List[OrganizationEntity]:
+        """
+        Организации в прямоугольной области через кеш ячеек сетки.
+        Из БД загружаются только ячейки, которых нет в кеше (одним запросом по их
+        общей области), затем точки всех ячеек обрезаются по области, и по ID страницы
+        загружаются сами организации.
+        :param bounds: (min_latitude, min_longitude, max_latitude, max_longitude)
+        :param limit: Размер страницы
+        :param after: Ключ курсора (id,)
+        :return: Список организаций по возрастанию id
+        """
 
+        cache = self._tile_cache
+        
+        # Количество ячеек считается до перечисления ключей: для крупной области
+        # список ключей занял бы память и время, пропорциональные ее площади
+        if cache is None or cache.count_tiles(bounds) > cache.max_tiles_per_query:
+            return await self._organization_repo.list_by_rectangle(*bounds, limit=limit, after=after)
+        
+        tiles = {}
+        missing = []
+        for key in cache.tiles_for(bounds):
+            points = cache.get(key)
+            if points is None:
+                missing.append(key)
+            else:
+                tiles[key] = points
+        
+        if missing:
+            points = await self._organization_repo.list_points_by_rectangle(*cache.bounds_of(missing))
+            tiles.update(cache.fill(missing, points))
+        
+        organization_ids = clip_and_merge(tiles.values(), bounds, limit=limit, after=after)
+        return await self._organization_repo.list_by_ids(organization_ids)
@@ -0,0 +1,206 @@
+import math
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+
+# Ключ ячейки сетки - (номер по широте, номер по долготе)
+TileKey = Tuple[int, int]
+
+# Точка организации в ячейке - (id организации, широта, долгота здания)
+TilePoint = Tuple[str, float, float]
+
+Bounds = Tuple[float, float, float, float]
+
+
+class TileCache:
+    """
+    LRU кеш результатов поиска в прямоугольной области по ячейкам фиксированной сетки.
+    Для каждой ячейки хранится список точек организаций, попавших в нее.
+    Запись ячейки живет ttl_seconds, при переполнении вытесняется давно не использованная.
+    """
+
+    def __init__(
+        self,
+        tile_size: float,
+        max_tiles: int,
+        ttl_seconds: float,
+        max_tiles_per_query: int,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        :param tile_size: Размер ячейки в градусах
+        :param max_tiles: Максимальное количество ячеек в кеше
+        :param ttl_seconds: Время жизни ячейки в секундах
+        :param max_tiles_per_query: Максимальное количество ячеек в одном запросе,
+            более крупные области ищутся без кеша
+        :param clock: Источник времени
+        """
+
+        self.tile_size = tile_size
+        self.max_tiles = max_tiles
+        self.ttl_seconds = ttl_seconds
+        self.max_tiles_per_query = max_tiles_per_query
+        self._clock = clock
+        self._tiles: "OrderedDict[TileKey, Tuple[float, List[TilePoint]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    def tile_of(self, latitude: float, longitude: float) -> TileKey:
+        """
+        Ячейка, в которую попадает точка
+        :param latitude: Широта
+        :param longitude: Долгота
+        :return: Ключ ячейки
+        """
+
+        return math.floor(latitude / self.tile_size), math.floor(longitude / self.tile_size)
+    
+    def count_tiles(self, bounds: Bounds) -> int:
+        """
+        Количество ячеек, покрывающих прямоугольную область, без перечисления ключей
+        :param bounds: (min_latitude, min_longitude, max_latitude, max_longitude)
+        :return: Количество ячеек
+        """
+
+        min_lat_tile, min_lon_tile = self.tile_of(bounds[0], bounds[1])
+        max_lat_tile, max_lon_tile = self.tile_of(bounds[2], bounds[3])
+        
+        return (max_lat_tile - min_lat_tile + 1) * (max_lon_tile - min_lon_tile + 1)
+    
+    def tiles_for(self, bounds: Bounds) -> List[TileKey]:
+        """
+        Ячейки, покрывающие прямоугольную область
+        :param bounds: (min_latitude, min_longitude, max_latitude, max_longitude)
+        :return: Список ключей ячеек
+        """
+
+        min_lat_tile, min_lon_tile = self.tile_of(bounds[0], bounds[1])
+        max_lat_tile, max_lon_tile = self.tile_of(bounds[2], bounds[3])
+        
+        return [
+            (lat_tile, lon_tile)
+            for lat_tile in range(min_lat_tile, max_lat_tile + 1)
+            for lon_tile in range(min_lon_tile, max_lon_tile + 1)
+        ]
+    
+    def bounds_of(self, keys: Iterable[TileKey]) -> Bounds:
+        """
+        Прямоугольник, покрывающий ячейки, с небольшим запасом на погрешность
+        округления на границах ячеек
+        :param keys: Ключи ячеек
+        :return: (min_latitude, min_longitude, max_latitude, max_longitude)
+        """
+
+        keys = list(keys)
+        margin = self.tile_size * 1e-6
+        
+        return (
+            min(lat_tile for lat_tile, _ in keys) * self.tile_size - margin,
+            min(lon_tile for _, lon_tile in keys) * self.tile_size - margin,
+            (max(lat_tile for lat_tile, _ in keys) + 1) * self.tile_size + margin,
+            (max(lon_tile for _, lon_tile in keys) + 1) * self.tile_size + margin,
+        )
+    
+    def get(self, key: TileKey) -> Optional[List[TilePoint]]:
+        """
+        Точки ячейки из кеша
+        :param key: Ключ ячейки
+        :return: Список точек или None, если ячейки нет или она устарела
+        """
+
+        entry = self._tiles.get(key)
+        if entry is None or entry[0] <= self._clock():
+            if entry is not None:
+                del self._tiles[key]
+                self.expirations += 1
+            self.misses += 1
+            return None
+        
+        self._tiles.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+    
+    def put(self, key: TileKey, points: List[TilePoint]) -> None:
+        """
+        Сохранить точки ячейки
+        :param key: Ключ ячейки
+        :param points: Список точек
+        """
+
+        self._tiles[key] = (self._clock() + self.ttl_seconds, points)
+        self._tiles.move_to_end(key)
+        
+        while len(self._tiles) > self.max_tiles:
+            self._tiles.popitem(last=False)
+            self.evictions += 1
+    
+    def fill(self, keys: Iterable[TileKey], points: Iterable[TilePoint]) -> Dict[TileKey, List[TilePoint]]:
+        """
+        Разложить точки, найденные в области нескольких ячеек, по ячейкам и сохранить.
+        Точки ячеек, не входящих в keys, отбрасываются.
+        :param keys: Ключи загружаемых ячеек
+        :param points: Точки из области bounds_of(keys)
+        :return: Точки по ячейкам
+        """
+
+        tiles = {key: [] for key in keys}
+        for point in points:
+            tile = tiles.get(self.tile_of(point[1], point[2]))
+            if tile is not None:
+                tile.append(point)
+        
+        for key, tile_points in tiles.items():
+            self.put(key, tile_points)
+        return tiles
+    
+    def stats(self) -> dict:
+        """
+        Счетчики кеша с момента старта процесса
+        :return: Словарь по схеме TileCacheStatsResponse
+        """
+
+        return {
+            "tiles": len(self._tiles),
+            "max_tiles": self.max_tiles,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+    
+    def __len__(self) -> int:
+        return len(self._tiles)
+
+
+def clip_and_merge(
+    tiles: Iterable[List[TilePoint]],
+    bounds: Bounds,
+    limit: Optional[int] = None,
+    after: Optional[Tuple[str]] = None
+) -> List[str]:
+    """
+    ID организаций из ячеек, строго внутри области (как ST_Within), по возрастанию id
+    :param tiles: Точки ячеек
+    :param bounds: (min_latitude, min_longitude, max_latitude, max_longitude)
+    :param limit: Размер страницы
+    :param after: Ключ курсора (id,)
+    :return: Список ID организаций
+    """
+
+    min_latitude, min_longitude, max_latitude, max_longitude = bounds
+    
+    organization_ids = sorted({
+        organization_id
+        for points in tiles
+        for organization_id, latitude, longitude in points
+        if min_latitude < latitude < max_latitude
+        and min_longitude < longitude < max_longitude
+        and (after is None or organization_id > after[0])
+    })
+    
+    if limit is not None:
+        return organization_ids[:limit]
+    return organization_ids
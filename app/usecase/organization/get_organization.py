@@ -1,16 +1,47 @@
-from typing import List, Optional
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
 from app.entity.organization import OrganizationEntity
-from app.usecase.protocols import IOrganizationRepo
+from app.usecase.protocols import IOrganizationRepo, IResultCache
 from app.exceptions import NotFoundError, UseCaseExecutionError, DatabaseError
 
 
 class GetOrganizationUseCase:
     """
-    UseCase для получения организаций
+    UseCase для получения организаций.
+    Списочные методы принимают limit (размер страницы) и after (ключ курсора).
+    NotFoundError выбрасывается только для пустой первой страницы.
+    Результаты поиска по ID, зданию и виду деятельности берутся из кеша, если он задан.
     """
     
-    def __init__(self, organization_repo: IOrganizationRepo):
+    def __init__(self, organization_repo: IOrganizationRepo, result_cache: Optional[IResultCache] = None):
+        """
+        :param organization_repo: Репозиторий организаций
+        :param result_cache: Кеш результатов репозитория. Значения общие для всех запросов
+            процесса, поэтому Entity неизменяемые, а списки не должны изменяться после получения.
+        """
+
         self._organization_repo = organization_repo
+        self._result_cache = result_cache
+    
+    def streaming(self) -> "GetOrganizationUseCase":
+        """
+        UseCase поверх потокового репозитория: списочные методы возвращают
+        поток организаций (EntityStream), который нужно дочитать или закрыть.
+        Потоки не кешируются.
+        """
+
+        return GetOrganizationUseCase(self._organization_repo.streaming())
+    
+    async def _cached(self, key: Hashable, load: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Результат load() через кеш результатов, без кеша - напрямую
+        :param key: Ключ: название метода и все его аргументы
+        :param load: Запрос к репозиторию
+        :return: Результат запроса
+        """
+
+        if self._result_cache is None:
+            return await load()
+        return await self._result_cache.get_or_load(key, load)
     
     async def get_by_id(self, org_id: str) -> OrganizationEntity:
         """
@@ -20,7 +51,10 @@ class GetOrganizationUseCase:
         """
 
         try:
-            entity = await self._organization_repo.get_org_by_id(org_id)
+            entity = await self._cached(
+                ("get_by_id", org_id),
+                lambda: self._organization_repo.get_org_by_id(org_id)
+            )
         except DatabaseError as e:
             raise UseCaseExecutionError("Error getting organization by id %s: %s" % (org_id, e))
         
@@ -28,67 +62,144 @@ class GetOrganizationUseCase:
             raise NotFoundError("Organization with id %s not found" % org_id)
         return entity
     
-    async def get_by_name(self, organization_name: str) -> List[OrganizationEntity]:
+    async def get_by_ids(self, org_ids: List[str]) -> Tuple[Dict[str, OrganizationEntity], List[str]]:
+        """
+        Получить организации по списку ID одним запросом к репозиторию.
+        Отсутствующие ID возвращаются списком, NotFoundError не выбрасывается.
+        :param org_ids: ID организаций, повторы не учитываются
+        :return: (организации по ID в порядке запроса, ID, для которых организаций нет)
+        """
+
+        unique_ids = list(dict.fromkeys(org_ids))
+        try:
+            entities = await self._organization_repo.list_by_ids(unique_ids)
+        except DatabaseError as e:
+            raise UseCaseExecutionError("Error getting organizations by %d ids: %s" % (len(unique_ids), e))
+        
+        found = {entity.id: entity for entity in entities}
+        organizations = {org_id: found[org_id] for org_id in unique_ids if org_id in found}
+        missing = [org_id for org_id in unique_ids if org_id not in found]
+        return organizations, missing
+    
+    async def get_by_name(
+        self,
+        organization_name: str,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[float, str]] = None
+    ) -> List[OrganizationEntity]:
         """
         Получить организации по частичному совпадению названия
         :param organization_name: Часть названия организации для поиска
-        :return: Список OrganizationEntity
+        :param limit: Максимальное количество результатов
+        :param after: Ключ курсора (search_rank, id)
+        :return: Список OrganizationEntity, отсортированный по похожести названия
         """
 
         try:
-            entities = await self._organization_repo.get_org_by_name(organization_name)
+            entities = await self._organization_repo.get_org_by_name(
+                organization_name,
+                limit=limit,
+                after=after
+            )
         except DatabaseError as e:
             raise UseCaseExecutionError("Error getting organizations by name %s: %s" % (organization_name, e))
         
-        if not entities:
+        if not entities and after is None:
             raise NotFoundError("Organizations with name containing %s not found" % organization_name)
         return entities
     
-    async def list_by_building(self, building_id: str) -> List[OrganizationEntity]:
+    async def list_by_building(
+        self,
+        building_id: str,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[str]] = None
+    ) -> List[OrganizationEntity]:
         """
         Получить все организации по building_id
         :param building_id: ID здания
+        :param limit: Размер страницы
+        :param after: Ключ курсора (id,)
         :return: Список организаций
         """
 
         try:
-            entities = await self._organization_repo.list_by_building(building_id)
+            entities = await self._cached(
+                ("list_by_building", building_id, limit, after),
+                lambda: self._organization_repo.list_by_building(
+                    building_id,
+                    limit=limit,
+                    after=after
+                )
+            )
         except DatabaseError as e:
             raise UseCaseExecutionError("Error getting organizations by building %s: %s" % (building_id, e))
         
-        if not entities:
+        if not entities and after is None:
             raise NotFoundError("Organizations for building %s not found" % building_id)
         return entities
     
-    async def list_by_activity_exact(self, activity_name: str) -> List[OrganizationEntity]:
+    async def list_by_activity_exact(
+        self,
+        activity_name: str,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[str]] = None
+    ) -> List[OrganizationEntity]:
         """
         Получить организации по точному названию вида деятельности
         :param activity_name: Название вида деятельности
+        :param limit: Размер страницы
+        :param after: Ключ курсора (id,)
         :return: Список организаций
         """
 
         try:
-            entities = await self._organization_repo.list_by_activity_exact(activity_name)
+            entities = await self._cached(
+                ("list_by_activity_exact", activity_name, limit, after),
+                lambda: self._organization_repo.list_by_activity_exact(
+                    activity_name,
+                    limit=limit,
+                    after=after
+                )
+            )
         except DatabaseError as e:
             raise UseCaseExecutionError("Error getting organizations by activity %s: %s" % (activity_name, e))
         
-        if not entities:
+        if not entities and after is None:
             raise NotFoundError("Organizations for activity %s not found" % activity_name)
         return entities
     
-    async def list_by_activity_tree(self, activity_name: str) -> List[OrganizationEntity]:
+    async def list_by_activity_tree(
+        self,
+        activity_name: str,
+        up_depth: Optional[int] = None,
+        down_depth: Optional[int] = None,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[str]] = None
+    ) -> List[OrganizationEntity]:
         """
         Получить организации по виду деятельности с учетом иерархии
         :param activity_name: Название вида деятельности
+        :param up_depth: Глубина поиска родительских видов (None - по умолчанию репозитория)
+        :param down_depth: Глубина поиска дочерних видов (None - по умолчанию репозитория)
+        :param limit: Размер страницы
+        :param after: Ключ курсора (id,)
         :return: Список организаций
         """
 
         try:
-            entities = await self._organization_repo.list_by_activity_hierarchy(activity_name)
+            entities = await self._cached(
+                ("list_by_activity_tree", activity_name, up_depth, down_depth, limit, after),
+                lambda: self._organization_repo.list_by_activity_hierarchy(
+                    activity_name,
+                    up_depth=up_depth,
+                    down_depth=down_depth,
+                    limit=limit,
+                    after=after
+                )
+            )
         except DatabaseError as e:
             raise UseCaseExecutionError("Error getting organizations by activity tree %s: %s" % (activity_name, e))
         
-        if not entities:
+        if not entities and after is None:
             raise NotFoundError("Organizations for activity %s not found" % activity_name)
         return entities
-
@@ -0,0 +1,246 @@
+import asyncio
+import math
+import random
+import sys
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+from app.usecase.protocols import IResultCache
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Оценка памяти значения в байтах: sys.getsizeof по всему графу объектов
+    (списки, кортежи, словари, dataclass со slots), общие объекты считаются один раз
+    :param value: Значение
+    :return: Размер в байтах
+    """
+
+    seen = set()
+    stack = [value]
+    size = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        
+        if isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        elif isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        else:
+            for cls in type(obj).__mro__:
+                for name in getattr(cls, "__slots__", ()):
+                    stack.append(getattr(obj, name, None))
+    return size
+
+
+@dataclass(slots=True)
+class CacheEntry:
+    value: Any
+    size: int
+    expires_at: float
+    # Время загрузки значения в секундах, по нему оценивается выгода раннего обновления
+    delta: float
+
+
+class _LoadCancelled(Exception):
+    """Загрузка отменена вместе с запросом, ожидавшие запросы повторяют попытку"""
+    pass
+
+
+class ResultCache:
+    """
+    LRU кеш результатов запросов с TTL и ограничением по суммарному размеру значений.
+    Повторные загрузки одного ключа объединяются (single flight): пока значение грузится,
+    остальные запросы ждут ту же загрузку.
+    За некоторое время до истечения TTL значение с вероятностью, растущей к концу срока,
+    обновляется заранее (probabilistic early expiration, XFetch): обновляет один запрос,
+    остальные в это время получают текущее значение, поэтому истечение популярного ключа
+    не приводит к волне одинаковых запросов к БД.
+    Промахи могут сначала проверять следующий уровень кеша (next_tier), общий для процессов.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        ttl_seconds: float,
+        early_refresh_beta: float = 1.0,
+        max_entry_bytes: Optional[int] = None,
+        sizeof: Callable[[Any], int] = estimate_size,
+        clock: Callable[[], float] = time.monotonic,
+        rand: Callable[[], float] = random.random,
+        next_tier: Optional[IResultCache] = None
+    ):
+        """
+        :param max_bytes: Максимальный суммарный размер значений в байтах
+        :param ttl_seconds: Время жизни значения в секундах
+        :param early_refresh_beta: Коэффициент раннего обновления XFetch, 0 - без раннего обновления,
+            больше 1 - обновление раньше
+        :param max_entry_bytes: Максимальный размер одного значения, более крупные не кешируются.
+            По умолчанию max_bytes / 8
+        :param sizeof: Оценка размера значения в байтах
+        :param clock: Источник времени
+        :param rand: Источник случайных чисел из [0, 1)
+        :param next_tier: Кеш, через который загружаются промахи, например SharedResultCache.
+            Значение из него снова живет ttl_seconds, поэтому возраст значения ограничен
+            суммой TTL уровней
+        """
+
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.early_refresh_beta = early_refresh_beta
+        self.max_entry_bytes = max_entry_bytes if max_entry_bytes is not None else max_bytes // 8
+        self._sizeof = sizeof
+        self._clock = clock
+        self._rand = rand
+        self._next_tier = next_tier
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._loading: Dict[Hashable, asyncio.Future] = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        # Промахи, дождавшиеся уже идущей загрузки того же ключа
+        self.coalesced = 0
+        self.early_refreshes = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.oversized = 0
+    
+    async def get_or_load(self, key: Hashable, load: Callable[[], Awaitable[Any]], *, refresh: bool = False) -> Any:
+        """
+        Значение из кеша или результат load(), сохраненный в кеш.
+        Исключения load() передаются всем ожидавшим запросам и не кешируются.
+        :param key: Ключ
+        :param load: Загрузка значения
+        :param refresh: Не брать значение из кеша, а загрузить заново (в том числе мимо next_tier)
+        :return: Значение
+        """
+
+        while True:
+            entry = None if refresh else self._lookup(key)
+            pending = self._loading.get(key)
+            
+            if refresh and pending is None:
+                return await self._load(key, load, refresh=True)
+            if entry is not None:
+                if pending is not None or not self._should_refresh_early(entry):
+                    self.hits += 1
+                    return entry.value
+                self.early_refreshes += 1
+                # Раннее обновление идет в БД: следующий уровень вернул бы то же значение
+                return await self._load(key, load, refresh=True)
+            elif pending is not None:
+                self.coalesced += 1
+                try:
+                    return await asyncio.shield(pending)
+                except _LoadCancelled:
+                    continue
+            else:
+                self.misses += 1
+            
+            return await self._load(key, load)
+    
+    def _lookup(self, key: Hashable) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        
+        if entry.expires_at <= self._clock():
+            self._remove(key)
+            self.expirations += 1
+            return None
+        
+        self._entries.move_to_end(key)
+        return entry
+    
+    def _should_refresh_early(self, entry: CacheEntry) -> bool:
+        """
+        XFetch: обновить, если now - delta * beta * ln(rand) >= expires_at.
+        Чем дольше загрузка и ближе истечение, тем выше вероятность
+        """
+
+        if self.early_refresh_beta <= 0:
+            return False
+        
+        gap = -entry.delta * self.early_refresh_beta * math.log(1.0 - self._rand())
+        return self._clock() + gap >= entry.expires_at
+    
+    async def _load(self, key: Hashable, load: Callable[[], Awaitable[Any]], refresh: bool = False) -> Any:
+        future = asyncio.get_running_loop().create_future()
+        # Исключение загрузки без ожидавших запросов не должно логироваться asyncio
+        future.add_done_callback(lambda done: done.cancelled() or done.exception())
+        self._loading[key] = future
+        
+        started = self._clock()
+        try:
+            if self._next_tier is None:
+                value = await load()
+            else:
+                value = await self._next_tier.get_or_load(key, load, refresh=refresh)
+        except asyncio.CancelledError:
+            future.set_exception(_LoadCancelled())
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            del self._loading[key]
+        
+        self._store(key, value, self._clock() - started)
+        future.set_result(value)
+        return value
+    
+    def _store(self, key: Hashable, value: Any, delta: float) -> None:
+        size = self._sizeof(value)
+        if key in self._entries:
+            self._remove(key)
+        
+        if size > self.max_entry_bytes:
+            self.oversized += 1
+            return
+        
+        self._entries[key] = CacheEntry(value, size, self._clock() + self.ttl_seconds, delta)
+        self.bytes += size
+        
+        while self.bytes > self.max_bytes:
+            evicted_key = next(iter(self._entries))
+            self._remove(evicted_key)
+            self.evictions += 1
+    
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        self.bytes -= entry.size
+    
+    def clear(self) -> None:
+        self._entries.clear()
+        self.bytes = 0
+    
+    def stats(self) -> dict:
+        """
+        Счетчики кеша с момента старта процесса
+        :return: Словарь по схеме ResultCacheStatsResponse
+        """
+
+        requests = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / requests if requests else 0.0,
+            "coalesced": self.coalesced,
+            "early_refreshes": self.early_refreshes,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "oversized": self.oversized,
+            "loading": len(self._loading),
+        }
+    
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,344 @@
+import fcntl
+import hashlib
+import mmap
+import os
+import pickle
+import struct
+import time
+import zlib
+from dataclasses import fields
+from typing import Any, Awaitable, Callable, Hashable, Iterator, Optional
+from app.entity.activity import ActivityEntity
+from app.entity.building import BuildingEntity
+from app.entity.organization import OrganizationEntity, OrganizationPhoneEntity
+from app.logger import logger
+
+
+MAGIC = b"ORGSHM01"
+# magic, количество слотов индекса, версия структуры значений, размер области данных, позиция записи
+HEADER = struct.Struct("<8sIIQQ")
+HEADER_SIZE = 64
+CURSOR = struct.Struct("<Q")
+CURSOR_OFFSET = 24
+# seq, digest ключа, время истечения (time.time), позиция данных, длина, crc32 данных
+SLOT = struct.Struct("<Q16sdQII")
+SEQ = struct.Struct("<Q")
+# Количество соседних слотов, в которых может лежать ключ
+PROBES = 4
+# Попытки прочитать слот, который сейчас перезаписывается
+READ_ATTEMPTS = 3
+
+
+def layout_version(*classes: type) -> int:
+    """
+    Версия структуры значений, которые сохраняются pickle: crc32 от имен классов, их полей и типов.
+    Меняется вместе с полями Entity, поэтому сегмент, переживший деплой, не читается новым кодом.
+    :param classes: Dataclass классы значений
+    :return: Версия
+    """
+
+    layout = [
+        (cls.__module__, cls.__qualname__, [(field.name, str(field.type)) for field in fields(cls)])
+        for cls in classes
+    ]
+    return zlib.crc32(repr(layout).encode())
+
+
+ENTITY_LAYOUT_VERSION = layout_version(OrganizationEntity, OrganizationPhoneEntity, BuildingEntity, ActivityEntity)
+
+
+def key_digest(key: Hashable) -> bytes:
+    """
+    Ключ кеша, одинаковый во всех процессах (hash() в каждом процессе свой)
+    :param key: Ключ из строк, чисел, None и кортежей
+    :return: 16 байт blake2b от repr(key)
+    """
+
+    return hashlib.blake2b(repr(key).encode(), digest_size=16).digest()
+
+
+class SharedMemorySegment:
+    """
+    Общий для процессов одного хоста сегмент памяти (mmap файла, обычно в /dev/shm)
+    с индексом слотов и кольцевой областью данных.
+    Чтение без блокировок по протоколу seqlock: писатель делает seq слота нечетным на время
+    записи, читатель копирует слот и данные и проверяет, что seq не изменился и четный.
+    Данные пишутся в кольцо по возрастающей позиции: позиция записи публикуется до записи
+    байтов, поэтому читатель по ней определяет, что данные уже перезаписаны.
+    Дополнительно данные проверяются crc32. Писатели сериализуются flock на файле без ожидания:
+    если сегмент пишет другой процесс, запись пропускается, чтобы не блокировать event loop.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        arena_bytes: int,
+        slots: int,
+        clock: Callable[[], float] = time.time,
+        version: int = ENTITY_LAYOUT_VERSION
+    ):
+        """
+        :param path: Путь к файлу сегмента
+        :param arena_bytes: Размер области данных в байтах
+        :param slots: Количество слотов индекса
+        :param clock: Источник времени, общий для процессов
+        :param version: Версия структуры значений (layout_version), сегмент другой версии очищается
+        """
+
+        self.path = path
+        self.arena_bytes = arena_bytes
+        self.slots = slots
+        self.version = version
+        self.max_entry_bytes = arena_bytes // 8
+        self._data_offset = HEADER_SIZE + slots * SLOT.size
+        self._clock = clock
+        self._pid: Optional[int] = None
+        self._fd: Optional[int] = None
+        self._mmap: Optional[mmap.mmap] = None
+        # Чтения слота во время его записи и данных во время их перезаписи
+        self.torn_reads = 0
+        # Данные слота уже перезаписаны более новыми значениями
+        self.overwritten = 0
+        # Записи, пропущенные из-за того, что сегмент писал другой процесс
+        self.write_conflicts = 0
+    
+    def _map(self) -> mmap.mmap:
+        """
+        Отображение сегмента в память, открывается в каждом процессе отдельно:
+        после fork дескриптор общий с родителем, и flock на нем не разделяет писателей
+        """
+
+        if self._pid != os.getpid():
+            self._open()
+        return self._mmap
+    
+    def _open(self) -> None:
+        self._close()
+        size = self._data_offset + self.arena_bytes
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(fd).st_size != size:
+                    os.ftruncate(fd, size)
+                mapped = mmap.mmap(fd, size)
+                header = HEADER.unpack_from(mapped, 0)[:4]
+                if header != (MAGIC, self.slots, self.version, self.arena_bytes):
+                    mapped[:self._data_offset] = bytes(self._data_offset)
+                    HEADER.pack_into(mapped, 0, MAGIC, self.slots, self.version, self.arena_bytes, 0)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        except BaseException:
+            os.close(fd)
+            raise
+        
+        self._fd, self._mmap, self._pid = fd, mapped, os.getpid()
+    
+    def _close(self) -> None:
+        """
+        Закрытие отображения и дескриптора, в том числе унаследованных от родителя после fork
+        """
+
+        if self._mmap is not None:
+            self._mmap.close()
+        if self._fd is not None:
+            os.close(self._fd)
+        self._fd, self._mmap, self._pid = None, None, None
+    
+    def _probe(self, digest: bytes) -> Iterator[int]:
+        start = int.from_bytes(digest[:8], "little") % self.slots
+        for i in range(PROBES):
+            yield HEADER_SIZE + (start + i) % self.slots * SLOT.size
+    
+    def get(self, digest: bytes) -> Optional[bytes]:
+        """
+        Значение по ключу без блокировок
+        :param digest: Ключ (key_digest)
+        :return: Байты значения или None, если значения нет, оно истекло или перезаписано
+        """
+
+        mapped = self._map()
+        for position in self._probe(digest):
+            for _ in range(READ_ATTEMPTS):
+                seq, slot_digest, expires_at, offset, length, crc = SLOT.unpack_from(mapped, position)
+                if seq & 1:
+                    self.torn_reads += 1
+                    continue
+                if slot_digest != digest:
+                    break
+                if expires_at <= self._clock():
+                    return None
+                
+                start = self._data_offset + offset % self.arena_bytes
+                payload = mapped[start:start + length]
+                cursor = CURSOR.unpack_from(mapped, CURSOR_OFFSET)[0]
+                if SEQ.unpack_from(mapped, position)[0] != seq:
+                    self.torn_reads += 1
+                    continue
+                if cursor > offset + self.arena_bytes:
+                    self.overwritten += 1
+                    return None
+                if zlib.crc32(payload) != crc:
+                    self.torn_reads += 1
+                    continue
+                return payload
+        return None
+    
+    def put(self, digest: bytes, payload: bytes, expires_at: float) -> bool:
+        """
+        Запись значения: данные в кольцо, затем слот индекса с тем же ключом,
+        а если его нет - пустой или раньше всех истекающий из соседних
+        :param digest: Ключ (key_digest)
+        :param payload: Байты значения
+        :param expires_at: Время истечения по clock
+        :return: False, если значение не сохранено: оно больше max_entry_bytes
+            или сегмент сейчас пишет другой процесс
+        """
+
+        length = len(payload)
+        if length > self.max_entry_bytes:
+            return False
+        
+        crc = zlib.crc32(payload)
+        mapped = self._map()
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self.write_conflicts += 1
+            return False
+        try:
+            offset = CURSOR.unpack_from(mapped, CURSOR_OFFSET)[0]
+            tail = self.arena_bytes - offset % self.arena_bytes
+            if length > tail:
+                offset += tail
+            CURSOR.pack_into(mapped, CURSOR_OFFSET, offset + length)
+            start = self._data_offset + offset % self.arena_bytes
+            mapped[start:start + length] = payload
+            
+            position = self._choose_slot(mapped, digest)
+            seq = SEQ.unpack_from(mapped, position)[0] | 1
+            SEQ.pack_into(mapped, position, seq)
+            SLOT.pack_into(mapped, position, seq, digest, expires_at, offset, length, crc)
+            SEQ.pack_into(mapped, position, seq + 1)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        return True
+    
+    def _choose_slot(self, mapped: mmap.mmap, digest: bytes) -> int:
+        candidates = []
+        for position in self._probe(digest):
+            _, slot_digest, expires_at, _, _, _ = SLOT.unpack_from(mapped, position)
+            if slot_digest == digest:
+                return position
+            candidates.append((expires_at, position))
+        return min(candidates)[1]
+    
+    def stats(self) -> dict:
+        return {
+            "path": self.path,
+            "slots": self.slots,
+            "arena_bytes": self.arena_bytes,
+            "version": self.version,
+            "torn_reads": self.torn_reads,
+            "overwritten": self.overwritten,
+            "write_conflicts": self.write_conflicts,
+        }
+
+
+class SharedResultCache:
+    """
+    Второй уровень кеша результатов, общий для воркеров gunicorn одного хоста.
+    Значения сериализуются pickle в SharedMemorySegment и живут ttl_seconds.
+    Сегмент доступен только пользователю сервиса (0600), поэтому pickle.loads читает
+    только данные, записанные воркерами того же сервиса.
+    Если сегмент не открывается (нет /dev/shm), кеш пропускает запросы в load().
+    """
+
+    def __init__(self, segment: SharedMemorySegment, ttl_seconds: float, clock: Callable[[], float] = time.time):
+        """
+        :param segment: Общий сегмент памяти
+        :param ttl_seconds: Время жизни значения в секундах
+        :param clock: Источник времени, общий для процессов
+        """
+
+        self.segment = segment
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._unavailable = False
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        # Загрузки мимо сегмента для раннего обновления значения
+        self.refreshes = 0
+        self.oversized = 0
+        # Ошибки доступа к сегменту и чтения значений
+        self.errors = 0
+    
+    async def get_or_load(self, key: Hashable, load: Callable[[], Awaitable[Any]], *, refresh: bool = False) -> Any:
+        """
+        Значение из общего сегмента или результат load(), записанный в сегмент
+        :param key: Ключ
+        :param load: Загрузка значения
+        :param refresh: Не читать значение из сегмента, а загрузить и перезаписать его
+            (раннее обновление ResultCache)
+        :return: Значение
+        """
+
+        if self._unavailable:
+            return await load()
+        
+        # Версия в ключе: процессы с прежней структурой Entity, еще работающие во время деплоя,
+        # не читают значения новых процессов, и наоборот
+        digest = key_digest((self.segment.version, key))
+        if refresh:
+            self.refreshes += 1
+        else:
+            try:
+                payload = self.segment.get(digest)
+                if payload is not None:
+                    value = pickle.loads(payload)
+                    self.hits += 1
+                    return value
+            except OSError as e:
+                self._disable(e)
+                return await load()
+            except Exception as e:
+                self.errors += 1
+                logger.warning("Shared cache value for %r is unreadable: %s", key, e)
+        
+            self.misses += 1
+        
+        value = await load()
+        try:
+            payload = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            if len(payload) > self.segment.max_entry_bytes:
+                self.oversized += 1
+            elif self.segment.put(digest, payload, self._clock() + self.ttl_seconds):
+                self.stores += 1
+        except OSError as e:
+            self._disable(e)
+        return value
+    
+    def _disable(self, error: OSError) -> None:
+        self.errors += 1
+        self._unavailable = True
+        logger.warning("Shared cache %s is unavailable: %s", self.segment.path, error)
+    
+    def stats(self) -> dict:
+        """
+        Счетчики процесса по общему кешу
+        :return: Словарь по схеме SharedCacheStatsResponse
+        """
+
+        requests = self.hits + self.misses
+        return {
+            **self.segment.stats(),
+            "available": not self._unavailable,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / requests if requests else 0.0,
+            "stores": self.stores,
+            "refreshes": self.refreshes,
+            "oversized": self.oversized,
+            "errors": self.errors,
+        }
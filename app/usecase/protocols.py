@@ -1,38 +1,72 @@
-from typing import Protocol, List, Optional
+from typing import Any, Awaitable, Callable, Hashable, Literal, Protocol, List, Optional, Tuple
 from app.entity.organization import OrganizationEntity
 from app.entity.building import BuildingEntity
+from app.entity.cluster import ClusterEntity
 
 
 class IOrganizationRepo(Protocol):
-    """Протокол для репозитория организаций"""
+    """
+    Протокол для репозитория организаций.
+    Списочные методы поддерживают keyset пагинацию: limit - размер страницы,
+    after - ключ сортировки последней организации предыдущей страницы.
+    """
+
+    def streaming(self) -> "IOrganizationRepo":
+        """Репозиторий, списочные методы которого возвращают поток организаций из серверного курсора"""
+        ...
     
     async def get_org_by_id(self, org_id: str) -> Optional[OrganizationEntity]:
         """Получить организацию по ID"""
         ...
     
-    async def get_org_by_name(self, organization_name: str) -> List[OrganizationEntity]:
-        """Получить организации по частичному совпадению названия"""
+    async def get_org_by_name(
+        self,
+        organization_name: str,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[float, str]] = None
+    ) -> List[OrganizationEntity]:
+        """Получить организации по частичному совпадению названия, ранжированные по похожести"""
         ...
     
-    async def list_by_building(self, building_id: str) -> List[OrganizationEntity]:
+    async def list_by_building(
+        self,
+        building_id: str,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[str]] = None
+    ) -> List[OrganizationEntity]:
         """Получить все организации по building_id"""
         ...
     
-    async def list_by_activity_exact(self, activity_name: str) -> List[OrganizationEntity]:
+    async def list_by_activity_exact(
+        self,
+        activity_name: str,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[str]] = None
+    ) -> List[OrganizationEntity]:
         """Получить организации по точному названию вида деятельности"""
         ...
     
-    async def list_by_activity_hierarchy(self, activity_name: str) -> List[OrganizationEntity]:
-        """Получить организации по виду деятельности с учетом иерархии"""
+    async def list_by_activity_hierarchy(
+        self,
+        activity_name: str,
+        up_depth: Optional[int] = None,
+        down_depth: Optional[int] = None,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[str]] = None
+    ) -> List[OrganizationEntity]:
+        """Получить организации по виду деятельности, его предкам (до up_depth) и потомкам (до down_depth)"""
         ...
     
     async def list_by_radius(
         self,
         latitude: float,
         longitude: float,
-        radius_meters: float
+        radius_meters: float,
+        order: Literal["id", "distance"] = "id",
+        limit: Optional[int] = None,
+        after: Optional[Tuple] = None
     ) -> List[OrganizationEntity]:
-        """Получить организации в радиусе"""
+        """Получить организации в радиусе по ID или по расстоянию (after - (id,) или (distance_order, id))"""
         ...
     
     async def list_by_rectangle(
@@ -40,11 +74,48 @@ class IOrganizationRepo(Protocol):
         min_latitude: float,
         min_longitude: float,
         max_latitude: float,
-        max_longitude: float
+        max_longitude: float,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[str]] = None
     ) -> List[OrganizationEntity]:
         """Получить организации в прямоугольной области"""
         ...
 
+    async def list_points_by_rectangle(
+        self,
+        min_latitude: float,
+        min_longitude: float,
+        max_latitude: float,
+        max_longitude: float
+    ) -> List[Tuple[str, float, float]]:
+        """Получить (id организации, широта, долгота) в прямоугольной области, включая границу"""
+        ...
+    
+    async def list_by_ids(self, org_ids: List[str]) -> List[OrganizationEntity]:
+        """Получить организации по списку ID, по возрастанию id"""
+        ...
+    
+    async def list_nearest(
+        self,
+        latitude: float,
+        longitude: float,
+        k: int,
+        activity_name: Optional[str] = None
+    ) -> List[OrganizationEntity]:
+        """Получить k ближайших к точке организаций с заполненным distance_meters"""
+        ...
+
+    async def list_clusters(
+        self,
+        min_latitude: float,
+        min_longitude: float,
+        max_latitude: float,
+        max_longitude: float,
+        grid_size: float
+    ) -> List[ClusterEntity]:
+        """Получить количество и центр организаций по ячейкам сетки в прямоугольной области"""
+        ...
+
 
 class IBuildingRepo(Protocol):
     """Протокол для репозитория зданий"""
@@ -68,3 +139,13 @@ class IBuildingRepo(Protocol):
         """Получить здания в прямоугольной области"""
         ...
 
+
+class IResultCache(Protocol):
+    """Протокол для кеша результатов запросов к репозиторию"""
+    
+    async def get_or_load(self, key: Hashable, load: Callable[[], Awaitable[Any]], *, refresh: bool = False) -> Any:
+        """
+        Значение по ключу из кеша или результат load(), сохраненный в кеш.
+        С refresh=True значение из кеша не читается: load() выполняется и перезаписывает его
+        """
+        ...
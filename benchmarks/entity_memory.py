@@ -0,0 +1,114 @@
+"""
+Бенчмарк памяти Entity организаций.
+
+Считает через tracemalloc память, занятую Entity для N организаций
+(по умолчанию 10k, по 100 организаций в здании, 3 вида деятельности
+из 50 и 2 телефона на организацию), в трех вариантах:
+- dict: обычные @dataclass с __dict__, здание и виды деятельности
+  создаются заново для каждой организации (прежнее поведение);
+- slots: frozen/slots Entity, без разделения объектов (OrganizationMapper.to_entity);
+- slots + interning: frozen/slots Entity, здания и виды деятельности
+  общие в пачке (OrganizationMapper.to_entities).
+
+БД не нужна, модели имитируются SimpleNamespace.
+
+Запуск:
+    python -m benchmarks.entity_memory --organizations 10000
+"""
+import argparse
+import tracemalloc
+from dataclasses import MISSING, field, fields, make_dataclass
+from types import SimpleNamespace
+from typing import Callable, List
+
+from app.entity.organization import OrganizationEntity, OrganizationPhoneEntity
+from app.entity.building import BuildingEntity
+from app.entity.activity import ActivityEntity
+from app.entity.mappers.organization_mapper import OrganizationMapper
+
+
+def plain_dataclass(cls: type) -> type:
+    """Копия Entity класса в виде обычного @dataclass с __dict__"""
+    return make_dataclass(
+        cls.__name__,
+        [
+            (f.name, f.type) if f.default is MISSING else (f.name, f.type, field(default=f.default))
+            for f in fields(cls)
+        ],
+    )
+
+
+PlainOrganization = plain_dataclass(OrganizationEntity)
+PlainPhone = plain_dataclass(OrganizationPhoneEntity)
+PlainBuilding = plain_dataclass(BuildingEntity)
+PlainActivity = plain_dataclass(ActivityEntity)
+
+
+def make_models(count: int, per_building: int, activities_count: int) -> List[SimpleNamespace]:
+    buildings = [
+        SimpleNamespace(id="building-%d" % i, address="Москва, ул. Тестовая, д. %d" % i,
+                        latitude=55.0 + i * 1e-4, longitude=37.0 + i * 1e-4)
+        for i in range(count // per_building + 1)
+    ]
+    activities = [SimpleNamespace(id=i, name="Вид деятельности %d" % i, parent_id=None) for i in range(activities_count)]
+
+    return [
+        SimpleNamespace(
+            id="org-%d" % i,
+            title="Организация %d" % i,
+            building_id=buildings[i // per_building].id,
+            building=buildings[i // per_building],
+            activities=[activities[(i + k) % activities_count] for k in range(3)],
+            phones=[SimpleNamespace(id="phone-%d-%d" % (i, k), phone_number="+7 000 000 00 %02d" % k) for k in range(2)],
+        )
+        for i in range(count)
+    ]
+
+
+def map_plain(models: List[SimpleNamespace]) -> list:
+    return [
+        PlainOrganization(
+            id=model.id,
+            title=model.title,
+            building_id=model.building_id,
+            building=PlainBuilding(model.building.id, model.building.address, model.building.latitude, model.building.longitude),
+            activities=[PlainActivity(a.id, a.name, a.parent_id) for a in model.activities],
+            phones=[PlainPhone(p.id, p.phone_number) for p in model.phones],
+        )
+        for model in models
+    ]
+
+
+def measure(build: Callable[[], list]) -> int:
+    tracemalloc.start()
+    entities = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del entities
+    return size
+
+
+def main(count: int, per_building: int, activities_count: int) -> None:
+    models = make_models(count, per_building, activities_count)
+    mapper = OrganizationMapper()
+
+    results = [
+        ("dict", measure(lambda: map_plain(models))),
+        ("slots", measure(lambda: [mapper.to_entity(model) for model in models])),
+        ("slots + interning", measure(lambda: mapper.to_entities(models))),
+    ]
+
+    baseline = results[0][1]
+    print("%-18s %12s %12s %10s" % ("variant", "bytes", "bytes/org", "saved"))
+    for name, size in results:
+        print("%-18s %12d %12.0f %9.1f%%" % (name, size, size / count, (baseline - size) / baseline * 100))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--organizations", type=int, default=10_000)
+    parser.add_argument("--per-building", type=int, default=100)
+    parser.add_argument("--activities", type=int, default=50)
+    args = parser.parse_args()
+
+    main(args.organizations, args.per_building, args.activities)
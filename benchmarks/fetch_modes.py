@@ -0,0 +1,216 @@
+"""
+Бенчмарк чтения организаций в режимах ORGANIZATION_FETCH_MODE: orm, json, core.
+
+Скрипт в одной транзакции наполняет таблицы синтетическими организациями
+(здание, 3 вида деятельности и 2 телефона на организацию), затем для каждого
+режима проходит все организации области страницами list_by_rectangle
+и печатает строк (организаций) в секунду. В конце все изменения откатываются.
+
+Запуск (нужна БД с примененными миграциями):
+    python -m benchmarks.fetch_modes --organizations 100000 --page 500
+
+С --without-db БД не нужна: сессия отвечает заранее собранными строками
+страницы (документы для json, кортежи для core), и измеряется только
+сборка Entity на стороне приложения. Режим orm так измерить нельзя - его
+стоимость в загрузке ORM моделей из результата запроса.
+    python -m benchmarks.fetch_modes --without-db --organizations 100000 --page 500
+"""
+import argparse
+import asyncio
+import random
+import time
+from collections import namedtuple
+
+import orjson
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import engine
+from app.repo.organization.repo import OrganizationRepo
+from app.repo.organization.json_repo import OrganizationJsonRepo
+from app.repo.organization.core_repo import (
+    OrganizationCoreRepo,
+    BUILDINGS_BY_IDS,
+    ACTIVITIES_BY_ORGANIZATION_IDS,
+    PHONES_BY_ORGANIZATION_IDS,
+)
+
+
+REPOS = [
+    ("orm", OrganizationRepo),
+    ("json", OrganizationJsonRepo),
+    ("core", OrganizationCoreRepo),
+]
+
+# Область синтетических данных, не пересекающаяся с реальными зданиями Москвы
+BOUNDS = (10.0, 10.0, 12.0, 12.0)
+
+FILL_SQL = [
+    """
+    INSERT INTO buildings (id, address, latitude, longitude, geom)
+    SELECT 'bench-b-' || g, 'bench ' || g, lat, lon, ST_SetSRID(ST_MakePoint(lon, lat), 4326)
+    FROM (
+        SELECT g, 10.0 + random() * 2.0 AS lat, 10.0 + random() * 2.0 AS lon
+        FROM generate_series(1, :buildings) AS g
+    ) AS points
+    """,
+    """
+    INSERT INTO activities (name, parent_id)
+    SELECT 'bench activity ' || g, NULL FROM generate_series(1, 50) AS g
+    """,
+    """
+    INSERT INTO organizations (id, title, building_id)
+    SELECT 'bench-o-' || g, 'Организация ' || g, 'bench-b-' || (1 + g % :buildings)
+    FROM generate_series(1, :organizations) AS g
+    """,
+    """
+    INSERT INTO organization_activities (organization_id, activity_id)
+    SELECT DISTINCT o.id, a.id
+    FROM organizations AS o
+    CROSS JOIN LATERAL (
+        SELECT id FROM activities WHERE name LIKE 'bench activity %' ORDER BY random() LIMIT 3
+    ) AS a
+    WHERE o.id LIKE 'bench-o-%'
+    """,
+    """
+    INSERT INTO organization_phones (id, organization_id, phone_number)
+    SELECT o.id || '-' || k, o.id, '+7 000 000 00 0' || k
+    FROM organizations AS o CROSS JOIN generate_series(1, 2) AS k
+    WHERE o.id LIKE 'bench-o-%'
+    """,
+]
+
+
+async def read_all(session: AsyncSession, repo_class, page: int) -> int:
+    repo = repo_class(session)
+    after = None
+    total = 0
+    while True:
+        entities = await repo.list_by_rectangle(*BOUNDS, limit=page, after=after)
+        total += len(entities)
+        if len(entities) < page:
+            return total
+        after = (entities[-1].id,)
+
+
+OrganizationRow = namedtuple("OrganizationRow", ["id", "title", "building_id"])
+
+
+class MemoryResult(list):
+    def all(self) -> list:
+        return self
+
+
+class MemorySession:
+    """
+    Сессия без БД: на основной запрос отвечает строками страницы,
+    на запросы связанных данных режима core - их строками
+    """
+
+    def __init__(self, page_rows: list, related: list):
+        self._page_rows = page_rows
+        self._related = related
+    
+    async def execute(self, stmt, params=None) -> MemoryResult:
+        for related_stmt, rows in self._related:
+            if stmt is related_stmt:
+                return MemoryResult(rows)
+        return MemoryResult(self._page_rows)
+
+
+def make_page(page: int, per_building: int, seed: int = 1) -> dict:
+    """
+    Строки одной страницы для каждого режима, как их вернул бы Postgres
+    :return: {"json": (строки, []), "core": (строки, связанные запросы)}
+    """
+
+    rnd = random.Random(seed)
+    organizations, documents = [], []
+    buildings, activities, phones = {}, [], []
+    for i in range(page):
+        organization_id = "bench-o-%d" % i
+        number = 1 + i % max(page // per_building, 1)
+        building = buildings.get(number)
+        if building is None:
+            building = buildings[number] = (
+                "bench-b-%d" % number, "bench %d" % number, 10.0 + rnd.random() * 2, 10.0 + rnd.random() * 2
+            )
+        organization_activities = [(a, "bench activity %d" % a, None) for a in rnd.sample(range(1, 51), 3)]
+        organization_phones = [("%s-%d" % (organization_id, k), "+7 000 000 00 0%d" % k) for k in (1, 2)]
+        
+        organizations.append(OrganizationRow(organization_id, "Организация %d" % i, building[0]))
+        activities += [(organization_id, *activity) for activity in organization_activities]
+        phones += [(organization_id, *phone) for phone in organization_phones]
+        documents.append((orjson.dumps({
+            "id": organization_id,
+            "title": "Организация %d" % i,
+            "building_id": building[0],
+            "building": dict(zip(("id", "address", "latitude", "longitude"), building)),
+            "activities": [dict(zip(("id", "name", "parent_id"), activity)) for activity in organization_activities],
+            "phones": [dict(zip(("id", "phone_number"), phone)) for phone in organization_phones],
+        }).decode(),))
+    
+    return {
+        "json": (documents, []),
+        "core": (organizations, [
+            (BUILDINGS_BY_IDS, list(buildings.values())),
+            (ACTIVITIES_BY_ORGANIZATION_IDS, activities),
+            (PHONES_BY_ORGANIZATION_IDS, phones),
+        ]),
+    }
+
+
+async def main_without_db(organizations: int, per_building: int, page: int, repeat: int) -> None:
+    pages = make_page(page, per_building)
+    count = max(organizations // page, 1)
+    
+    print("%-6s %12s %12s" % ("mode", "rows", "rows/sec"))
+    for name, repo_class in REPOS:
+        if name not in pages:
+            continue
+        repo = repo_class(MemorySession(*pages[name]))
+        best = float("inf")
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for _ in range(count):
+                await repo.list_by_rectangle(*BOUNDS, limit=page)
+            best = min(best, time.perf_counter() - started)
+        print("%-6s %12d %12.0f" % (name, count * page, count * page / best))
+
+
+async def main(organizations: int, per_building: int, page: int, repeat: int) -> None:
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        try:
+            print("Filling %d organizations..." % organizations)
+            params = {"organizations": organizations, "buildings": max(organizations // per_building, 1)}
+            for sql in FILL_SQL:
+                await connection.execute(text(sql), params)
+            await connection.execute(text("ANALYZE"))
+
+            print("%-6s %12s %12s" % ("mode", "rows", "rows/sec"))
+            for name, repo_class in REPOS:
+                best = float("inf")
+                for _ in range(repeat):
+                    async with AsyncSession(bind=connection, join_transaction_mode="create_savepoint") as session:
+                        started = time.perf_counter()
+                        rows = await read_all(session, repo_class, page)
+                        best = min(best, time.perf_counter() - started)
+                print("%-6s %12d %12.0f" % (name, rows, rows / best))
+        finally:
+            await transaction.rollback()
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--organizations", type=int, default=100_000)
+    parser.add_argument("--per-building", type=int, default=20)
+    parser.add_argument("--page", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--without-db", action="store_true")
+    args = parser.parse_args()
+
+    run = main_without_db if args.without_db else main
+    asyncio.run(run(args.organizations, args.per_building, args.page, args.repeat))
@@ -0,0 +1,96 @@
+"""
+Бенчмарк плана запроса поиска по радиусу на 1М зданий.
+
+Скрипт в одной транзакции наполняет таблицу buildings синтетическими
+данными, выполняет EXPLAIN ANALYZE запроса BuildingRepo.list_by_radius
+без индекса idx_buildings_geog (Seq Scan) и с ним (Index Scan / Bitmap
+Index Scan), после чего откатывает все изменения.
+
+Запуск (нужна БД с примененными миграциями):
+    python -m benchmarks.radius_index_plan --rows 1000000
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import select, text
+from sqlalchemy.dialects import postgresql
+
+from app.database import engine
+from app.repo.organization.models import Organization
+from app.repo.activity.models import Activity
+from app.repo.building.models import Building
+from app.repo.building.geo import within_radius
+
+
+FILL_SQL = """
+INSERT INTO buildings (id, address, latitude, longitude, geom)
+SELECT gen_random_uuid()::text,
+       'bench ' || g,
+       lat,
+       lon,
+       ST_SetSRID(ST_MakePoint(lon, lat), 4326)
+FROM (
+    SELECT g,
+           55.0 + random() * 2.0 AS lat,
+           36.5 + random() * 2.5 AS lon
+    FROM generate_series(1, :rows) AS g
+) AS points
+"""
+
+
+def radius_statement(latitude: float, longitude: float, radius_meters: float) -> str:
+    stmt = select(Building.id).where(within_radius(latitude, longitude, radius_meters))
+    return str(
+        stmt.compile(
+            dialect=postgresql.dialect(),
+            compile_kwargs={"literal_binds": True},
+        )
+    )
+
+
+async def explain(connection, sql: str) -> float:
+    started = time.perf_counter()
+    result = await connection.execute(text("EXPLAIN (ANALYZE, BUFFERS) " + sql))
+    elapsed = time.perf_counter() - started
+    for line in result.scalars():
+        print("    " + line)
+    return elapsed
+
+
+async def main(rows: int, latitude: float, longitude: float, radius_meters: float) -> None:
+    sql = radius_statement(latitude, longitude, radius_meters)
+
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        try:
+            print("Filling buildings with %d rows..." % rows)
+            await connection.execute(text(FILL_SQL), {"rows": rows})
+            await connection.execute(text("ANALYZE buildings"))
+
+            savepoint = await connection.begin_nested()
+            await connection.execute(text("DROP INDEX IF EXISTS idx_buildings_geog"))
+            print("\nWithout idx_buildings_geog:")
+            without_index = await explain(connection, sql)
+            await savepoint.rollback()
+
+            print("\nWith idx_buildings_geog:")
+            with_index = await explain(connection, sql)
+
+            print("\nwithout index: %.1f ms, with index: %.1f ms"
+                  % (without_index * 1000, with_index * 1000))
+        finally:
+            await transaction.rollback()
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--latitude", type=float, default=55.7558)
+    parser.add_argument("--longitude", type=float, default=37.6176)
+    parser.add_argument("--radius", type=float, default=500.0)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.rows, args.latitude, args.longitude, args.radius))
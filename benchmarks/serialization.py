@@ -0,0 +1,103 @@
+"""
+Микро-бенчмарк сериализации ответов со списком организаций.
+
+Сравнивает стоимость кодирования одной организации:
+- pydantic: валидация dict из app.api.schemas.encoders по response_model,
+  dump в JSON-совместимые объекты и json.dumps, как это делает FastAPI
+  при возврате данных из handler без ORJSONResponse;
+- orjson: dict из app.api.schemas.encoders и orjson.dumps (быстрый путь handlers).
+
+БД не нужна, организации генерируются в памяти.
+
+Запуск:
+    python -m benchmarks.serialization --organizations 1000 --repeat 50
+"""
+import argparse
+import json
+import time
+from typing import Callable, List
+
+import orjson
+from pydantic import TypeAdapter
+
+from app.entity.organization import OrganizationEntity, OrganizationPhoneEntity
+from app.entity.building import BuildingEntity
+from app.entity.activity import ActivityEntity
+from app.api.schemas.organization import (
+    OrganizationResponse,
+    OrganizationSimpleResponse,
+    OrganizationWithBuildingResponse,
+)
+from app.api.schemas.encoders import (
+    organization_entity_to_dict,
+    organization_entity_to_simple_dict,
+    organization_entity_to_with_building_dict,
+)
+
+
+CASES = [
+    ("full", OrganizationResponse, organization_entity_to_dict),
+    ("simple", OrganizationSimpleResponse, organization_entity_to_simple_dict),
+    ("with_building", OrganizationWithBuildingResponse, organization_entity_to_with_building_dict),
+]
+
+
+def make_organizations(count: int) -> List[OrganizationEntity]:
+    building = BuildingEntity(id="building-1", address="Москва, ул. Тестовая, д. 1", latitude=55.7558, longitude=37.6173)
+    activities = [ActivityEntity(id=1, name="Еда", parent_id=None), ActivityEntity(id=2, name="Молочная продукция", parent_id=1)]
+
+    return [
+        OrganizationEntity(
+            id="org-%d" % i,
+            title="Организация %d" % i,
+            building_id=building.id,
+            building=building,
+            activities=activities,
+            phones=[
+                OrganizationPhoneEntity(id="phone-%d-1" % i, phone_number="+7 123 456 78 90"),
+                OrganizationPhoneEntity(id="phone-%d-2" % i, phone_number="+7 098 765 43 21"),
+            ],
+        )
+        for i in range(count)
+    ]
+
+
+def pydantic_encode(entities: List[OrganizationEntity], model, encoder: Callable) -> bytes:
+    adapter = TypeAdapter(List[model])
+    validated = adapter.validate_python([encoder(entity) for entity in entities])
+    content = adapter.dump_python(validated, mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+
+def orjson_encode(entities: List[OrganizationEntity], encoder: Callable) -> bytes:
+    return orjson.dumps([encoder(entity) for entity in entities])
+
+
+def measure(encode: Callable[[], bytes], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        encode()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(count: int, repeat: int) -> None:
+    entities = make_organizations(count)
+
+    print("%-14s %16s %16s %8s" % ("response", "pydantic us/org", "orjson us/org", "speedup"))
+    for name, model, encoder in CASES:
+        assert orjson.loads(pydantic_encode(entities, model, encoder)) == orjson.loads(orjson_encode(entities, encoder))
+
+        slow = measure(lambda: pydantic_encode(entities, model, encoder), repeat)
+        fast = measure(lambda: orjson_encode(entities, encoder), repeat)
+        print("%-14s %16.2f %16.2f %7.1fx" % (name, slow / count * 1e6, fast / count * 1e6, slow / fast))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--organizations", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    main(args.organizations, args.repeat)
@@ -0,0 +1,83 @@
+"""
+Бенчмарк пространственного индекса снимка справочника (GridIndex).
+
+Строит индекс по N синтетическим зданиям (по умолчанию 1М, равномерно
+в рамке Москвы и области, как benchmarks.radius_index_plan) и измеряет
+время построения и задержку запросов (p50/p99) к индексу:
+- radius: здания в радиусе по сфероиду, как ST_DWithin для geography;
+- radius sphere: здания в радиусе по сфере, как <-> (поиск ближайших);
+- rectangle: здания внутри прямоугольника, как ST_Within.
+
+БД не нужна.
+
+Запуск:
+    python -m benchmarks.spatial_index --rows 1000000 --radius 500
+"""
+import argparse
+import random
+import time
+from typing import Callable, List
+
+import numpy as np
+
+from app.repo.snapshot.spatial import GridIndex
+
+
+MIN_LATITUDE, MAX_LATITUDE = 55.0, 57.0
+MIN_LONGITUDE, MAX_LONGITUDE = 36.5, 39.0
+
+
+def percentile(values: List[float], q: float) -> float:
+    return float(np.percentile(values, q))
+
+
+def measure(query: Callable[[float, float], np.ndarray], centers: List[tuple]) -> tuple:
+    timings, found = [], 0
+    for latitude, longitude in centers:
+        started = time.perf_counter()
+        result = query(latitude, longitude)
+        timings.append((time.perf_counter() - started) * 1000)
+        found += len(result)
+    return percentile(timings, 50), percentile(timings, 99), found / len(centers)
+
+
+def main(rows: int, queries: int, radius_meters: float, rectangle_degrees: float, seed: int) -> None:
+    generator = np.random.default_rng(seed)
+    latitudes = generator.uniform(MIN_LATITUDE, MAX_LATITUDE, rows)
+    longitudes = generator.uniform(MIN_LONGITUDE, MAX_LONGITUDE, rows)
+    
+    started = time.perf_counter()
+    index = GridIndex(latitudes, longitudes)
+    print("build: %d points in %.0f ms" % (rows, (time.perf_counter() - started) * 1000))
+    
+    rnd = random.Random(seed)
+    centers = [
+        (rnd.uniform(MIN_LATITUDE, MAX_LATITUDE), rnd.uniform(MIN_LONGITUDE, MAX_LONGITUDE))
+        for _ in range(queries)
+    ]
+    half = rectangle_degrees / 2
+    
+    def rectangle(latitude: float, longitude: float) -> np.ndarray:
+        return index.rectangle(latitude - half, longitude - half, latitude + half, longitude + half)
+    
+    results = [
+        ("radius", measure(lambda lat, lon: index.radius(lat, lon, radius_meters)[0], centers)),
+        ("radius sphere", measure(lambda lat, lon: index.radius(lat, lon, radius_meters, spheroid=False)[0], centers)),
+        ("rectangle", measure(rectangle, centers)),
+    ]
+    
+    print("%-14s %10s %10s %10s" % ("query", "p50, ms", "p99, ms", "found"))
+    for name, (p50, p99, found) in results:
+        print("%-14s %10.3f %10.3f %10.1f" % (name, p50, p99, found))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--radius", type=float, default=500.0)
+    parser.add_argument("--rectangle", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    
+    main(args.rows, args.queries, args.radius, args.rectangle, args.seed)
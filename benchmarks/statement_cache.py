@@ -0,0 +1,103 @@
+"""
+Бенчмарк CPU подготовки запросов OrganizationRepo к выполнению.
+
+Для каждого запроса сравнивается время на один запрос API:
+- rebuild: запрос собирается заново (как до кеширования построителей), SQLAlchemy
+  вычисляет ключ кеша обходом всего выражения и находит скомпилированный SQL в кеше;
+- prebuilt: запрос берется из lru_cache построителя, ключ кеша запомнен в объекте запроса.
+Для сравнения приводится compile - компиляция без кеша.
+
+Измеряется путь Connection до отправки в драйвер (Select._compile_w_cache),
+для json режима - вместе со сборкой документа организации. БД не нужна.
+
+Запуск:
+    python -m benchmarks.statement_cache --repeat 2000
+"""
+import argparse
+import time
+from typing import Callable
+
+from sqlalchemy.dialects.postgresql import asyncpg
+
+import app.repo.activity.models
+from app.repo.organization import repo
+from app.repo.organization import json_repo
+
+
+DIALECT = asyncpg.dialect()
+
+QUERIES = [
+    ("by_building", lambda: repo._by_building_stmt(True)),
+    ("by_name", lambda: repo._by_name_stmt(True)),
+    ("activity_tree", lambda: repo._by_organization_ids_stmt(repo._organization_ids_by_activity_closure(), False)),
+    ("radius_distance", lambda: repo._by_radius_distance_stmt(True)),
+    ("rectangle", lambda: repo._by_rectangle_stmt(True)),
+    ("nearest", lambda: repo._nearest_stmt(repo._organization_ids_by_activity_ids())),
+]
+
+MODES = [
+    ("orm", repo._with_relations),
+    ("json", json_repo._with_document),
+]
+
+
+def uncached(build: Callable) -> Callable:
+    """Вызов построителя в обход всех lru_cache: запрос собирается заново"""
+    original = {}
+    for module in (repo, json_repo):
+        for name, value in vars(module).items():
+            if hasattr(value, "cache_clear") and hasattr(value, "__wrapped__"):
+                original[(module, name)] = value
+
+    def call():
+        for (module, name), value in original.items():
+            setattr(module, name, value.__wrapped__)
+        try:
+            return build()
+        finally:
+            for (module, name), value in original.items():
+                setattr(module, name, value)
+
+    return call
+
+
+def prepare(stmt, compiled_cache):
+    return stmt._compile_w_cache(
+        DIALECT,
+        compiled_cache=compiled_cache,
+        column_keys=[],
+        for_executemany=False,
+        schema_translate_map=None
+    )
+
+
+def per_call(func: Callable, repeat: int) -> float:
+    func()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def main(repeat: int) -> None:
+    print("%-5s %-16s %12s %12s %12s %8s" % ("mode", "query", "compile µs", "rebuild µs", "prebuilt µs", "saved"))
+    for mode, transform in MODES:
+        for name, build in QUERIES:
+            compiled_cache = {}
+            rebuild = uncached(lambda: transform(build()))
+
+            compile_us = per_call(lambda: prepare(rebuild(), None), max(repeat // 10, 1))
+            rebuild_us = per_call(lambda: prepare(rebuild(), compiled_cache), repeat)
+            prebuilt_us = per_call(lambda: prepare(transform(build()), compiled_cache), repeat)
+
+            print("%-5s %-16s %12.1f %12.1f %12.1f %7.0f%%" % (
+                mode, name, compile_us, rebuild_us, prebuilt_us, (rebuild_us - prebuilt_us) / rebuild_us * 100
+            ))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    main(args.repeat)